@@ -1,7 +1,15 @@
+import os
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from .config import settings
+from .cache import get_response_cache
+from .event_summary import summarize_events
+from .rate_limit import (get_rate_limiter, check_response_errors, seconds_until_reset,
+                         APIFootballLimitError, QuotaExhausted)
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Optional
 # app/api_football.py
 
 # Leagues running on calendar-year
@@ -75,6 +83,115 @@ TOP4_THRESHOLD = 4
 HEADERS = {"x-apisports-key": settings.API_FOOTBALL_KEY}
 BASE = settings.API_FOOTBALL_BASE
 
+# Fixture status codes after which a match's data no longer changes
+FINISHED_STATUSES = {"FT", "AET", "PEN"}
+# Statuses a fixture never leaves (finished, or will never be played as scheduled)
+TERMINAL_STATUSES = FINISHED_STATUSES | {"CANC", "ABD", "AWD", "WO"}
+
+# Responses worth retrying with backoff (rate limited or transient server errors)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class APIFootballClient:
+    """
+    HTTP client for API-Football owning one keep-alive, connection-pooled
+    session, so repeated calls reuse TCP+TLS connections.
+
+    Every request has a (connect, read) timeout and 429/5xx responses are
+    retried with exponential backoff (honouring Retry-After). The session is
+    safe to share between threads: urllib3's pool is thread-safe, auth is a
+    fixed header, and with pool_block=True threads wait for a free connection
+    instead of opening throwaway ones.
+    """
+
+    def __init__(self, base: str = BASE, headers: Dict[str, str] = HEADERS,
+                 pool_size: int = settings.API_FOOTBALL_POOL_SIZE,
+                 timeout: tuple = (settings.API_FOOTBALL_CONNECT_TIMEOUT, settings.API_FOOTBALL_READ_TIMEOUT),
+                 retries: int = settings.API_FOOTBALL_RETRIES,
+                 backoff: float = settings.API_FOOTBALL_BACKOFF):
+        self.base = base
+        self.timeout = timeout
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                              max_retries=retry, pool_block=True)
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, endpoint: str, params: Dict[str, Any]) -> requests.Response:
+        return self.session.get(f"{self.base}{endpoint}", params=params, timeout=self.timeout)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_client: Optional[APIFootballClient] = None
+_client_pid: Optional[int] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> APIFootballClient:
+    """
+    Process-wide client, built on first use. A forked Celery worker child
+    gets its own client rather than sharing the parent's sockets.
+    """
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = APIFootballClient()
+            _client_pid = os.getpid()
+        return _client
+
+
+def _api_get(endpoint: str, params: Dict[str, Any], ttl: Callable[[list], Optional[int]]) -> list:
+    """
+    GET an API-Football endpoint and return its "response" list, served from the
+    response cache when fresh. ttl(payload) gives the cache lifetime in seconds
+    (None = never expires).
+
+    Every network call waits for the shared rate limiter first. When the quota
+    is spent the last cached payload is returned even if expired; with nothing
+    cached the QuotaExhausted/RateLimited error propagates, so callers don't
+    compute signals from an empty list.
+    """
+    cache = get_response_cache()
+    cached, fresh = cache.get(endpoint, params)
+    if cached is not None and fresh:
+        return cached
+
+    limiter = get_rate_limiter()
+    try:
+        limiter.acquire()
+        resp = get_client().get(endpoint, params)
+        limiter.record(resp.headers)
+        if resp.status_code == 403:
+            raise QuotaExhausted(f"API-Football: 403 Forbidden – free-tier limit reached for {endpoint}.",
+                                 seconds_until_reset())
+        resp.raise_for_status()
+        body = resp.json()
+        check_response_errors(body)
+    except APIFootballLimitError as exc:
+        print(f"❗ {exc}")
+        if isinstance(exc, QuotaExhausted):
+            limiter.mark_exhausted()
+        else:
+            limiter.drain()
+        if cached is not None:
+            cache.record_stale(endpoint)
+            return cached
+        raise
+    payload = body.get("response", []) or []
+    cache.set(endpoint, params, payload, ttl(payload))
+    return payload
+
 
 def infer_season(league_id: int, kickoff_dt: datetime) -> int:
     """
@@ -89,21 +206,61 @@ def get_last_n_team_fixtures(team_id: int, league_id: int, season: int, n: int)
     """
     Fetch up to the last n fixtures (home OR away) for the given team.
     """
-    resp = requests.get(
-        f"{BASE}fixtures",
-        headers=HEADERS,
-        params={
+    fixtures = _api_get(
+        "fixtures",
+        {
             "team":   team_id,
             "league": league_id,
             "season": season,
             "last":   n,
-        }
+        },
+        ttl=lambda payload: settings.CACHE_TTL_FIXTURES,
     )
-    if resp.status_code == 403:
-        print("❗  API-Football: 403 Forbidden – free-tier limit reached.")
-        return []
-    resp.raise_for_status()
-    return resp.json().get("response", []) or []
+    return fixtures or []
+
+
+def get_league_fixtures(league_id: int, season: int, ttl: Optional[int] = None, **params) -> List[Dict[str, Any]]:
+    """
+    Fetch every fixture of a league season in one request; extra params
+    (e.g. from/to dates, status) narrow it down. ttl overrides the cache
+    lifetime (default CACHE_TTL_FIXTURES).
+    """
+    ttl = settings.CACHE_TTL_FIXTURES if ttl is None else ttl
+    fixtures = _api_get(
+        "fixtures",
+        {"league": league_id, "season": season, **params},
+        ttl=lambda payload: ttl,
+    )
+    return fixtures or []
+
+
+def is_played(fixture: Dict[str, Any]) -> bool:
+    """
+    True when the fixture has a final score (both goal fields are set).
+    """
+    goals = fixture.get("goals", {})
+    return goals.get("home") is not None and goals.get("away") is not None
+
+
+def is_finished(fixture: Dict[str, Any]) -> bool:
+    """
+    True when the fixture is over (full time, extra time or penalties), so its
+    events and statistics are final.
+    """
+    return fixture.get("fixture", {}).get("status", {}).get("short") in FINISHED_STATUSES
+
+
+def select_last5(fixtures: List[Dict[str, Any]], team_id: int = None, venue: str = None) -> list[dict]:
+    """
+    From a most-recent-first fixture list, drop unplayed fixtures and return the
+    first 5. When venue is "home" or "away", only keep fixtures where team_id
+    played at that venue.
+    """
+    played = [f for f in fixtures if is_played(f)]
+    if venue is not None:
+        played = [f for f in played
+                  if f.get("teams", {}).get(venue, {}).get("id") == team_id]
+    return played[:5]
 
 
 def get_last5_team_fixtures(team_id: int, league_id: int, season: int) -> list:
@@ -112,11 +269,7 @@ def get_last5_team_fixtures(team_id: int, league_id: int, season: int) -> list:
     and return the most recent 5 played.
     """
     fixtures = get_last_n_team_fixtures(team_id, league_id, season, n=15)
-    # Exclude fixtures with missing scores (unplayed)
-    played = [f for f in fixtures
-              if f.get("goals", {}).get("home") is not None
-              and f.get("goals", {}).get("away") is not None]
-    return played[:5]
+    return select_last5(fixtures)
 
 def get_last5_home_fixtures(team_id: int, league_id: int, season: int) -> list[dict]:
     """
@@ -124,14 +277,7 @@ def get_last5_home_fixtures(team_id: int, league_id: int, season: int) -> list[d
     then keep only those where this team was HOME, and return the most recent 5 played.
     """
     fixtures = get_last_n_team_fixtures(team_id, league_id, season, n=15)
-    # Exclude fixtures with missing scores (unplayed), AND ensure they count as HOME
-    played_home = [
-        f for f in fixtures
-        if f.get("goals", {}).get("home") is not None
-        and f.get("goals", {}).get("away") is not None
-        and f.get("teams", {}).get("home", {}).get("id") == team_id
-    ]
-    return played_home[:5]
+    return select_last5(fixtures, team_id, "home")
 
 
 def get_last5_away_fixtures(team_id: int, league_id: int, season: int) -> list[dict]:
@@ -140,14 +286,7 @@ def get_last5_away_fixtures(team_id: int, league_id: int, season: int) -> list[d
     then keep only those where this team was AWAY, and return the most recent 5 played.
     """
     fixtures = get_last_n_team_fixtures(team_id, league_id, season, n=15)
-    # Exclude fixtures with missing scores (unplayed), AND ensure they count as AWAY
-    played_away = [
-        f for f in fixtures
-        if f.get("goals", {}).get("home") is not None
-        and f.get("goals", {}).get("away") is not None
-        and f.get("teams", {}).get("away", {}).get("id") == team_id
-    ]
-    return played_away[:5]
+    return select_last5(fixtures, team_id, "away")
 
 def get_standings(league_id: int, season: int) -> List[Dict[str, Any]]:
     """
@@ -155,17 +294,18 @@ def get_standings(league_id: int, season: int) -> List[Dict[str, Any]]:
     Returns "response"[0]["league"]["standings"][0] — a list of dicts containing
     'rank', 'team':{'id', 'name'}, 'all':{'played':X}, etc.
     """
-    resp = requests.get(
-        
-        f"{BASE}standings",
-        headers=HEADERS,
-        params={"league": league_id, "season": season},
+    data = _api_get(
+        "standings",
+        {"league": league_id, "season": season},
+        ttl=lambda payload: settings.CACHE_TTL_STANDINGS,
     )
-    if resp.status_code == 403:
-        print("❗ API-Football: 403 Forbidden – free-tier limit reached.")
-        return []
-    resp.raise_for_status()
-    data = resp.json().get("response", [])
+    return select_active_group(data)
+
+
+def select_active_group(data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Pick the table in play from a raw standings "response" list.
+    """
     if not data:
         return []
     # There may be multiple “groups” (e.g., Clausura vs Apertura).
@@ -178,20 +318,52 @@ def get_standings(league_id: int, season: int) -> List[Dict[str, Any]]:
     # Fallback: just return the first group if none have played >0
     return all_groups[0] if all_groups else []
 
-def get_fixture_events(fixture_id: int) -> List[Dict[str, Any]]:
+
+def events_ttl(finished: bool) -> Callable[[list], Optional[int]]:
+    """
+    Cache lifetime for a fixture's events/statistics: CACHE_TTL_FINISHED once
+    the match is finished (and the payload non-empty), a few minutes otherwise.
+    """
+    return lambda payload: settings.CACHE_TTL_FINISHED if finished and payload else settings.CACHE_TTL_EVENTS_LIVE
+
+
+def get_fixture_events(fixture_id: int, finished: bool = False) -> List[Dict[str, Any]]:
     """
     Fetch all event objects for a given fixture.
+    Pass finished=True for a completed match: its events are then cached for days.
     """
-    resp = requests.get(
-        f"{BASE}fixtures/events",
-        headers=HEADERS,
-        params={"fixture": fixture_id},
-    )
-    if resp.status_code == 403:
-        print("❗ API-Football: 403 Forbidden – free-tier limit reached for events.")
-        return []
-    resp.raise_for_status()
-    return resp.json().get("response", []) or []
+    events = _api_get("fixtures/events", {"fixture": fixture_id}, ttl=events_ttl(finished))
+    return events or []
+
+
+def get_fixture_statistics(fixture_id: int, finished: bool = False) -> List[Dict[str, Any]]:
+    """
+    Fetch per-team statistics (shots, possession, expected goals, ...) for a fixture.
+    Pass finished=True for a completed match: its statistics are then cached for days.
+    """
+    statistics = _api_get("fixtures/statistics", {"fixture": fixture_id}, ttl=events_ttl(finished))
+    return statistics or []
+
+
+def parse_expected_goals(statistics: List[Dict[str, Any]]) -> Optional[tuple]:
+    """
+    Extract (home_xg, away_xg) from a fixtures/statistics payload (one entry
+    per team, home first). Returns None if either team has no xG figure.
+    """
+    if len(statistics) < 2:
+        return None
+    xg = []
+    for team_stats in statistics[:2]:
+        value = None
+        for stat in team_stats.get("statistics", []) or []:
+            if stat.get("type") in ("expected_goals", "Expected Goals"):
+                value = stat.get("value")
+                break
+        try:
+            xg.append(float(value))
+        except (TypeError, ValueError):
+            return None
+    return xg[0], xg[1]
 
 
 def parse_minute(minute_str: Any) -> int:
@@ -208,11 +380,16 @@ def parse_minute(minute_str: Any) -> int:
         return 999
 
 
-def check_team_first_half_performance(fixtures: List[Dict[str, Any]], team_id: int, team_name: str) -> tuple:
+def check_team_first_half_performance(fixtures: List[Dict[str, Any]], team_id: int, team_name: str,
+                                      get_summary: Callable[[Dict[str, Any]], Any] = None) -> tuple:
     """
     Check the team's first half performance (goals scored and conceded).
+    get_summary(fixture) supplies each fixture's EventSummary (default: built
+    from events fetched from the API).
     Returns (goals_scored_count, goals_conceded_count, missing_fixtures)
     """
+    if get_summary is None:
+        get_summary = lambda f: summarize_events(f, get_fixture_events(f["fixture"]["id"], finished=is_finished(f)))
     goals_scored_count = 0
     goals_conceded_count = 0
     missing = []
@@ -234,29 +411,15 @@ def check_team_first_half_performance(fixtures: List[Dict[str, Any]], team_id: i
             opponent = home_team["name"]
             opponent_id = home_team["id"]
         
-        events = get_fixture_events(fid)
-        if not events:
+        summary = get_summary(fixture)
+        if summary is None:
             missing.append(fid)
             print(f"   {i}. vs {opponent} ({team_role}) - ❌ No events data")
             continue
 
-        # Track goals scored and conceded
-        goals_scored = []
-        goals_conceded = []
-        
-        for event in events:
-            if event.get("type") == "Goal":
-                elapsed = event.get("time", {}).get("elapsed")
-                if isinstance(elapsed, int) and 1 <= elapsed <= 45:
-                    goal_team_id = event.get("team", {}).get("id")
-                    player_name = event.get("player", {}).get("name", "Unknown")
-                    
-                    if goal_team_id == team_id:
-                        # Team scored
-                        goals_scored.append(f"{elapsed}' {player_name}")
-                    elif goal_team_id == opponent_id:
-                        # Team conceded
-                        goals_conceded.append(f"{elapsed}' {player_name}")
+        # Track goals scored and conceded (minutes 1–45, stoppage time included)
+        goals_scored = [f"{m}'" for m in summary.goal_minutes(team_id) if 1 <= m <= 45]
+        goals_conceded = [f"{m}'" for m in summary.goal_minutes(opponent_id) if 1 <= m <= 45]
         
         # Update counters
         if goals_scored:
@@ -279,17 +442,16 @@ def check_team_first_half_performance(fixtures: List[Dict[str, Any]], team_id: i
     
     return goals_scored_count, goals_conceded_count, missing
 
+def lineups_ttl(payload: list) -> int:
+    """
+    Cache lifetime for lineups: long once published, short while still empty.
+    """
+    return settings.CACHE_TTL_LINEUPS if payload else settings.CACHE_TTL_LINEUPS_EMPTY
+
+
 def get_lineups_for_fixture(fixture_id: int) -> List[Dict[str, Any]]:
     """
     Fetch lineups for a given fixture.
     """
-    resp = requests.get(
-        f"{BASE}fixtures/lineups",
-        headers=HEADERS,
-        params={"fixture": fixture_id},
-    )
-    if resp.status_code == 403:
-        print("❗ API-Football: 403 Forbidden – free-tier limit reached for lineups.")
-        return []
-    resp.raise_for_status()
-    return resp.json().get("response", []) or []
\ No newline at end of file
+    lineups = _api_get("fixtures/lineups", {"fixture": fixture_id}, ttl=lineups_ttl)
+    return lineups or []
\ No newline at end of file
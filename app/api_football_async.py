@@ -0,0 +1,161 @@
+import asyncio
+import httpx
+from typing import List, Dict, Any, Callable, Iterable, Optional
+from .config import settings
+from .cache import get_response_cache
+from .api_football import BASE, HEADERS, RETRY_STATUSES, events_ttl, lineups_ttl
+from .rate_limit import (get_rate_limiter, check_response_errors, seconds_until_reset,
+                         APIFootballLimitError, QuotaExhausted)
+# app/api_football_async.py
+
+
+class AsyncAPIFootballClient:
+    """
+    asyncio counterpart of APIFootballClient for fan-out workloads.
+
+    At most `concurrency` requests are in flight at once (semaphore + matching
+    httpx pool limits), with the same timeouts and backoff on 429/5xx and
+    connection errors as the sync client. Use as an async context manager
+    so the pool is closed.
+    """
+
+    def __init__(self, concurrency: int = settings.API_FOOTBALL_CONCURRENCY,
+                 retries: int = settings.API_FOOTBALL_RETRIES,
+                 backoff: float = settings.API_FOOTBALL_BACKOFF):
+        self.retries = retries
+        self.backoff = backoff
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._client = httpx.AsyncClient(
+            base_url=BASE,
+            headers=HEADERS,
+            timeout=httpx.Timeout(settings.API_FOOTBALL_READ_TIMEOUT,
+                                  connect=settings.API_FOOTBALL_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=concurrency,
+                                max_keepalive_connections=concurrency),
+        )
+
+    async def __aenter__(self) -> "AsyncAPIFootballClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self._client.aclose()
+
+    async def get(self, endpoint: str, params: Dict[str, Any]) -> list:
+        """
+        GET an endpoint and return its "response" list. Each attempt waits for
+        the shared rate limiter; quota breaches raise QuotaExhausted/RateLimited.
+        Transport errors (connect, read timeout) are retried like 5xx responses.
+        """
+        limiter = get_rate_limiter()
+        async with self._semaphore:
+            for attempt in range(self.retries + 1):
+                await asyncio.to_thread(limiter.acquire)
+                try:
+                    resp = await self._client.get(endpoint, params=params)
+                except httpx.TransportError:
+                    if attempt == self.retries:
+                        raise
+                    await asyncio.sleep(self.backoff * 2 ** attempt)
+                    continue
+                limiter.record(resp.headers)
+                if resp.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    break
+                retry_after = resp.headers.get("Retry-After")
+                delay = float(retry_after) if retry_after and retry_after.isdigit() else self.backoff * 2 ** attempt
+                await asyncio.sleep(delay)
+        if resp.status_code == 403:
+            limiter.mark_exhausted()
+            raise QuotaExhausted(f"API-Football: 403 Forbidden – free-tier limit reached for {endpoint}.",
+                                 seconds_until_reset())
+        resp.raise_for_status()
+        body = resp.json()
+        check_response_errors(body)
+        return body.get("response", []) or []
+
+
+async def fetch_many(endpoint: str, param_list: List[Dict[str, Any]], ttl: Callable[[list], Optional[int]],
+                     concurrency: int = settings.API_FOOTBALL_CONCURRENCY) -> List[list]:
+    """
+    GET one endpoint for many parameter sets in a single bounded-concurrency
+    burst. Fresh cache entries are used as-is and new payloads are written back
+    with ttl(payload), like _api_get. Returns payloads in param_list order.
+    If some requests fail, the rest of the burst is still cached before the
+    first error is raised, so a retry only asks for the failed ones.
+    """
+    cache = get_response_cache()
+    results: List[Optional[list]] = [None] * len(param_list)
+    stale: Dict[int, list] = {}
+    todo = []
+    for i, params in enumerate(param_list):
+        cached, fresh = cache.get(endpoint, params)
+        if cached is not None and fresh:
+            results[i] = cached
+        else:
+            if cached is not None:
+                stale[i] = cached
+            todo.append(i)
+
+    if todo:
+        async with AsyncAPIFootballClient(concurrency=concurrency) as client:
+            payloads = await asyncio.gather(
+                *(client.get(endpoint, param_list[i]) for i in todo),
+                return_exceptions=True,
+            )
+        limit_error = error = None
+        for i, payload in zip(todo, payloads):
+            if isinstance(payload, APIFootballLimitError):
+                # Out of budget: fall back to the last known payload, if any
+                if i in stale:
+                    cache.record_stale(endpoint)
+                    results[i] = stale[i]
+                else:
+                    limit_error = payload
+                continue
+            if isinstance(payload, BaseException):
+                error = error or payload
+                continue
+            cache.set(endpoint, param_list[i], payload, ttl(payload))
+            results[i] = payload
+        if error is not None:
+            raise error
+        if limit_error is not None:
+            print(f"❗ {limit_error}")
+            raise limit_error
+    return results
+
+
+async def fetch_events_many(fixture_ids: Iterable[int], finished: bool = True,
+                            concurrency: int = settings.API_FOOTBALL_CONCURRENCY) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Fetch the events of many fixtures in one bounded-concurrency burst, with
+    the same cache TTLs as get_fixture_events. Returns {fixture_id: events}.
+    """
+    fixture_ids = list(dict.fromkeys(fixture_ids))
+    payloads = await fetch_many("fixtures/events", [{"fixture": fid} for fid in fixture_ids],
+                                events_ttl(finished), concurrency)
+    return dict(zip(fixture_ids, payloads))
+
+
+async def fetch_statistics_many(fixture_ids: Iterable[int], finished: bool = True,
+                                concurrency: int = settings.API_FOOTBALL_CONCURRENCY) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Fetch the statistics of many fixtures in one bounded-concurrency burst,
+    with the same cache TTLs as get_fixture_statistics. Returns {fixture_id: statistics}.
+    """
+    fixture_ids = list(dict.fromkeys(fixture_ids))
+    payloads = await fetch_many("fixtures/statistics", [{"fixture": fid} for fid in fixture_ids],
+                                events_ttl(finished), concurrency)
+    return dict(zip(fixture_ids, payloads))
+
+
+async def fetch_lineups_many(fixture_ids: Iterable[int], finished: bool = False,
+                             concurrency: int = settings.API_FOOTBALL_CONCURRENCY) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Fetch the lineups of many fixtures in one bounded-concurrency burst, with
+    the same cache TTLs as get_lineups_for_fixture (CACHE_TTL_FINISHED once
+    a finished match's lineups are in). Returns {fixture_id: lineups}.
+    """
+    fixture_ids = list(dict.fromkeys(fixture_ids))
+    payloads = await fetch_many("fixtures/lineups", [{"fixture": fid} for fid in fixture_ids],
+                                events_ttl(True) if finished else lineups_ttl, concurrency)
+    return dict(zip(fixture_ids, payloads))
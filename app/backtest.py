@@ -0,0 +1,319 @@
+import argparse
+import contextlib
+import json
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import repeat
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from .config import settings
+from .database import SessionLocal
+from .api_football import is_finished
+from .context import SignalContext
+from .history import HistoryIndex, RESULT_DELAY, league_table, parse_kickoff
+from .event_summary import EventSummary, summarize_events
+from .signals import SignalID, SIGNAL_REGISTRY
+from .vectorized import compute_vectorized
+from .fixture_store import load_match_records, load_fixture_details, import_league_season
+# app/backtest.py
+#
+# Replays the signal registry over stored seasons (match_records plus the
+# events/statistics in fixture_details) without any API calls. Every fixture
+# is computed as of its own kickoff: it only sees matches played before it.
+#
+#   python -m app.backtest --league 39 --league 140 --season 2024 [--import]
+
+# Signals whose inputs can be replayed (lineups are not stored historically)
+REPLAYABLE = [sig_id for sig_id, spec in SIGNAL_REGISTRY.items()
+              if not any(need.kind == "lineups" for need in spec.needs)]
+
+
+class Corpus:
+    """
+    Stored fixtures and their events/statistics, with a point-in-time index.
+    """
+
+    def __init__(self, fixtures: List[Dict[str, Any]], details: Dict[int, tuple]):
+        self.fixtures = {f["fixture"]["id"]: f for f in fixtures}
+        self.index = HistoryIndex(fixtures)
+        self.details = details
+        self._tables: Dict[Tuple[int, int, datetime], List[Dict[str, Any]]] = {}
+        self._summaries: Dict[int, Optional[EventSummary]] = {}
+
+    def events(self, fixture_id: int) -> List[Dict[str, Any]]:
+        return (self.details.get(fixture_id) or (None, None))[0] or []
+
+    def summary(self, fixture_id: int) -> Optional[EventSummary]:
+        if fixture_id not in self._summaries:
+            self._summaries[fixture_id] = summarize_events(self.fixtures[fixture_id], self.events(fixture_id))
+        return self._summaries[fixture_id]
+
+    def statistics(self, fixture_id: int) -> List[Dict[str, Any]]:
+        return (self.details.get(fixture_id) or (None, None))[1] or []
+
+    def table(self, league_id: int, season: int, as_of: datetime) -> List[Dict[str, Any]]:
+        """
+        League table as it stood at `as_of`, built from stored results.
+        """
+        key = (league_id, season, as_of)
+        if key not in self._tables:
+            played = self.index.league_before(league_id, season, as_of - RESULT_DELAY)
+            self._tables[key] = league_table(played, self.index.league_teams(league_id, season))
+        return self._tables[key]
+
+
+class ReplayContext(SignalContext):
+    """
+    SignalContext served from a Corpus as of one kickoff. Handlers already
+    read history as of their fixture's kickoff; nothing is ever fetched.
+    """
+
+    def __init__(self, corpus: Corpus, as_of: datetime):
+        super().__init__()
+        self.corpus = corpus
+        self.as_of = as_of
+        self.history = corpus.index
+
+    def standings(self, league_id, season):
+        return self.corpus.table(league_id, season, self.as_of)
+
+    def events(self, fixture):
+        return self.corpus.events(fixture["fixture"]["id"])
+
+    def summary(self, fixture):
+        return self.corpus.summary(fixture["fixture"]["id"])
+
+    def statistics(self, fixture):
+        return self.corpus.statistics(fixture["fixture"]["id"])
+
+    def lineups(self, fixture_id):
+        return []
+
+    # Everything is local already
+    def load_history(self, league_seasons): pass
+    def prefetch_standings(self, keys): pass
+    def prefetch_events(self, fixtures): pass
+    def prefetch_summaries(self, fixtures): pass
+    def prefetch_statistics(self, fixtures): pass
+    def prefetch_lineups(self, fixture_ids): pass
+
+
+def replay_fixture(fixture: Dict[str, Any]) -> SimpleNamespace:
+    """
+    The attributes handlers read from a Fixture row, for a stored API fixture.
+    """
+    return SimpleNamespace(
+        id=fixture["fixture"]["id"],
+        kickoff=parse_kickoff(fixture),
+        league_api_id=fixture["league"]["id"],
+        home_team_api_id=fixture["teams"]["home"]["id"],
+        away_team_api_id=fixture["teams"]["away"]["id"],
+        home_team=fixture["teams"]["home"].get("name"),
+        away_team=fixture["teams"]["away"].get("name"),
+    )
+
+
+# --- outcomes -----------------------------------------------------------------
+# What a "Y" predicts for the fixture itself; "N" predicts the opposite.
+# Each returns None when the stored data cannot settle it.
+
+def _goals(f) -> Tuple[int, int]:
+    return f["goals"]["home"], f["goals"]["away"]
+
+
+def _halftime_goals(f, events) -> Optional[bool]:
+    halftime = (f.get("score") or {}).get("halftime") or {}
+    if halftime.get("home") is None or halftime.get("away") is None:
+        return None
+    return halftime["home"] + halftime["away"] >= 1
+
+
+def _goal_by_30(f, events) -> Optional[bool]:
+    summary = summarize_events(f, events)
+    if summary is None:
+        return None
+    return summary.goals_between(1, 30) > 0
+
+
+OUTCOMES: Dict[SignalID, Tuple[str, Callable[[Dict[str, Any], list], Optional[bool]]]] = {
+    SignalID.FORM: ("home win", lambda f, ev: _goals(f)[0] > _goals(f)[1]),
+    SignalID.OVER15: ("2+ goals", lambda f, ev: sum(_goals(f)) >= 2),
+    SignalID.BTTS: ("both teams score", lambda f, ev: min(_goals(f)) > 0),
+    SignalID.HOME_AWAY_STRENGTH: ("home win", lambda f, ev: _goals(f)[0] > _goals(f)[1]),
+    SignalID.LEAGUE_STAKES: ("no draw", lambda f, ev: _goals(f)[0] != _goals(f)[1]),
+    SignalID.BOUNCE_BACK: ("home win", lambda f, ev: _goals(f)[0] > _goals(f)[1]),
+    SignalID.MOMENTUM_PRESSURE: ("home unbeaten", lambda f, ev: _goals(f)[0] >= _goals(f)[1]),
+    SignalID.FIRST_HALF_GOAL_TIMING: ("goal by 30'", _goal_by_30),
+    SignalID.FIRST_HALF_OVER05: ("1H goal", _halftime_goals),
+    SignalID.FAST_STARTERS: ("1H goal", _halftime_goals),
+    SignalID.HOME_PRESSURE_START: ("home win", lambda f, ev: _goals(f)[0] > _goals(f)[1]),
+    SignalID.XG_TOTAL: ("3+ goals", lambda f, ev: sum(_goals(f)) >= 3),
+}
+
+
+# --- workers ------------------------------------------------------------------
+
+_corpus: Optional[Corpus] = None
+
+
+def _init_worker(fixtures: List[Dict[str, Any]], details: Dict[int, tuple]) -> None:
+    global _corpus
+    _corpus = Corpus(fixtures, details)
+
+
+def _replay_chunk(kickoff_groups: List[List[int]], signal_ids: List[int]) -> List[tuple]:
+    """
+    Compute signals for groups of fixtures sharing a kickoff. Returns
+    (fixture_id, signal_id, status, value) rows; status "!" marks a handler error.
+    """
+    signal_ids = [SignalID(sig_id) for sig_id in signal_ids]
+    rows = []
+    # Handlers narrate every step; a season's worth of that is just noise here
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for fixture_ids in kickoff_groups:
+            fixtures = [replay_fixture(_corpus.fixtures[fid]) for fid in fixture_ids]
+            ctx = ReplayContext(_corpus, fixtures[0].kickoff)
+            precomputed = compute_vectorized(fixtures, ctx, signal_ids) if settings.SIGNAL_VECTORIZED else {}
+            for fx in fixtures:
+                results = precomputed.get(fx.id, {})
+                for sig_id in signal_ids:
+                    if sig_id in results:
+                        result = results[sig_id]
+                    else:
+                        try:
+                            result = SIGNAL_REGISTRY[sig_id].handler(fx, None, ctx)
+                        except Exception:
+                            rows.append((fx.id, int(sig_id), "!", None))
+                            continue
+                    status, value = (result[0], result[1]) if result is not None else ("-", None)
+                    rows.append((fx.id, int(sig_id), status, value))
+    return rows
+
+
+def _chunks(fixtures: List[Dict[str, Any]], n_chunks: int) -> List[List[List[int]]]:
+    # Fixtures sharing a kickoff share one ReplayContext, so keep them together
+    groups: Dict[datetime, List[int]] = defaultdict(list)
+    for f in fixtures:
+        groups[parse_kickoff(f)].append(f["fixture"]["id"])
+    chunks: List[List[List[int]]] = [[] for _ in range(max(1, min(n_chunks, len(groups))))]
+    for i, kickoff in enumerate(sorted(groups)):
+        chunks[i % len(chunks)].append(groups[kickoff])
+    return chunks
+
+
+# --- runner -------------------------------------------------------------------
+
+def score(rows: Iterable[tuple], fixtures: Dict[int, Dict[str, Any]], details: Dict[int, tuple]) -> Dict[str, Any]:
+    """
+    Hit rates per signal and status: a "Y" hits when the signal's outcome
+    happened, an "N" when it did not. Neutral rows report how often the
+    outcome happened anyway.
+    """
+    tally = defaultdict(lambda: defaultdict(lambda: {"n": 0, "scored": 0, "hits": 0}))
+    for fixture_id, sig_id, status, value in rows:
+        cell = tally[SignalID(sig_id)][status]
+        cell["n"] += 1
+        if status == "!" or SignalID(sig_id) not in OUTCOMES:
+            continue
+        events = (details.get(fixture_id) or (None, None))[0] or []
+        outcome = OUTCOMES[SignalID(sig_id)][1](fixtures[fixture_id], events)
+        if outcome is None:
+            continue
+        cell["scored"] += 1
+        cell["hits"] += int(outcome if status != "N" else not outcome)
+
+    report = {}
+    for sig_id in sorted(tally):
+        statuses = {}
+        for status, cell in sorted(tally[sig_id].items()):
+            cell = dict(cell)
+            if status in ("Y", "N"):
+                cell["hit_rate"] = round(cell["hits"] / cell["scored"], 3) if cell["scored"] else None
+            elif status == "-":
+                cell["outcome_rate"] = round(cell.pop("hits") / cell["scored"], 3) if cell["scored"] else None
+            statuses[status] = cell
+        scored = sum(c["scored"] for s, c in tally[sig_id].items() if s != "!")
+        happened = sum(c["hits"] if s != "N" else c["scored"] - c["hits"]
+                       for s, c in tally[sig_id].items() if s != "!")
+        report[sig_id.name] = {
+            "outcome": OUTCOMES.get(sig_id, ("-", None))[0],
+            "base_rate": round(happened / scored, 3) if scored else None,
+            "statuses": statuses,
+        }
+    return report
+
+
+def run_backtest(league_ids: Iterable[int], seasons: Iterable[int], signal_ids: Iterable[int] = None,
+                 workers: int = settings.BACKTEST_WORKERS, db_session=None) -> Dict[str, Any]:
+    """
+    Replay the given signals (default: every replayable one) over all finished
+    fixtures of the given leagues and seasons, across `workers` processes.
+    """
+    started = time.monotonic()
+    db = db_session or SessionLocal()
+    try:
+        fixtures = load_match_records(db, league_ids, seasons)
+        details = load_fixture_details(db, [f["fixture"]["id"] for f in fixtures])
+    finally:
+        if db_session is None:
+            db.close()
+    signal_ids = [int(s) for s in (signal_ids or REPLAYABLE)]
+    targets = [f for f in fixtures if is_finished(f)]
+    chunks = _chunks(targets, workers * 4)
+
+    if workers <= 1 or len(chunks) <= 1:
+        _init_worker(fixtures, details)
+        rows = [row for chunk in chunks for row in _replay_chunk(chunk, signal_ids)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(fixtures, details)) as pool:
+            rows = [row for chunk_rows in pool.map(_replay_chunk, chunks, repeat(signal_ids))
+                    for row in chunk_rows]
+
+    return {
+        "fixtures": len(targets),
+        "corpus": len(fixtures),
+        "seconds": round(time.monotonic() - started, 2),
+        "signals": score(rows, {f["fixture"]["id"]: f for f in fixtures}, details),
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [f"📊 Backtest: {report['fixtures']} fixtures ({report['corpus']} in corpus) in {report['seconds']}s"]
+    for name, sig in report["signals"].items():
+        base = "n/a" if sig["base_rate"] is None else f"{sig['base_rate']:.0%}"
+        lines.append(f"\n▶️  {name} — outcome: {sig['outcome']} (base rate {base})")
+        for status, cell in sig["statuses"].items():
+            rate = cell.get("hit_rate", cell.get("outcome_rate"))
+            rate = "n/a" if rate is None else f"{rate:.0%}"
+            label = {"Y": "hit rate", "N": "hit rate", "-": "outcome rate"}.get(status, "errors")
+            lines.append(f"   {status}: {cell['n']:>6} fixtures, {label} {rate} ({cell['scored']} scored)")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest signals over stored seasons")
+    parser.add_argument("--league", type=int, action="append", required=True)
+    parser.add_argument("--season", type=int, action="append", required=True)
+    parser.add_argument("--signal", type=int, action="append", help="signal ids (default: all replayable)")
+    parser.add_argument("--workers", type=int, default=settings.BACKTEST_WORKERS)
+    parser.add_argument("--import", dest="do_import", action="store_true",
+                        help="first fetch the league seasons into match_records (one API request each)")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    if args.do_import:
+        db = SessionLocal()
+        try:
+            for league_id in args.league:
+                for season in args.season:
+                    n = import_league_season(db, league_id, season)
+                    print(f"📥 League {league_id} season {season}: {n} fixtures stored")
+        finally:
+            db.close()
+
+    result = run_backtest(args.league, args.season, args.signal, args.workers)
+    print(json.dumps(result, indent=2) if args.json else format_report(result))
@@ -0,0 +1,225 @@
+import json
+import threading
+import time
+from collections import OrderedDict, Counter
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlencode
+from .config import settings
+# app/cache.py
+
+KEY_PREFIX = "apifootball:"
+STATS_KEY = KEY_PREFIX + "cache:stats"
+
+
+class LRUBackend:
+    """
+    In-process fallback store: bounded, thread-safe, least-recently-used eviction.
+    """
+
+    name = "memory"
+
+    def __init__(self, maxsize: int = 2048):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Tuple[str, Optional[float]]]" = OrderedDict()
+        self._stats: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and expires < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: Optional[int]) -> None:
+        expires = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, field: str) -> None:
+        with self._lock:
+            self._stats[field] += 1
+
+    def counters(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+
+class RedisBackend:
+    """
+    Shared store for every API and worker process. Eviction under memory
+    pressure is left to Redis (maxmemory-policy in docker-compose).
+    Redis errors are lookups that miss and writes that do nothing: an
+    outage costs API requests, never the calls themselves.
+    """
+
+    name = "redis"
+
+    def __init__(self, client):
+        import redis
+        self.client = client
+        self._errors = redis.RedisError
+        self._down = False
+
+    def _failed(self, exc: Exception) -> None:
+        # Once per outage, not per call
+        if not self._down:
+            self._down = True
+            print(f"⚠️ Redis cache unreachable ({exc}); serving API-Football uncached")
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            value = self.client.get(key)
+        except self._errors as exc:
+            self._failed(exc)
+            return None
+        self._down = False
+        return value
+
+    def set(self, key: str, value: str, ttl: Optional[int]) -> None:
+        try:
+            self.client.set(key, value, ex=ttl)
+        except self._errors as exc:
+            self._failed(exc)
+
+    def delete(self, key: str) -> None:
+        try:
+            self.client.delete(key)
+        except self._errors as exc:
+            self._failed(exc)
+
+    def incr(self, field: str) -> None:
+        try:
+            self.client.hincrby(STATS_KEY, field, 1)
+        except self._errors as exc:
+            self._failed(exc)
+
+    def counters(self) -> Dict[str, int]:
+        try:
+            raw = self.client.hgetall(STATS_KEY)
+        except self._errors as exc:
+            self._failed(exc)
+            return {}
+        return {k.decode() if isinstance(k, bytes) else k: int(v) for k, v in raw.items()}
+
+
+class ResponseCache:
+    """
+    TTL cache for API-Football "response" payloads, keyed by endpoint + params.
+
+    Entries outlive their TTL by `stale_grace` seconds so that, once the daily
+    quota is spent (403), callers can still be served the last known payload
+    instead of an empty list.
+    """
+
+    def __init__(self, backend, stale_grace: int = 86400):
+        self.backend = backend
+        self.stale_grace = stale_grace
+
+    @staticmethod
+    def key(endpoint: str, params: Dict[str, Any]) -> str:
+        return f"{KEY_PREFIX}{endpoint}?{urlencode(sorted(params.items()))}"
+
+    def get(self, endpoint: str, params: Dict[str, Any]) -> Tuple[Any, bool]:
+        """
+        Return (payload, fresh). payload is None on a miss; fresh is False for
+        an expired entry that is only kept as a quota fallback.
+        """
+        raw = self.backend.get(self.key(endpoint, params))
+        if raw is None:
+            self.backend.incr(f"{endpoint}:miss")
+            return None, False
+        entry = json.loads(raw)
+        fresh = entry["exp"] is None or entry["exp"] > time.time()
+        self.backend.incr(f"{endpoint}:{'hit' if fresh else 'miss'}")
+        return entry["v"], fresh
+
+    def set(self, endpoint: str, params: Dict[str, Any], payload: Any, ttl: Optional[int]) -> None:
+        """
+        Store a payload; ttl=None keeps it forever (immutable data).
+        """
+        entry = {"v": payload, "exp": time.time() + ttl if ttl else None}
+        self.backend.set(self.key(endpoint, params), json.dumps(entry),
+                         ttl + self.stale_grace if ttl else None)
+
+    def invalidate(self, endpoint: str, params: Dict[str, Any]) -> None:
+        self.backend.delete(self.key(endpoint, params))
+
+    def record_stale(self, endpoint: str) -> None:
+        self.backend.incr(f"{endpoint}:stale")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit/miss/stale counters per endpoint, plus the overall hit rate.
+        """
+        per_endpoint: Dict[str, Dict[str, int]] = {}
+        for field, count in self.backend.counters().items():
+            endpoint, _, kind = field.rpartition(":")
+            per_endpoint.setdefault(endpoint, {"hit": 0, "miss": 0, "stale": 0})[kind] = count
+        hits = sum(c["hit"] for c in per_endpoint.values())
+        misses = sum(c["miss"] for c in per_endpoint.values())
+        return {
+            "backend": self.backend.name,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+            "endpoints": per_endpoint,
+        }
+
+
+class NullCache(ResponseCache):
+    """
+    Cache that never stores anything (API_CACHE_BACKEND=none).
+    """
+
+    def __init__(self):
+        super().__init__(LRUBackend(maxsize=0), stale_grace=0)
+
+    def set(self, endpoint, params, payload, ttl):
+        pass
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """
+    Process-wide cache, built on first use: Redis when reachable, otherwise
+    the in-process LRU.
+    """
+    global _cache
+    if _cache is not None:
+        return _cache
+    with _cache_lock:
+        if _cache is not None:
+            return _cache
+        backend_name = settings.API_CACHE_BACKEND
+        if backend_name == "none":
+            _cache = NullCache()
+            return _cache
+        backend = None
+        if backend_name == "redis":
+            try:
+                import redis
+                client = redis.Redis.from_url(settings.REDIS_URL)
+                client.ping()
+                backend = RedisBackend(client)
+            except Exception as exc:
+                print(f"⚠️ Redis cache unavailable ({exc}); using in-process LRU cache")
+        if backend is None:
+            backend = LRUBackend(maxsize=settings.API_CACHE_MAX_ENTRIES)
+        _cache = ResponseCache(backend, stale_grace=settings.API_CACHE_STALE_GRACE)
+        return _cache
@@ -9,14 +9,104 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "postgresql://user:pass@db:5432/football")
+    # Async read endpoints (asyncpg); default: DATABASE_URL with the asyncpg driver
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")
+    ASYNC_DB_POOL_SIZE: int = int(os.getenv("ASYNC_DB_POOL_SIZE", "10"))
+    ASYNC_DB_MAX_OVERFLOW: int = 20
 
     # Celery
     CELERY_BROKER_URL: str = os.getenv("CELERY_BROKER_URL", "redis://redis:6379/0")
     CELERY_RESULT_BACKEND: str = CELERY_BROKER_URL
 
+    # Celery queues by kick-off proximity (app/queues.py)
+    QUEUE_KICKOFF_BEFORE: int = int(os.getenv("QUEUE_KICKOFF_BEFORE", "7200"))  # kickoff queue from T-2h ...
+    QUEUE_KICKOFF_AFTER: int = 3 * 3600        # ... until the match is over, seconds
+    QUEUE_BACKFILL_AFTER: int = int(os.getenv("QUEUE_BACKFILL_AFTER", "172800"))  # older fixtures are backfill
+    KICKOFF_WORKER_CONCURRENCY: int = int(os.getenv("KICKOFF_WORKER_CONCURRENCY", "2"))
+    MATCHDAY_WORKER_CONCURRENCY: int = int(os.getenv("MATCHDAY_WORKER_CONCURRENCY", "4"))
+    BACKFILL_WORKER_CONCURRENCY: int = int(os.getenv("BACKFILL_WORKER_CONCURRENCY", "2"))
+
     # API-Football
     API_FOOTBALL_KEY: str = os.getenv("API_FOOTBALL_KEY", "")
     API_FOOTBALL_BASE: str = "https://v3.football.api-sports.io/"
+    API_FOOTBALL_POOL_SIZE: int = int(os.getenv("API_FOOTBALL_POOL_SIZE", "10"))
+    API_FOOTBALL_CONNECT_TIMEOUT: float = 5.0
+    API_FOOTBALL_READ_TIMEOUT: float = 20.0
+    API_FOOTBALL_RETRIES: int = 3              # on 429 and 5xx responses
+    API_FOOTBALL_BACKOFF: float = 1.0          # seconds, doubled on each retry
+    API_FOOTBALL_CONCURRENCY: int = int(os.getenv("API_FOOTBALL_CONCURRENCY", "8"))  # async fan-out
+
+    # API-Football rate limiting, shared by all processes through REDIS_URL
+    API_FOOTBALL_RATE_PER_MINUTE: int = int(os.getenv("API_FOOTBALL_RATE_PER_MINUTE", "10"))
+    API_FOOTBALL_BURST: int = 5                # tokens available at once
+    API_FOOTBALL_DAILY_QUOTA: int = int(os.getenv("API_FOOTBALL_DAILY_QUOTA", "100"))  # until headers say otherwise
+    API_FOOTBALL_QUOTA_LOW_WATER: int = 25     # below this, spread the rest evenly until reset
+    API_FOOTBALL_QUOTA_RESERVE: int = 5        # never spend the last N requests
+    API_FOOTBALL_MAX_WAIT: float = 120.0       # longest a caller queues for a token
+    # Longest retry delay of a task out of API budget: later ETAs outlive the Redis
+    # broker's 1 h visibility timeout and are redelivered early
+    API_FOOTBALL_RETRY_MAX_COUNTDOWN: int = 1800  # seconds
+
+    # API-Football response cache ("redis", "memory" or "none")
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://redis:6379/1")
+    API_CACHE_BACKEND: str = os.getenv("API_CACHE_BACKEND", "redis")
+    API_CACHE_MAX_ENTRIES: int = 4096          # in-process LRU fallback size
+    API_CACHE_STALE_GRACE: int = 86400         # keep expired entries 1 day for 403 fallback
+    CACHE_TTL_FIXTURES: int = 3600             # team histories
+    CACHE_TTL_STANDINGS: int = 6 * 3600        # league tables move once per matchday
+    CACHE_TTL_EVENTS_LIVE: int = 300           # events of not-yet-finished fixtures
+    # Finished-match events/statistics/lineups; Postgres keeps them for good (app/fixture_store.py)
+    CACHE_TTL_FINISHED: int = int(os.getenv("CACHE_TTL_FINISHED", str(7 * 86400)))
+    CACHE_TTL_LINEUPS: int = 24 * 3600         # published lineups
+    CACHE_TTL_LINEUPS_EMPTY: int = 300         # not yet published: retry soon
+
+    # Handlers of one fixture run on this many threads (1 = serially)
+    SIGNAL_EXECUTOR_WORKERS: int = int(os.getenv("SIGNAL_EXECUTOR_WORKERS", "4"))
+    # History-only signals are computed for the whole batch with NumPy (app/vectorized.py)
+    SIGNAL_VECTORIZED: bool = os.getenv("SIGNAL_VECTORIZED", "true").lower() == "true"
+
+    # Backtests (app/backtest.py) replay fixtures across this many processes
+    BACKTEST_WORKERS: int = int(os.getenv("BACKTEST_WORKERS", str(os.cpu_count() or 1)))
+
+    # Scheduled league ingestion (app/ingest.py, run by Celery beat)
+    INGEST_LEAGUES: str = os.getenv("INGEST_LEAGUES", "")  # comma-separated ids; empty: no ingestion
+    INGEST_INTERVAL: int = int(os.getenv("INGEST_INTERVAL", "3600"))  # seconds between runs
+    # API-Football requests a run may spend on finished-match details; runs never
+    # take the daily budget below API_FOOTBALL_QUOTA_LOW_WATER (left to signal computation)
+    INGEST_DETAIL_BUDGET: int = int(os.getenv("INGEST_DETAIL_BUDGET", "15"))
+    INGEST_DETAIL_MAX_ATTEMPTS: int = 3        # empty answers before a match's detail is given up on
+    INGEST_DETAIL_RETRY_AFTER: int = 6 * 3600  # seconds before an empty answer is asked again
+    INGEST_LOOKAHEAD_DAYS: int = 7             # upcoming fixtures fetched each run
+    INGEST_PENDING_DAYS: int = 7               # matches unfinished for longer no longer hold the mark back
+    CACHE_TTL_INGEST: int = 300                # date-range fixture lists
+
+    # Lineup watcher (app/lineups.py): polls fixtures from T-60 to kick-off
+    LINEUP_WATCH_INTERVAL: int = int(os.getenv("LINEUP_WATCH_INTERVAL", "60"))  # beat period, seconds
+    LINEUP_POLL_MIN: int = 120                 # closest polls, seconds apart (near kick-off)
+    LINEUP_POLL_MAX: int = 900                 # widest gap between polls (at T-60)
+    LINEUP_MAX_POLLS: int = 12                 # per fixture
+
+    # GET /fixtures/{date} pages (keyset-paginated on kick-off, id)
+    FIXTURES_PAGE_SIZE: int = int(os.getenv("FIXTURES_PAGE_SIZE", "100"))
+    FIXTURES_PAGE_MAX: int = 500
+
+    # Cached read-endpoint responses (GET /fixtures...) in Redis (app/read_cache.py)
+    READ_CACHE_ENABLED: bool = os.getenv("READ_CACHE_ENABLED", "true").lower() == "true"
+    READ_CACHE_TTL: int = 3600                 # memory bound only; writes bump generations
+
+    # Live signal updates (app/streams.py): SSE and WebSocket
+    STREAM_HEARTBEAT: int = 15                 # seconds between keep-alives on an idle stream
+    STREAM_QUEUE_SIZE: int = 256               # messages buffered per client
+
+    # Repeat POST /compute/{fixture_id} requests for unchanged inputs share one task (app/dedup.py)
+    COMPUTE_DEDUP_WINDOW: int = int(os.getenv("COMPUTE_DEDUP_WINDOW", "300"))  # seconds
+
+    # Compute task progress (app/progress.py), reported to the Celery result backend
+    TASK_PROGRESS_INTERVAL: float = 1.0        # seconds between PROGRESS updates
+
+    # Signal result writes
+    SIGNAL_WRITE_BATCH: int = 5000             # rows per statement in batch runs
+    SIGNAL_COPY_THRESHOLD: int = 2000          # flushes this large go through COPY
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,338 @@
+import asyncio
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple, Any, Iterable
+from .config import settings
+from .api_football import (get_league_fixtures, get_fixture_events, get_fixture_statistics,
+                           get_standings, get_lineups_for_fixture, is_finished, select_active_group,
+                           select_last5)
+from .api_football_async import fetch_many, fetch_events_many, fetch_statistics_many, fetch_lineups_many
+from .fixture_store import (get_finished_fixture_events, get_finished_fixture_events_many,
+                            get_finished_fixture_statistics, get_finished_fixture_statistics_many,
+                            get_fixture_summaries_many, sync_league_season, load_match_records,
+                            get_stored_lineups_many, store_lineups)
+from .event_summary import EventSummary, summarize_events
+from .history import HistoryIndex
+from .standings import Positions, current_snapshots, position_map
+# app/context.py
+
+
+class MissingInput(LookupError):
+    """A handler read data its frozen context was not prepared with."""
+
+
+class SignalContext:
+    """
+    Per-computation cache of API-Football data shared by every signal handler.
+
+    Team histories come from a HistoryIndex of whole league seasons: each
+    (league, season) is loaded once (from match_records, refreshed when a
+    result is due, or in one API request without a database) and every
+    "last n played before kick-off" query is a binary search over it, so
+    results do not depend on when the computation runs.
+
+    A context can serve a single fixture or a whole matchday batch; the
+    prefetch_* methods load everything a batch needs in parallel bursts.
+    Once the planner has loaded a computation's inputs it freezes the
+    context: from then on it only serves what was loaded and raises
+    MissingInput instead of fetching.
+
+    Handlers may share a context from several threads: each key is fetched
+    by one thread while the others wait for its result, and the database
+    session is used by one thread at a time.
+    """
+
+    def __init__(self, db_session=None):
+        self.db = db_session
+        self.frozen = False
+        self.history = HistoryIndex()
+        self._league_seasons: Set[Tuple[int, int]] = set()
+        self._events: Dict[int, List[Dict[str, Any]]] = {}
+        self._statistics: Dict[int, List[Dict[str, Any]]] = {}
+        self._summaries: Dict[int, Optional[EventSummary]] = {}
+        self._lineups: Dict[int, List[Dict[str, Any]]] = {}
+        self._standings: Dict[Tuple[int, int], List[Dict[str, Any]]] = {}
+        self._positions: Dict[Tuple[int, int], Positions] = {}
+        self.api_calls = 0
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Any, threading.Lock] = {}
+        # Sessions are not thread-safe; prefetch bursts run one at a time
+        self._db_lock = threading.RLock()
+        self._prefetch_lock = threading.Lock()
+
+    def _lock_for(self, key) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _count_calls(self, n: int) -> None:
+        with self._lock:
+            self.api_calls += n
+
+    def _check_unfrozen(self, what: str) -> None:
+        if self.frozen:
+            raise MissingInput(f"{what} is not in the computation's fetch plan")
+
+    def freeze(self) -> "SignalContext":
+        """
+        Stop fetching: every later read must be served from what is loaded.
+        """
+        self.frozen = True
+        return self
+
+    def _load_league_season(self, league_id: int, season: int) -> None:
+        if self.db is not None:
+            with self._db_lock:
+                if sync_league_season(self.db, league_id, season):
+                    self._count_calls(1)
+                fixtures = load_match_records(self.db, [league_id], [season])
+        else:
+            fixtures = get_league_fixtures(league_id, season)
+            self._count_calls(1)
+        self.history.add(fixtures)
+
+    def load_history(self, league_seasons: Iterable[Tuple[int, int]]) -> None:
+        """
+        Load the fixtures of the given (league, season) pairs into the history index.
+        """
+        for key in dict.fromkeys(league_seasons):
+            if key in self._league_seasons:
+                continue
+            self._check_unfrozen(f"History of league season {key}")
+            with self._lock_for(("history", key)):
+                # Another thread may have loaded it while we waited
+                if key not in self._league_seasons:
+                    self._load_league_season(*key)
+                    self._league_seasons.add(key)
+
+    def last_n(self, team_id: int, league_id: int, season: int, n: Optional[int] = None,
+               before: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        The team's last n played fixtures (home OR away, all of them when n is
+        None) that kicked off before `before` (default: now), most recent first.
+        """
+        self.load_history([(league_id, season)])
+        return self.history.last_n_before(team_id, league_id, season, before or datetime.utcnow(), n)
+
+    def last5(self, team_id: int, league_id: int, season: int,
+              before: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        The team's last 5 played fixtures before `before`.
+        """
+        return self.last_n(team_id, league_id, season, 5, before)
+
+    def last5_home(self, team_id: int, league_id: int, season: int,
+                   before: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        The team's last 5 played home fixtures before `before`.
+        """
+        return select_last5(self.last_n(team_id, league_id, season, before=before), team_id, "home")
+
+    def last5_away(self, team_id: int, league_id: int, season: int,
+                   before: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        The team's last 5 played away fixtures before `before`.
+        """
+        return select_last5(self.last_n(team_id, league_id, season, before=before), team_id, "away")
+
+    def _load_snapshots(self, keys: List[Tuple[int, int]]) -> None:
+        with self._db_lock:
+            snapshots = current_snapshots(self.db, keys)
+        for key, snapshot in snapshots.items():
+            self._positions[key] = snapshot.positions()
+            self._standings[key] = snapshot.table
+
+    def standings(self, league_id: int, season: int) -> List[Dict[str, Any]]:
+        """
+        Active standings table of a league, loaded once per context: from its
+        stored snapshot when a database session is available.
+        """
+        key = (league_id, season)
+        if key not in self._standings:
+            self._check_unfrozen(f"Standings of {key}")
+            with self._lock_for(("standings", key)):
+                if key not in self._standings:
+                    if self.db is not None:
+                        self._load_snapshots([key])
+                    else:
+                        self._standings[key] = get_standings(league_id, season)
+        return self._standings[key]
+
+    def positions(self, league_id: int, season: int) -> Positions:
+        """
+        {team_id: (rank, played)} of the league's standings table.
+        """
+        key = (league_id, season)
+        if key not in self._positions:
+            table = self.standings(league_id, season)
+            self._positions.setdefault(key, position_map(table))
+        return self._positions[key]
+
+    def prefetch_standings(self, keys: Iterable[Tuple[int, int]]) -> None:
+        """
+        Load the standings of many (league, season) keys: stored snapshots in
+        one pass, the rest fetched in one parallel burst.
+        """
+        keys = list(dict.fromkeys(keys))
+        with self._prefetch_lock:
+            todo = [key for key in keys if key not in self._standings]
+            if not todo:
+                return
+            self._check_unfrozen(f"Standings of {todo[0]}")
+            if self.db is not None:
+                self._load_snapshots(todo)
+                return
+            params = [{"league": l, "season": s} for l, s in todo]
+            payloads = asyncio.run(fetch_many("standings", params, lambda payload: settings.CACHE_TTL_STANDINGS))
+            for key, data in zip(todo, payloads):
+                self._standings[key] = select_active_group(data)
+
+    def _fixture_data(self, memo, kind: str, fixture: Dict[str, Any], read_stored, fetch) -> List[Dict[str, Any]]:
+        # Per-fixture events/statistics: finished fixtures go through the Postgres store
+        fid = fixture["fixture"]["id"]
+        if fid not in memo:
+            self._check_unfrozen(f"{kind.capitalize()} of fixture {fid}")
+            with self._lock_for((kind, fid)):
+                if fid not in memo:
+                    if self.db is not None and is_finished(fixture):
+                        with self._db_lock:
+                            memo[fid] = read_stored(self.db, fid)
+                            self.db.commit()
+                    else:
+                        memo[fid] = fetch(fid, finished=is_finished(fixture))
+        return memo[fid]
+
+    def _prefetch_fixture_data(self, memo, kind: str, fixtures: List[Dict[str, Any]],
+                               read_stored_many, fetch_many_async) -> None:
+        with self._prefetch_lock:
+            todo = [f for f in fixtures if f["fixture"]["id"] not in memo]
+            if not todo:
+                return
+            self._check_unfrozen(f"{kind.capitalize()} of fixture {todo[0]['fixture']['id']}")
+            finished = [f["fixture"]["id"] for f in todo if is_finished(f)]
+            unfinished = [f["fixture"]["id"] for f in todo if not is_finished(f)]
+            if finished:
+                if self.db is not None:
+                    with self._db_lock:
+                        memo.update(read_stored_many(self.db, finished))
+                        self.db.commit()
+                else:
+                    memo.update(asyncio.run(fetch_many_async(finished, finished=True)))
+            if unfinished:
+                memo.update(asyncio.run(fetch_many_async(unfinished, finished=False)))
+
+    def events(self, fixture: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Events of a history fixture (an API fixture dict). Finished fixtures are
+        read through the Postgres store; each fixture is looked up once per context.
+        """
+        return self._fixture_data(self._events, "events", fixture,
+                                  get_finished_fixture_events, get_fixture_events)
+
+    def prefetch_events(self, fixtures: List[Dict[str, Any]]) -> None:
+        """
+        Load the events of all given history fixtures in one parallel burst
+        (stored rows in one query, the rest concurrently from the API), so the
+        per-fixture events() calls that follow are all memo hits.
+        """
+        self._prefetch_fixture_data(self._events, "events", fixtures,
+                                    get_finished_fixture_events_many, fetch_events_many)
+
+    def summary(self, fixture: Dict[str, Any]) -> Optional[EventSummary]:
+        """
+        Event summary of a history fixture (None without events): stored in
+        fixture_summaries for finished fixtures, else built from events().
+        """
+        fid = fixture["fixture"]["id"]
+        if fid not in self._summaries:
+            if fid in self._events:
+                self._summaries[fid] = summarize_events(fixture, self._events[fid])
+                return self._summaries[fid]
+            self._check_unfrozen(f"Event summary of fixture {fid}")
+            with self._lock_for(("summary", fid)):
+                if fid not in self._summaries:
+                    if self.db is not None and is_finished(fixture):
+                        with self._db_lock:
+                            self._summaries.update(get_fixture_summaries_many(self.db, [fixture]))
+                    else:
+                        self._summaries[fid] = summarize_events(fixture, self.events(fixture))
+        return self._summaries[fid]
+
+    def prefetch_summaries(self, fixtures: List[Dict[str, Any]]) -> None:
+        """
+        Load the event summaries of all given history fixtures: stored ones in
+        one query, the rest from their events (prefetched in one burst).
+        """
+        with self._prefetch_lock:
+            todo = [f for f in fixtures if f["fixture"]["id"] not in self._summaries]
+            if not todo:
+                return
+            self._check_unfrozen(f"Event summary of fixture {todo[0]['fixture']['id']}")
+            if self.db is not None:
+                finished = [f for f in todo if is_finished(f)]
+                if finished:
+                    with self._db_lock:
+                        self._summaries.update(get_fixture_summaries_many(self.db, finished))
+                todo = [f for f in todo if not is_finished(f)]
+        if todo:
+            self.prefetch_events(todo)
+            for f in todo:
+                self._summaries[f["fixture"]["id"]] = summarize_events(f, self._events.get(f["fixture"]["id"]))
+
+    def statistics(self, fixture: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Statistics of a history fixture, looked up like events().
+        """
+        return self._fixture_data(self._statistics, "statistics", fixture,
+                                  get_finished_fixture_statistics, get_fixture_statistics)
+
+    def prefetch_statistics(self, fixtures: List[Dict[str, Any]]) -> None:
+        """
+        Load the statistics of all given history fixtures in one parallel burst.
+        """
+        self._prefetch_fixture_data(self._statistics, "statistics", fixtures,
+                                    get_finished_fixture_statistics_many, fetch_statistics_many)
+
+    def lineups(self, fixture_id: int) -> List[Dict[str, Any]]:
+        """
+        Lineups of an upcoming fixture, loaded once per context: stored ones
+        (see app/lineups.py) first, else fetched and stored once published.
+        """
+        if fixture_id not in self._lineups:
+            self._check_unfrozen(f"Lineups of fixture {fixture_id}")
+            with self._lock_for(("lineups", fixture_id)):
+                if fixture_id not in self._lineups:
+                    if self.db is not None:
+                        with self._db_lock:
+                            self._lineups.update(get_stored_lineups_many(self.db, [fixture_id]))
+                    if fixture_id not in self._lineups:
+                        lineups = get_lineups_for_fixture(fixture_id)
+                        if self.db is not None:
+                            with self._db_lock:
+                                store_lineups(self.db, {fixture_id: lineups})
+                                self.db.commit()
+                        self._lineups[fixture_id] = lineups
+        return self._lineups[fixture_id]
+
+    def prefetch_lineups(self, fixture_ids: Iterable[int]) -> None:
+        """
+        Load the lineups of many fixtures: stored ones in one query, the rest
+        fetched in one parallel burst.
+        """
+        fixture_ids = list(dict.fromkeys(fixture_ids))
+        with self._prefetch_lock:
+            todo = [fid for fid in fixture_ids if fid not in self._lineups]
+            if not todo:
+                return
+            self._check_unfrozen(f"Lineups of fixture {todo[0]}")
+            if self.db is not None:
+                with self._db_lock:
+                    self._lineups.update(get_stored_lineups_many(self.db, todo))
+                todo = [fid for fid in todo if fid not in self._lineups]
+            if not todo:
+                return
+            fetched = asyncio.run(fetch_lineups_many(todo))
+            if self.db is not None:
+                with self._db_lock:
+                    store_lineups(self.db, fetched)
+                    self.db.commit()
+            self._lineups.update(fetched)
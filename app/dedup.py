@@ -0,0 +1,115 @@
+import hashlib
+import json
+import threading
+import uuid
+from typing import Any, Callable, Optional, Tuple
+from .config import settings
+# app/dedup.py
+#
+# Singleflight scheduling: requests for the same work (same key, e.g. fixture
+# + signals + input versions) within COMPUTE_DEDUP_WINDOW share one Celery
+# task. The first caller claims the key with SET NX and enqueues; the others
+# get the id of that task, whether it is still queued, running or done. A
+# failed task gives the key up to the next caller.
+
+KEY_PREFIX = "predictpro:singleflight:"
+# Celery states after which the work has to be done again
+FAILED_STATES = {"FAILURE", "REVOKED"}
+
+_client = None
+_client_lock = threading.Lock()
+_UNAVAILABLE = object()
+
+
+def _get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _UNAVAILABLE
+                try:
+                    import redis
+                    client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+                    client.ping()
+                    _client = client
+                except Exception as exc:
+                    print(f"⚠️ Task deduplication unavailable ({exc}); every request is enqueued")
+    return None if _client is _UNAVAILABLE else _client
+
+
+def work_key(kind: str, *parts: Any) -> str:
+    """
+    Key of a unit of work; the parts are digested, so they may be any JSON-able values.
+    """
+    digest = hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:20]
+    return f"{KEY_PREFIX}{kind}:{digest}"
+
+
+def _claim(client, key: str, expected: Optional[str], task_id: str, window: int) -> bool:
+    # Take the key over from a failed task, unless another caller already did
+    import redis
+    with client.pipeline() as pipe:
+        try:
+            pipe.watch(key)
+            if pipe.get(key) != expected:
+                return False
+            pipe.multi()
+            pipe.set(key, task_id, ex=window)
+            pipe.execute()
+            return True
+        except redis.WatchError:
+            return False
+
+
+def _claim_or_find(client, key: str, task_id: str, state_of: Callable[[str], str], window: int) -> Optional[str]:
+    # None once `key` is ours, else the id of the live task holding it.
+    # A few rounds cover keys expiring or being taken over between calls;
+    # past them the work is enqueued rather than the caller kept waiting
+    for _ in range(3):
+        if client.set(key, task_id, nx=True, ex=window):
+            return None
+        existing = client.get(key)
+        if existing is None:
+            continue
+        if state_of(existing) not in FAILED_STATES:
+            return existing
+        if _claim(client, key, existing, task_id, window):
+            return None
+    return None
+
+
+def submit_once(key: str, submit: Callable[[str], Any], state_of: Callable[[str], str],
+                window: int = None) -> Tuple[str, bool]:
+    """
+    Run submit(task_id) unless a task for `key` was submitted within the
+    window and has not failed (state_of gives a task id's Celery state).
+    Returns (task_id, submitted): the new task, or the one coalesced onto.
+    """
+    window = window or settings.COMPUTE_DEDUP_WINDOW
+    task_id = str(uuid.uuid4())
+    client = _get_client()
+    if client is None:
+        submit(task_id)
+        return task_id, True
+
+    try:
+        existing = _claim_or_find(client, key, task_id, state_of, window)
+    except Exception as exc:
+        # Redis went away after startup: enqueue rather than fail the request
+        print(f"⚠️ Task deduplication failed ({exc}); enqueueing")
+        submit(task_id)
+        return task_id, True
+    if existing is not None:
+        return existing, False
+    try:
+        submit(task_id)
+    except Exception:
+        # Nothing was enqueued: do not make later callers wait on a phantom task
+        try:
+            if client.get(key) == task_id:
+                client.delete(key)
+        except Exception:
+            pass
+        raise
+    return task_id, True
+
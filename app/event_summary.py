@@ -0,0 +1,92 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+# app/event_summary.py
+#
+# Per-fixture digest of an events list: goal minutes per side and red cards.
+# Computed once per finished fixture (and stored in fixture_summaries), so the
+# first-half signals scan a few small integers instead of raw event JSON.
+
+FIRST_HALF = (1, 45)
+RED_CARDS = {"red card", "second yellow card"}
+
+
+def _minute(event: Dict[str, Any]) -> Optional[int]:
+    # Stoppage time counts as its base minute (45+2 -> 45), as in the handlers
+    elapsed = event.get("time", {}).get("elapsed")
+    return elapsed if isinstance(elapsed, int) else None
+
+
+@dataclass(frozen=True)
+class EventSummary:
+    """Goal minutes (sorted) and red cards of each side of one fixture."""
+    home_team_id: int
+    away_team_id: int
+    home_goal_minutes: Tuple[int, ...] = ()
+    away_goal_minutes: Tuple[int, ...] = ()
+    home_red_cards: int = 0
+    away_red_cards: int = 0
+
+    def goal_minutes(self, team_id: int = None) -> Tuple[int, ...]:
+        """Minutes of one team's goals, or of every goal when team_id is None."""
+        if team_id == self.home_team_id:
+            return self.home_goal_minutes
+        if team_id == self.away_team_id:
+            return self.away_goal_minutes
+        if team_id is None:
+            return tuple(sorted(self.home_goal_minutes + self.away_goal_minutes))
+        return ()
+
+    def goals_between(self, start: int, end: int, team_id: int = None) -> int:
+        """Goals scored from minute `start` to `end` inclusive (by team_id, if given)."""
+        return sum(1 for m in self.goal_minutes(team_id) if start <= m <= end)
+
+    def conceded_between(self, start: int, end: int, team_id: int) -> int:
+        """Goals the opponent of team_id scored from `start` to `end`."""
+        opponent = self.away_team_id if team_id == self.home_team_id else self.home_team_id
+        return self.goals_between(start, end, opponent)
+
+    @property
+    def first_goal_minute(self) -> Optional[int]:
+        minutes = self.goal_minutes()
+        return minutes[0] if minutes else None
+
+    @property
+    def home_1h_goals(self) -> int:
+        return self.goals_between(*FIRST_HALF, self.home_team_id)
+
+    @property
+    def away_1h_goals(self) -> int:
+        return self.goals_between(*FIRST_HALF, self.away_team_id)
+
+
+def summarize_events(fixture: Dict[str, Any], events: List[Dict[str, Any]]) -> Optional[EventSummary]:
+    """
+    Summarise a fixture's events (fixtures/events "response" list). Returns
+    None when there are no events, which the signals treat as missing data.
+    Missed penalties are not goals.
+    """
+    if not events:
+        return None
+    home_id = fixture["teams"]["home"]["id"]
+    away_id = fixture["teams"]["away"]["id"]
+    goals = {home_id: [], away_id: []}
+    reds = {home_id: 0, away_id: 0}
+    for event in events:
+        team_id = event.get("team", {}).get("id")
+        if team_id not in goals:
+            continue
+        detail = (event.get("detail") or "").lower()
+        if event.get("type") == "Goal" and detail != "missed penalty":
+            minute = _minute(event)
+            if minute is not None:
+                goals[team_id].append(minute)
+        elif event.get("type") == "Card" and detail in RED_CARDS:
+            reds[team_id] += 1
+    return EventSummary(
+        home_team_id=home_id,
+        away_team_id=away_id,
+        home_goal_minutes=tuple(sorted(goals[home_id])),
+        away_goal_minutes=tuple(sorted(goals[away_id])),
+        home_red_cards=reds[home_id],
+        away_red_cards=reds[away_id],
+    )
@@ -0,0 +1,411 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Iterable, Optional, Set
+from sqlalchemy import or_
+from sqlalchemy.dialects.postgresql import insert
+from .config import settings
+from .models import DetailAttempt, Fixture, FixtureDetail, FixtureSummary, IngestState, MatchRecord
+from .api_football import get_fixture_events, get_fixture_statistics, get_league_fixtures, TERMINAL_STATUSES
+from .history import parse_kickoff, RESULT_DELAY
+from .event_summary import EventSummary, summarize_events
+from .api_football_async import fetch_events_many, fetch_statistics_many, fetch_lineups_many
+# app/fixture_store.py
+#
+# Events, statistics and lineups of a finished match never change, so they are
+# fetched from API-Football once and every later read is served from Postgres.
+# fixture_summaries keeps the digest of each stored events list.
+# match_records keeps the fixtures themselves, as a local corpus for replays.
+# Details are written one multi-row upsert per burst and only flushed: the
+# caller commits, once per burst rather than once per fixture.
+
+MATCH_RECORD_CHUNK = 1000
+
+
+def _save(db_session, column: str, payloads: Dict[int, List[Dict[str, Any]]]) -> None:
+    """
+    Insert the fixtures' rows, or fill in `column` where a row exists, in
+    MATCH_RECORD_CHUNK-row statements. Concurrent workers may race on the
+    same fixture; the upsert makes that safe. Flushed, not committed.
+    """
+    now = datetime.utcnow()
+    rows = [{"fixture_id": fid, "fetched_at": now, column: payload} for fid, payload in payloads.items()]
+    for start in range(0, len(rows), MATCH_RECORD_CHUNK):
+        stmt = insert(FixtureDetail).values(rows[start:start + MATCH_RECORD_CHUNK])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["fixture_id"],
+            set_={column: stmt.excluded[column]}
+        )
+        db_session.execute(stmt)
+    db_session.flush()
+
+
+def get_finished_fixture_events(db_session, fixture_id: int) -> List[Dict[str, Any]]:
+    """
+    Events of a finished fixture: from the local store, or fetched and stored
+    on first sight. Empty responses are not stored so they are retried later.
+    """
+    row = db_session.get(FixtureDetail, fixture_id)
+    if row is not None and row.events is not None:
+        return row.events
+
+    events = get_fixture_events(fixture_id, finished=True)
+    if events:
+        _save(db_session, "events", {fixture_id: events})
+    return events
+
+
+def _get_many(db_session, fixture_ids: Iterable[int], column: str, fetch_many) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    One query for the fixtures whose `column` is stored, then one concurrent
+    API burst (fetch_many) for the rest, which are stored when non-empty
+    (empty answers are counted in fixture_detail_attempts).
+    """
+    fixture_ids = list(dict.fromkeys(fixture_ids))
+    stored = getattr(FixtureDetail, column)
+    rows = db_session.query(FixtureDetail.fixture_id, stored).filter(
+        FixtureDetail.fixture_id.in_(fixture_ids),
+        stored.isnot(None),
+    ).all() if fixture_ids else []
+    results = {fid: value for fid, value in rows}
+
+    missing = [fid for fid in fixture_ids if fid not in results]
+    if missing:
+        fetched = asyncio.run(fetch_many(missing, finished=True))
+        _save(db_session, column, {fid: payload for fid, payload in fetched.items() if payload})
+        _record_empty(db_session, [fid for fid, payload in fetched.items() if not payload], column)
+        results.update(fetched)
+    return results
+
+
+def _record_empty(db_session, fixture_ids: List[int], column: str) -> None:
+    # One more empty answer for each fixture's `column`
+    if not fixture_ids:
+        return
+    now = datetime.utcnow()
+    stmt = insert(DetailAttempt).values([
+        {"fixture_id": fid, "detail": column, "attempts": 1, "last_attempt_at": now} for fid in fixture_ids
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["fixture_id", "detail"],
+        set_={"attempts": DetailAttempt.attempts + 1, "last_attempt_at": stmt.excluded.last_attempt_at}
+    )
+    db_session.execute(stmt)
+    db_session.flush()
+
+
+def get_finished_fixture_events_many(db_session, fixture_ids: Iterable[int]) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Bulk variant of get_finished_fixture_events: one query for the stored
+    fixtures, then one concurrent API burst for the rest, which are stored.
+    """
+    return _get_many(db_session, fixture_ids, "events", fetch_events_many)
+
+
+def get_finished_fixture_statistics(db_session, fixture_id: int) -> List[Dict[str, Any]]:
+    """
+    Statistics of a finished fixture: from the local store, or fetched and
+    stored on first sight.
+    """
+    row = db_session.get(FixtureDetail, fixture_id)
+    if row is not None and row.statistics is not None:
+        return row.statistics
+
+    statistics = get_fixture_statistics(fixture_id, finished=True)
+    if statistics:
+        _save(db_session, "statistics", {fixture_id: statistics})
+    return statistics
+
+
+def get_finished_fixture_statistics_many(db_session, fixture_ids: Iterable[int]) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Bulk variant of get_finished_fixture_statistics.
+    """
+    return _get_many(db_session, fixture_ids, "statistics", fetch_statistics_many)
+
+
+def get_finished_fixture_lineups_many(db_session, fixture_ids: Iterable[int]) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Lineups of many finished fixtures, stored like events and statistics.
+    """
+    return _get_many(db_session, fixture_ids, "lineups", fetch_lineups_many)
+
+
+def get_stored_lineups_many(db_session, fixture_ids: Iterable[int]) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Stored lineups of any fixtures (finished, or upcoming once published).
+    Nothing is fetched.
+    """
+    fixture_ids = list(dict.fromkeys(fixture_ids))
+    rows = db_session.query(FixtureDetail.fixture_id, FixtureDetail.lineups).filter(
+        FixtureDetail.fixture_id.in_(fixture_ids),
+        FixtureDetail.lineups.isnot(None),
+    ).all() if fixture_ids else []
+    return {fid: lineups for fid, lineups in rows}
+
+
+def store_lineups(db_session, lineups: Dict[int, List[Dict[str, Any]]]) -> int:
+    """
+    Store published (non-empty) lineups; they do not change once announced.
+    """
+    published = {fid: payload for fid, payload in lineups.items() if payload}
+    _save(db_session, "lineups", published)
+    return len(published)
+
+
+DETAIL_FETCHERS = {
+    "events": fetch_events_many,
+    "statistics": fetch_statistics_many,
+    "lineups": fetch_lineups_many,
+}
+
+
+def stored_detail_ids(db_session, fixture_ids: Iterable[int], column: str) -> Set[int]:
+    """
+    Those of the given fixtures whose `column` (events, statistics, lineups) is stored.
+    """
+    fixture_ids = list(fixture_ids)
+    if not fixture_ids:
+        return set()
+    stored = getattr(FixtureDetail, column)
+    return {fid for (fid,) in db_session.query(FixtureDetail.fixture_id).filter(
+        FixtureDetail.fixture_id.in_(fixture_ids),
+        stored.isnot(None),
+    )}
+
+
+def deferred_detail_ids(db_session, fixture_ids: Iterable[int], column: str, now: datetime = None) -> Set[int]:
+    """
+    Those of the given fixtures whose `column` came back empty
+    INGEST_DETAIL_MAX_ATTEMPTS times, or less than INGEST_DETAIL_RETRY_AFTER ago.
+    """
+    fixture_ids = list(fixture_ids)
+    if not fixture_ids:
+        return set()
+    now = now or datetime.utcnow()
+    return {fid for (fid,) in db_session.query(DetailAttempt.fixture_id).filter(
+        DetailAttempt.fixture_id.in_(fixture_ids),
+        DetailAttempt.detail == column,
+        or_(DetailAttempt.attempts >= settings.INGEST_DETAIL_MAX_ATTEMPTS,
+            DetailAttempt.last_attempt_at > now - timedelta(seconds=settings.INGEST_DETAIL_RETRY_AFTER)),
+    )}
+
+
+def store_finished_details(db_session, fixture_ids: Iterable[int], budget: int = None) -> Dict[str, int]:
+    """
+    Fetch and store whatever events, statistics and lineups of the given
+    finished fixtures are not stored yet, except those deferred after empty
+    answers. With a budget (requests), fixtures are taken in the given order
+    until it is spent; the rest are skipped. Returns {column: fixtures requested}.
+    """
+    fixture_ids = list(dict.fromkeys(fixture_ids))
+    missing = {}
+    for column in DETAIL_FETCHERS:
+        skip = stored_detail_ids(db_session, fixture_ids, column) | deferred_detail_ids(db_session, fixture_ids, column)
+        missing[column] = [fid for fid in fixture_ids if fid not in skip]
+
+    if budget is not None:
+        chosen, spent = set(), 0
+        for fid in fixture_ids:
+            cost = sum(fid in ids for ids in missing.values())
+            if spent + cost > budget:
+                break
+            chosen.add(fid)
+            spent += cost
+        missing = {column: [fid for fid in ids if fid in chosen] for column, ids in missing.items()}
+
+    for column, fetch_many in DETAIL_FETCHERS.items():
+        if missing[column]:
+            _get_many(db_session, missing[column], column, fetch_many)
+            # Keep each burst even if a later one runs out of API budget
+            db_session.commit()
+    return {column: len(ids) for column, ids in missing.items()}
+
+
+def _summary_row(fixture_id: int, summary: EventSummary) -> Dict[str, Any]:
+    return {
+        "fixture_id": fixture_id,
+        "home_team_id": summary.home_team_id,
+        "away_team_id": summary.away_team_id,
+        "home_goal_minutes": list(summary.home_goal_minutes),
+        "away_goal_minutes": list(summary.away_goal_minutes),
+        "first_goal_minute": summary.first_goal_minute,
+        "home_1h_goals": summary.home_1h_goals,
+        "away_1h_goals": summary.away_1h_goals,
+        "home_red_cards": summary.home_red_cards,
+        "away_red_cards": summary.away_red_cards,
+        "computed_at": datetime.utcnow(),
+    }
+
+
+def _summary_from_row(row: FixtureSummary) -> EventSummary:
+    return EventSummary(
+        home_team_id=row.home_team_id,
+        away_team_id=row.away_team_id,
+        home_goal_minutes=tuple(row.home_goal_minutes),
+        away_goal_minutes=tuple(row.away_goal_minutes),
+        home_red_cards=row.home_red_cards,
+        away_red_cards=row.away_red_cards,
+    )
+
+
+def get_fixture_summaries_many(db_session, fixtures: Iterable[Dict[str, Any]]) -> Dict[int, Optional[EventSummary]]:
+    """
+    Event summaries of many finished fixtures (API fixture dicts): stored ones
+    in one query, the rest summarised from their events (read or fetched
+    through the store) and stored. None where no events are available yet.
+    """
+    fixtures = {f["fixture"]["id"]: f for f in fixtures}
+    rows = db_session.query(FixtureSummary).filter(
+        FixtureSummary.fixture_id.in_(list(fixtures))
+    ).all() if fixtures else []
+    results: Dict[int, Optional[EventSummary]] = {row.fixture_id: _summary_from_row(row) for row in rows}
+
+    missing = [fid for fid in fixtures if fid not in results]
+    if missing:
+        events = get_finished_fixture_events_many(db_session, missing)
+        new_rows = []
+        for fid in missing:
+            results[fid] = summarize_events(fixtures[fid], events.get(fid))
+            if results[fid] is not None:
+                new_rows.append(_summary_row(fid, results[fid]))
+        if new_rows:
+            stmt = insert(FixtureSummary).values(new_rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["fixture_id"],
+                set_={col: stmt.excluded[col] for col in new_rows[0] if col != "fixture_id"}
+            )
+            db_session.execute(stmt)
+        # The events stored on the way, and the summaries
+        db_session.commit()
+    return results
+
+
+def match_record_row(fixture: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    MatchRecord column values for an API fixture dict.
+    """
+    return {
+        "id": fixture["fixture"]["id"],
+        "league_id": fixture["league"]["id"],
+        "season": fixture["league"]["season"],
+        "kickoff": parse_kickoff(fixture),
+        "home_team_id": fixture["teams"]["home"]["id"],
+        "away_team_id": fixture["teams"]["away"]["id"],
+        "home_goals": fixture["goals"]["home"],
+        "away_goals": fixture["goals"]["away"],
+        "status": fixture["fixture"]["status"]["short"],
+        "payload": fixture,
+        "updated_at": datetime.utcnow(),
+    }
+
+
+def _upsert_rows(db_session, model, rows: List[Dict[str, Any]]) -> int:
+    # Chunked multi-row upsert on the primary key; the last row of an id wins
+    rows = list({row["id"]: row for row in rows}.values())
+    for start in range(0, len(rows), MATCH_RECORD_CHUNK):
+        stmt = insert(model).values(rows[start:start + MATCH_RECORD_CHUNK])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["id"],
+            set_={col: stmt.excluded[col] for col in rows[0] if col != "id"}
+        )
+        db_session.execute(stmt)
+    db_session.commit()
+    return len(rows)
+
+
+def store_match_records(db_session, fixtures: Iterable[Dict[str, Any]]) -> int:
+    """
+    Upsert API fixture dicts into match_records, MATCH_RECORD_CHUNK rows per
+    statement. Returns the number of fixtures written.
+    """
+    return _upsert_rows(db_session, MatchRecord, [match_record_row(f) for f in fixtures])
+
+
+def fixture_row(fixture: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fixture (the app's fixtures table) column values for an API fixture dict.
+    """
+    return {
+        "id": fixture["fixture"]["id"],
+        "competition": fixture["league"].get("name") or str(fixture["league"]["id"]),
+        "season": str(fixture["league"]["season"]),
+        "kickoff": parse_kickoff(fixture),
+        "home_team": fixture["teams"]["home"]["name"],
+        "away_team": fixture["teams"]["away"]["name"],
+        "home_team_api_id": fixture["teams"]["home"]["id"],
+        "away_team_api_id": fixture["teams"]["away"]["id"],
+        "league_api_id": fixture["league"]["id"],
+    }
+
+
+def store_fixtures(db_session, fixtures: Iterable[Dict[str, Any]]) -> int:
+    """
+    Upsert API fixture dicts into the fixtures table (new matches, reschedules).
+    """
+    return _upsert_rows(db_session, Fixture, [fixture_row(f) for f in fixtures])
+
+
+def import_league_season(db_session, league_id: int, season: int) -> int:
+    """
+    Fetch a whole league season (one API request) into match_records.
+    """
+    return store_match_records(db_session, get_league_fixtures(league_id, season))
+
+
+def league_season_stale(db_session, league_id: int, season: int, now: datetime = None) -> bool:
+    """
+    Whether match_records may be missing results for a league season: it was
+    never imported, or a stored match should be over but is not final yet.
+    League seasons the ingestion pipeline ran on within the last two
+    INGEST_INTERVALs are kept up to date by it, so never stale.
+    """
+    now = now or datetime.utcnow()
+    state = db_session.get(IngestState, (league_id, season))
+    if state is not None and now - state.last_run_at < timedelta(seconds=2 * settings.INGEST_INTERVAL):
+        return False
+    base = db_session.query(MatchRecord.id).filter(MatchRecord.league_id == league_id,
+                                                   MatchRecord.season == season)
+    if base.first() is None:
+        return True
+    pending = base.filter(MatchRecord.kickoff < now - RESULT_DELAY,
+                          MatchRecord.status.notin_(TERMINAL_STATUSES))
+    return pending.first() is not None
+
+
+def sync_league_season(db_session, league_id: int, season: int) -> bool:
+    """
+    Re-import a league season if it is stale. Returns True if it was fetched.
+    Postponed matches keep it stale; the response cache TTL bounds the refetches.
+    """
+    if not league_season_stale(db_session, league_id, season):
+        return False
+    import_league_season(db_session, league_id, season)
+    return True
+
+
+def load_match_records(db_session, league_ids: Iterable[int] = None,
+                       seasons: Iterable[int] = None) -> List[Dict[str, Any]]:
+    """
+    Stored fixtures (API dicts) of the given leagues and seasons, in kickoff order.
+    """
+    query = db_session.query(MatchRecord.payload)
+    if league_ids:
+        query = query.filter(MatchRecord.league_id.in_(list(league_ids)))
+    if seasons:
+        query = query.filter(MatchRecord.season.in_(list(seasons)))
+    return [payload for (payload,) in query.order_by(MatchRecord.kickoff, MatchRecord.id)]
+
+
+def load_fixture_details(db_session, fixture_ids: Iterable[int]) -> Dict[int, tuple]:
+    """
+    Stored events/statistics of many fixtures, {fixture_id: (events, statistics)}.
+    Nothing is fetched.
+    """
+    fixture_ids = list(fixture_ids)
+    details = {}
+    for start in range(0, len(fixture_ids), MATCH_RECORD_CHUNK * 10):
+        rows = db_session.query(FixtureDetail.fixture_id, FixtureDetail.events, FixtureDetail.statistics).filter(
+            FixtureDetail.fixture_id.in_(fixture_ids[start:start + MATCH_RECORD_CHUNK * 10])
+        )
+        details.update({fid: (events, statistics) for fid, events, statistics in rows})
+    return details
@@ -0,0 +1,171 @@
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from .api_football import is_played
+# app/history.py
+#
+# Point-in-time view of fixture history: "the last n matches of team X before
+# time T" answered by binary search over kickoff-sorted lists, instead of the
+# API's `last=n`, which is always relative to now.
+
+Key = Tuple[int, int, int]   # (team, league, season)
+
+# A match's result is taken as known this long after its kickoff
+RESULT_DELAY = timedelta(hours=2)
+
+
+def parse_kickoff(fixture: Dict[str, Any]) -> datetime:
+    """
+    Kickoff of an API fixture dict as a naive UTC datetime (how Fixture.kickoff is stored).
+    """
+    kickoff = datetime.fromisoformat(fixture["fixture"]["date"])
+    if kickoff.tzinfo is not None:
+        kickoff = kickoff.astimezone(timezone.utc).replace(tzinfo=None)
+    return kickoff
+
+
+def fixture_season(fixture: Dict[str, Any]) -> int:
+    return fixture["league"]["season"]
+
+
+class _Timeline:
+    """Fixtures of one key in kickoff order, with the played ones indexed separately."""
+
+    def __init__(self):
+        self.kickoffs: List[Tuple[datetime, int]] = []
+        self.fixtures: List[Dict[str, Any]] = []
+        self.played_kickoffs: List[Tuple[datetime, int]] = []
+        self.played: List[Dict[str, Any]] = []
+        self._sort_keys: Dict[int, Tuple[datetime, int]] = {}
+
+    @staticmethod
+    def _put(kickoffs, fixtures, sort_key, fixture) -> None:
+        i = bisect_left(kickoffs, sort_key)
+        if i < len(kickoffs) and kickoffs[i] == sort_key:
+            fixtures[i] = fixture
+        else:
+            kickoffs.insert(i, sort_key)
+            fixtures.insert(i, fixture)
+
+    @staticmethod
+    def _drop(kickoffs, fixtures, sort_key) -> None:
+        i = bisect_left(kickoffs, sort_key)
+        if i < len(kickoffs) and kickoffs[i] == sort_key:
+            del kickoffs[i], fixtures[i]
+
+    def put(self, fixture: Dict[str, Any]) -> None:
+        # Ties on kickoff are broken by fixture id so re-adding a fixture replaces it
+        fid = fixture["fixture"]["id"]
+        sort_key = (parse_kickoff(fixture), fid)
+        old = self._sort_keys.get(fid)
+        if old is not None and old != sort_key:
+            # Rescheduled: remove it from its old slot
+            self._drop(self.kickoffs, self.fixtures, old)
+            self._drop(self.played_kickoffs, self.played, old)
+        self._sort_keys[fid] = sort_key
+        self._put(self.kickoffs, self.fixtures, sort_key, fixture)
+        if is_played(fixture):
+            self._put(self.played_kickoffs, self.played, sort_key, fixture)
+        else:
+            self._drop(self.played_kickoffs, self.played, sort_key)
+
+    def before(self, t: datetime, n: Optional[int], played: bool) -> List[Dict[str, Any]]:
+        kickoffs, fixtures = (self.played_kickoffs, self.played) if played else (self.kickoffs, self.fixtures)
+        end = bisect_left(kickoffs, (t,))
+        start = 0 if n is None else max(0, end - n)
+        return fixtures[start:end][::-1]
+
+
+class HistoryIndex:
+    """
+    Fixtures indexed by (team, league, season) and by (league, season), each
+    sorted by kickoff. Queries return API fixture dicts most-recent-first,
+    like the API's `last=n`, but relative to any point in time.
+    """
+
+    def __init__(self, fixtures: Iterable[Dict[str, Any]] = ()):
+        self._teams: Dict[Key, _Timeline] = {}
+        self._leagues: Dict[Tuple[int, int], _Timeline] = {}
+        self.add(fixtures)
+
+    def add(self, fixtures: Iterable[Dict[str, Any]]) -> None:
+        """
+        Add or replace fixtures (API fixture dicts).
+        """
+        for f in fixtures:
+            league, season = f["league"]["id"], fixture_season(f)
+            self._leagues.setdefault((league, season), _Timeline()).put(f)
+            for side in ("home", "away"):
+                key = (f["teams"][side]["id"], league, season)
+                self._teams.setdefault(key, _Timeline()).put(f)
+
+    def __contains__(self, key: Key) -> bool:
+        return key in self._teams
+
+    def last_n_before(self, team_id: int, league_id: int, season: int, before: datetime,
+                      n: Optional[int] = None, played: bool = True) -> List[Dict[str, Any]]:
+        """
+        The team's last n fixtures that kicked off before `before`, most recent
+        first. With played=True (default) unplayed ones (postponed, abandoned)
+        are skipped, so no over-fetching is needed.
+        """
+        timeline = self._teams.get((team_id, league_id, season))
+        return timeline.before(before, n, played) if timeline else []
+
+    def league_before(self, league_id: int, season: int, before: datetime,
+                      played: bool = True) -> List[Dict[str, Any]]:
+        """
+        All fixtures of a league season that kicked off before `before`, most recent first.
+        """
+        timeline = self._leagues.get((league_id, season))
+        return timeline.before(before, None, played) if timeline else []
+
+    def league_teams(self, league_id: int, season: int) -> Dict[int, str]:
+        """
+        {team_id: name} of every team with a fixture in the league season.
+        """
+        timeline = self._leagues.get((league_id, season))
+        teams: Dict[int, str] = {}
+        for f in timeline.fixtures if timeline else []:
+            for side in ("home", "away"):
+                teams[f["teams"][side]["id"]] = f["teams"][side].get("name")
+        return teams
+
+
+def league_table(fixtures: Iterable[Dict[str, Any]], teams: Dict[int, str]) -> List[Dict[str, Any]]:
+    """
+    Build a standings group, shaped like the API's, from played fixtures:
+    3 points a win, ranked by points, goal difference, then goals scored.
+    Every team in `teams` is listed, including those yet to play.
+    """
+    rows = {
+        team_id: {"team": {"id": team_id, "name": name}, "points": 0, "goalsDiff": 0,
+                  "all": {"played": 0, "win": 0, "draw": 0, "lose": 0, "goals": {"for": 0, "against": 0}}}
+        for team_id, name in teams.items()
+    }
+    for f in fixtures:
+        if not is_played(f):
+            continue
+        for side, other in (("home", "away"), ("away", "home")):
+            row = rows.get(f["teams"][side]["id"])
+            if row is None:
+                continue
+            scored, conceded = f["goals"][side], f["goals"][other]
+            stats = row["all"]
+            stats["played"] += 1
+            stats["goals"]["for"] += scored
+            stats["goals"]["against"] += conceded
+            if scored > conceded:
+                stats["win"] += 1
+                row["points"] += 3
+            elif scored == conceded:
+                stats["draw"] += 1
+                row["points"] += 1
+            else:
+                stats["lose"] += 1
+            row["goalsDiff"] = stats["goals"]["for"] - stats["goals"]["against"]
+
+    table = sorted(rows.values(), key=lambda r: (-r["points"], -r["goalsDiff"], -r["all"]["goals"]["for"]))
+    for rank, row in enumerate(table, 1):
+        row["rank"] = rank
+    return table
@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from .config import settings
+from .models import IngestState, MatchRecord
+from .api_football import TERMINAL_STATUSES, get_league_fixtures, infer_season, is_finished
+from .fixture_store import (store_fixtures, store_match_records, store_finished_details,
+                            stored_detail_ids, get_fixture_summaries_many)
+from .standings import current_snapshots
+from .history import parse_kickoff
+from .read_cache import invalidate_fixtures
+from .rate_limit import get_rate_limiter
+# app/ingest.py
+#
+# Scheduled ingestion: Celery beat runs ingest_league for every league listed
+# in INGEST_LEAGUES (none by default: ingestion spends the shared API budget).
+# Each run fetches the league's fixtures from its high-water mark to a week
+# ahead in one request, upserts them into fixtures and match_records, and
+# stores the events, statistics and lineups of newly finished matches once.
+# The league table is re-fetched only when one of its matches has finished.
+# Runs stay above API_FOOTBALL_QUOTA_LOW_WATER so computation keeps headroom;
+# details left out are fetched on demand when a signal needs them.
+# Signal computation then reads everything it needs from Postgres.
+
+
+def tracked_leagues() -> List[int]:
+    """
+    Leagues to ingest: those listed in INGEST_LEAGUES, none if it is empty.
+    """
+    return [int(x) for x in settings.INGEST_LEAGUES.split(",") if x.strip()]
+
+
+def spare_requests() -> int:
+    """
+    API-Football requests ingestion may spend now: today's remaining budget
+    down to API_FOOTBALL_QUOTA_LOW_WATER.
+    """
+    remaining = get_rate_limiter().remaining_today()
+    if remaining is None:
+        remaining = settings.API_FOOTBALL_DAILY_QUOTA
+    return max(remaining - settings.API_FOOTBALL_QUOTA_LOW_WATER, 0)
+
+
+def high_water_mark(db_session, league_id: int, season: int, now: datetime) -> datetime:
+    """
+    Kick-off of the earliest stored match that may still change: not final
+    and not unfinished for longer than INGEST_PENDING_DAYS (a postponed match
+    comes back under its new date). Now, if every stored match is final.
+    """
+    pending = db_session.query(func.min(MatchRecord.kickoff)).filter(
+        MatchRecord.league_id == league_id,
+        MatchRecord.season == season,
+        MatchRecord.status.notin_(TERMINAL_STATUSES),
+        MatchRecord.kickoff >= now - timedelta(days=settings.INGEST_PENDING_DAYS),
+    ).scalar()
+    return min(pending, now) if pending else now
+
+
+def _save_state(db_session, league_id: int, season: int, high_water: datetime, now: datetime, seen: int) -> None:
+    values = {"high_water": high_water, "last_run_at": now, "fixtures_seen": seen}
+    stmt = insert(IngestState).values(league_id=league_id, season=season, **values).on_conflict_do_update(
+        index_elements=["league_id", "season"],
+        set_=values,
+    )
+    db_session.execute(stmt)
+    db_session.commit()
+
+
+def ingest_league(db_session, league_id: int, now: datetime = None) -> Dict[str, Any]:
+    """
+    Bring one league's current season up to date. The first run fetches the
+    whole season; later ones only the dates from the high-water mark to
+    INGEST_LOOKAHEAD_DAYS ahead. Returns a summary of what was done.
+    """
+    now = now or datetime.utcnow()
+    season = infer_season(league_id, now)
+    if spare_requests() < 1:
+        print(f"⏸️ League {league_id} ({season}): daily API budget at the low-water mark, skipped")
+        return {"league_id": league_id, "season": season, "skipped": "quota"}
+    state = db_session.get(IngestState, (league_id, season))
+
+    if state is None:
+        fixtures = get_league_fixtures(league_id, season, ttl=settings.CACHE_TTL_INGEST)
+    else:
+        until = now + timedelta(days=settings.INGEST_LOOKAHEAD_DAYS)
+        fixtures = get_league_fixtures(league_id, season, ttl=settings.CACHE_TTL_INGEST, **{
+            "from": state.high_water.date().isoformat(),
+            "to": until.date().isoformat(),
+        })
+
+    if fixtures:
+        store_match_records(db_session, fixtures)
+        store_fixtures(db_session, fixtures)
+        # Kick-offs and statuses may have moved: retire cached fixture pages
+        invalidate_fixtures((f["fixture"]["id"], parse_kickoff(f)) for f in fixtures)
+    # Details are only fetched for finished matches not stored yet, latest first
+    finished = sorted((f for f in fixtures if is_finished(f)), key=parse_kickoff, reverse=True)
+    budget = min(settings.INGEST_DETAIL_BUDGET, spare_requests())
+    details = store_finished_details(db_session, [f["fixture"]["id"] for f in finished], budget)
+    # Summaries only from stored events: summarising the rest would fetch them past the budget
+    with_events = stored_detail_ids(db_session, [f["fixture"]["id"] for f in finished], "events")
+    get_fixture_summaries_many(db_session, [f for f in finished if f["fixture"]["id"] in with_events])
+
+    # A no-op unless a league match finished since the stored snapshot
+    current_snapshots(db_session, [(league_id, season)], now)
+
+    high_water = high_water_mark(db_session, league_id, season, now)
+    _save_state(db_session, league_id, season, high_water, now, len(fixtures))
+    summary = {
+        "league_id": league_id,
+        "season": season,
+        "full_season": state is None,
+        "fixtures": len(fixtures),
+        "details_requested": details,
+        "high_water": high_water.isoformat(),
+    }
+    print(f"📥 League {league_id} ({season}): {len(fixtures)} fixtures, details fetched {details}, "
+          f"high-water mark {high_water:%Y-%m-%d %H:%M}")
+    return summary
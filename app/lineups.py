@@ -0,0 +1,94 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import List
+from sqlalchemy.dialects.postgresql import insert
+from .config import settings
+from .models import Fixture, FixtureDetail, LineupWatch
+from .cache import get_response_cache
+from .api_football_async import fetch_lineups_many
+from .fixture_store import store_lineups
+from .planner import LINEUPS_LEAD
+# app/lineups.py
+#
+# Lineup watcher, run by Celery beat. Fixtures are polled only once they are
+# within LINEUPS_LEAD of kick-off, more often as kick-off nears, and never
+# again once their lineups are stored: a bounded number of requests per
+# fixture instead of one per signal computation.
+
+
+def poll_interval(kickoff: datetime, now: datetime) -> timedelta:
+    """
+    Gap before a fixture's next poll: a quarter of the time left to kick-off,
+    between LINEUP_POLL_MIN and LINEUP_POLL_MAX.
+    """
+    seconds = (kickoff - now).total_seconds() / 4
+    return timedelta(seconds=min(max(seconds, settings.LINEUP_POLL_MIN), settings.LINEUP_POLL_MAX))
+
+
+def due_fixtures(db_session, now: datetime) -> List[Fixture]:
+    """
+    Fixtures between T-60 and kick-off, without lineups yet, whose next poll is due.
+    Lineups stored by a signal computation count as found.
+    """
+    rows = db_session.query(Fixture, LineupWatch).outerjoin(
+        LineupWatch, LineupWatch.fixture_id == Fixture.id
+    ).outerjoin(
+        FixtureDetail, FixtureDetail.fixture_id == Fixture.id
+    ).filter(
+        Fixture.kickoff > now,
+        Fixture.kickoff <= now + LINEUPS_LEAD,
+        FixtureDetail.lineups.is_(None),
+    ).order_by(Fixture.kickoff, Fixture.id).all()
+
+    due = []
+    for fixture, watch in rows:
+        if watch is not None:
+            if watch.found_at is not None or watch.polls >= settings.LINEUP_MAX_POLLS:
+                continue
+            if watch.last_polled_at and now < watch.last_polled_at + poll_interval(fixture.kickoff, now):
+                continue
+        due.append(fixture)
+    return due
+
+
+def _record_polls(db_session, fixture_ids: List[int], found: List[int], now: datetime) -> None:
+    if not fixture_ids:
+        return
+    found = set(found)
+    rows = [{"fixture_id": fid, "polls": 1, "last_polled_at": now,
+             "found_at": now if fid in found else None} for fid in fixture_ids]
+    stmt = insert(LineupWatch).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["fixture_id"],
+        set_={
+            "polls": LineupWatch.polls + 1,
+            "last_polled_at": stmt.excluded.last_polled_at,
+            "found_at": stmt.excluded.found_at,
+        },
+    )
+    db_session.execute(stmt)
+    db_session.commit()
+
+
+def watch_lineups(db_session, now: datetime = None) -> List[int]:
+    """
+    Poll fixtures/lineups for every due fixture in one burst and store what
+    was published. Returns the ids of fixtures whose lineups just came in.
+    """
+    now = now or datetime.utcnow()
+    fixtures = due_fixtures(db_session, now)
+    if not fixtures:
+        return []
+
+    ids = [f.id for f in fixtures]
+    # An empty response is cached for a few minutes; each poll must reach the API
+    cache = get_response_cache()
+    for fid in ids:
+        cache.invalidate("fixtures/lineups", {"fixture": fid})
+    lineups = asyncio.run(fetch_lineups_many(ids))
+    store_lineups(db_session, lineups)
+
+    found = [fid for fid in ids if lineups.get(fid)]
+    _record_polls(db_session, ids, found, now)
+    print(f"👕 Lineups polled for {len(ids)} fixtures, published for {len(found)}")
+    return found
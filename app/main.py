@@ -1,11 +1,30 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from celery import group
+from celery.result import AsyncResult, GroupResult
+from collections import Counter
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from .database import SessionLocal, engine
-from .models import Base, Fixture
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, selectinload
+from .database import AsyncSessionLocal, engine
+from .models import Base, Fixture, SignalResult
+from .schemas import (FIXTURE_COLUMNS, FixtureOut, FixturePage, FixtureSignals, SignalOut,
+                      encode_cursor, decode_cursor)
+from .read_cache import cached_json
+from .streams import date_topic, fixture_topic, get_signal_hub, next_message
 from .config import settings
-from .tasks import compute_signals_for_fixture
+from .tasks import celery, compute_signals_for_fixture, compute_signals_for_date
+from .progress import aggregate
+from .signals import SignalID, SIGNAL_REGISTRY
+from .versions import input_versions, stale_signals
+from .dedup import submit_once, work_key
+from .queues import queue_for_kickoff
+from .cache import get_response_cache
+from .rate_limit import get_rate_limiter
 from datetime import datetime, timedelta
+from typing import List, Optional
 
 Base.metadata.create_all(bind=engine)
 app = FastAPI(title=settings.APP_NAME)
@@ -19,27 +38,244 @@ app.add_middleware(
     allow_credentials=True,
 )
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    # Read endpoints are async: a request awaiting Postgres frees the event loop
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
-@app.get("/fixtures/{date}")
-def list_fixtures(date: str, db: Session = Depends(get_db)):
+def parse_day(date: str):
     try:
-        day = datetime.strptime(date, "%Y-%m-%d").date()
+        return datetime.strptime(date, "%Y-%m-%d").date()
     except ValueError:
         raise HTTPException(status_code=400, detail="Date must be YYYY-MM-DD")
+
+async def fixture_page(db: AsyncSession, day, league_id, limit: int, after: Optional[str],
+                       include_signals: bool) -> FixturePage:
     start_dt = datetime.combine(day, datetime.min.time())
     end_dt = start_dt + timedelta(days=1)
-    return db.query(Fixture).filter(
+    stmt = select(Fixture).options(
+        load_only(*(getattr(Fixture, name) for name in FIXTURE_COLUMNS))
+    ).where(
         Fixture.kickoff >= start_dt,
         Fixture.kickoff < end_dt
-    ).all()
+    )
+    if league_id:
+        stmt = stmt.where(Fixture.league_api_id.in_(league_id))
+    if after:
+        stmt = stmt.where(tuple_(Fixture.kickoff, Fixture.id) > decode_cursor(after))
+    if include_signals:
+        # One extra SELECT ... WHERE fixture_id IN (...) for the whole page;
+        # lazy loading is not available on an async session
+        stmt = stmt.options(selectinload(Fixture.signals).load_only(
+            SignalResult.fixture_id, SignalResult.signal_id, SignalResult.status,
+            SignalResult.value, SignalResult.note,
+        ))
+    # One row past the page tells whether there is a next one
+    fixtures = (await db.scalars(stmt.order_by(Fixture.kickoff, Fixture.id).limit(limit + 1))).all()
+    page = fixtures[:limit]
+    items = []
+    for f in page:
+        item = {name: getattr(f, name) for name in FIXTURE_COLUMNS}
+        if include_signals:
+            item["signals"] = [SignalOut.model_validate(s) for s in sorted(f.signals, key=lambda s: s.signal_id)]
+        items.append(FixtureOut(**item))
+    next_cursor = encode_cursor(page[-1].kickoff, page[-1].id) if len(fixtures) > limit else None
+    return FixturePage(items=items, next_cursor=next_cursor)
+
+@app.get("/fixtures/{date}", response_model=FixturePage, response_model_exclude_unset=True)
+async def list_fixtures(request: Request,
+                        date: str,
+                        league_id: Optional[List[int]] = Query(None),
+                        limit: int = Query(settings.FIXTURES_PAGE_SIZE, ge=1, le=settings.FIXTURES_PAGE_MAX),
+                        after: Optional[str] = None,
+                        include_signals: bool = False,
+                        db: AsyncSession = Depends(get_db)):
+    day = parse_day(date)
+    if after:
+        try:
+            decode_cursor(after)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+    params = {"league_id": sorted(league_id) if league_id else None, "limit": limit,
+              "after": after, "include_signals": include_signals}
+    return await cached_json(request, "date", day.isoformat(), params,
+                             lambda: fixture_page(db, day, league_id, limit, after, include_signals))
+
+@app.get("/fixtures/{fixture_id}/signals", response_model=FixtureSignals)
+async def fixture_signals(request: Request, fixture_id: int, db: AsyncSession = Depends(get_db)):
+    async def build() -> FixtureSignals:
+        if await db.get(Fixture, fixture_id) is None:
+            raise HTTPException(status_code=404, detail="Fixture not found")
+        rows = await db.scalars(select(SignalResult).options(load_only(
+            SignalResult.signal_id, SignalResult.status, SignalResult.value, SignalResult.note,
+        )).where(SignalResult.fixture_id == fixture_id).order_by(SignalResult.signal_id))
+        return FixtureSignals(fixture_id=fixture_id, signals=[SignalOut.model_validate(s) for s in rows])
+    return await cached_json(request, "fixture", fixture_id, {}, build)
+
+def parse_signal_ids(signal_ids: Optional[List[int]]):
+    if signal_ids is None:
+        return None
+    unknown = [sig_id for sig_id in signal_ids if sig_id not in SignalID._value2member_map_]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown signal ids: {unknown}")
+    return sorted(set(signal_ids))
 
 @app.post("/compute/{fixture_id}")
-def compute(fixture_id: int):
-    compute_signals_for_fixture.delay(fixture_id)
-    return {"status": "scheduled", "fixture_id": fixture_id}
\ No newline at end of file
+async def compute(fixture_id: int, signal_id: Optional[List[int]] = Query(None), stale_only: bool = False,
+                  db: AsyncSession = Depends(get_db)):
+    """
+    Requests for the same fixture, signals and input versions within
+    COMPUTE_DEDUP_WINDOW coalesce onto one task and get its id.
+    """
+    signal_ids = parse_signal_ids(signal_id)
+    fixture = await db.get(Fixture, fixture_id)
+    if fixture is None:
+        raise HTTPException(status_code=404, detail="Fixture not found")
+    versions = await db.run_sync(lambda session: input_versions(
+        session, [fixture], SIGNAL_REGISTRY, [SignalID(s) for s in signal_ids] if signal_ids else None))
+    key = work_key("compute-fixture", fixture_id, signal_ids, stale_only,
+                   sorted((int(sig_id), version) for sig_id, version in versions[fixture_id].items()))
+    task_id, submitted = await run_in_threadpool(
+        submit_once, key,
+        lambda task_id: compute_signals_for_fixture.apply_async((fixture_id, signal_ids, stale_only), task_id=task_id,
+                                                                queue=queue_for_kickoff(fixture.kickoff)),
+        lambda task_id: AsyncResult(task_id, app=celery).state,
+    )
+    return {"status": "scheduled" if submitted else "coalesced", "task_id": task_id, "fixture_id": fixture_id,
+            "signal_ids": signal_ids, "stale_only": stale_only}
+
+def submit_group(signatures) -> GroupResult:
+    result = group(signatures).apply_async()
+    # Saved in the result backend so /groups/{id} can restore it
+    result.save()
+    return result
+
+@app.post("/compute/date/{date}")
+async def compute_date(date: str, league_id: Optional[List[int]] = Query(None),
+                       signal_id: Optional[List[int]] = Query(None), stale_only: bool = False,
+                       db: AsyncSession = Depends(get_db)):
+    """
+    One task per league: each still shares its fetches across the league's
+    fixtures (histories and tables are per league), and leagues run in parallel.
+    """
+    day = parse_day(date)
+    signal_ids = parse_signal_ids(signal_id)
+    if not league_id:
+        start_dt = datetime.combine(day, datetime.min.time())
+        league_id = (await db.scalars(select(Fixture.league_api_id).where(
+            Fixture.kickoff >= start_dt,
+            Fixture.kickoff < start_dt + timedelta(days=1),
+        ).distinct())).all()
+    league_id = sorted(set(league_id))
+    result = await run_in_threadpool(submit_group, [
+        compute_signals_for_date.s(date, [lid], signal_ids, stale_only) for lid in league_id
+    ])
+    return {"status": "scheduled", "group_id": result.id, "task_ids": [r.id for r in result.results],
+            "date": date, "league_ids": league_id, "signal_ids": signal_ids, "stale_only": stale_only}
+
+def task_status(result: AsyncResult) -> dict:
+    status = {"task_id": result.id, "state": result.state}
+    info = result.info
+    if isinstance(info, dict):
+        # PROGRESS meta while running, the final progress once done
+        status["progress"] = info
+    elif isinstance(info, BaseException):
+        status["error"] = repr(info)
+    return status
+
+@app.get("/tasks/{task_id}")
+def get_task(task_id: str):
+    # Unknown ids are reported as PENDING, like tasks still waiting in the queue
+    return task_status(AsyncResult(task_id, app=celery))
+
+@app.get("/groups/{group_id}")
+def get_group(group_id: str):
+    result = GroupResult.restore(group_id, app=celery)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Group not found")
+    tasks = [task_status(r) for r in result.results]
+    return {
+        "group_id": group_id,
+        "states": dict(Counter(t["state"] for t in tasks)),
+        "completed": sum(t["state"] == "SUCCESS" for t in tasks),
+        "total": len(tasks),
+        "progress": aggregate([t["progress"] for t in tasks if "progress" in t]),
+        "tasks": tasks,
+    }
+
+@app.get("/fixtures/{fixture_id}/stale")
+async def fixture_stale_signals(fixture_id: int, db: AsyncSession = Depends(get_db)):
+    fixture = await db.get(Fixture, fixture_id)
+    if fixture is None:
+        raise HTTPException(status_code=404, detail="Fixture not found")
+    # app/versions.py is shared with the (sync) Celery tasks
+    stale, versions = await db.run_sync(lambda session: stale_signals(session, [fixture], SIGNAL_REGISTRY))
+    return {
+        "fixture_id": fixture_id,
+        "stale": [int(sig_id) for sig_id in stale[fixture_id]],
+        "input_versions": {int(sig_id): version for sig_id, version in versions[fixture_id].items()},
+    }
+
+def stream_topics(fixture_id: Optional[List[int]], date: Optional[List[str]]) -> List[str]:
+    if not fixture_id and not date:
+        raise HTTPException(status_code=400, detail="Give at least one fixture_id or date")
+    return ([fixture_topic(fid) for fid in fixture_id or []] +
+            [date_topic(parse_day(day).isoformat()) for day in date or []])
+
+@app.get("/stream/signals")
+async def stream_signals(request: Request,
+                         fixture_id: Optional[List[int]] = Query(None),
+                         date: Optional[List[str]] = Query(None)):
+    """
+    Server-sent events: one `signals` event per fixture whose results are
+    written, for the given fixtures and kick-off dates.
+    """
+    topics = stream_topics(fixture_id, date)
+    hub = get_signal_hub()
+    if hub is None:
+        raise HTTPException(status_code=503, detail="Signal stream unavailable")
+
+    async def events():
+        async with hub.subscribe(topics) as queue:
+            yield ": connected\n\n"
+            while not await request.is_disconnected():
+                message = await next_message(queue)
+                yield f"event: signals\ndata: {message}\n\n" if message is not None else ": keep-alive\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.websocket("/ws/signals")
+async def websocket_signals(websocket: WebSocket,
+                            fixture_id: Optional[List[int]] = Query(None),
+                            date: Optional[List[str]] = Query(None)):
+    """
+    WebSocket twin of /stream/signals: each text frame is one fixture's update.
+    """
+    try:
+        topics = stream_topics(fixture_id, date)
+    except HTTPException as exc:
+        await websocket.close(code=1008, reason=exc.detail)
+        return
+    hub = get_signal_hub()
+    if hub is None:
+        await websocket.close(code=1011, reason="Signal stream unavailable")
+        return
+    await websocket.accept()
+    try:
+        async with hub.subscribe(topics) as queue:
+            while True:
+                message = await next_message(queue)
+                if message is None:
+                    await websocket.send_json({"type": "keep-alive"})
+                else:
+                    await websocket.send_text(message)
+    except WebSocketDisconnect:
+        pass
+
+@app.get("/metrics/api-football")
+def api_football_metrics():
+    return {
+        "cache": get_response_cache().stats(),
+        "quota": get_rate_limiter().snapshot(),
+    }
\ No newline at end of file
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, SmallInteger, String, DateTime, Float, ForeignKey, UniqueConstraint, Index, JSON
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -14,6 +15,10 @@ class Fixture(Base):
     away_team_api_id = Column(Integer, index=True, nullable=False)
     league_api_id = Column(Integer, index=True, nullable=False)
     signals = relationship("SignalResult", back_populates="fixture", cascade="all, delete-orphan")
+    __table_args__ = (
+        # Keyset pagination of GET /fixtures/{date}
+        Index("ix_fixtures_kickoff_id", "kickoff", "id"),
+    )
 
 class SignalResult(Base):
     __tablename__ = "signals"
@@ -24,7 +29,101 @@ class SignalResult(Base):
     value = Column(Float, nullable=True)        # Numeric metric (e.g., goals or xG)
     note = Column(String, nullable=True)
     created_at = Column(DateTime, nullable=False)
+    input_version = Column(String(16), nullable=True)  # digest of the inputs read (app/versions.py)
     __table_args__ = (
         UniqueConstraint('fixture_id', 'signal_id', name='uq_fixture_signal'),
     )
-    fixture = relationship("Fixture", back_populates="signals")
\ No newline at end of file
+    fixture = relationship("Fixture", back_populates="signals")
+
+class FixtureDetail(Base):
+    # Write-once store of API-Football data for *finished* fixtures, keyed by the
+    # API fixture id (historical fixtures are not necessarily in `fixtures`).
+    # Lineups are also stored for upcoming fixtures, once published.
+    __tablename__ = "fixture_details"
+    fixture_id = Column(Integer, primary_key=True)
+    events = Column(JSON, nullable=True)        # fixtures/events "response" list
+    statistics = Column(JSON, nullable=True)    # fixtures/statistics "response" list
+    lineups = Column(JSON, nullable=True)       # fixtures/lineups "response" list
+    fetched_at = Column(DateTime, nullable=False)
+
+class DetailAttempt(Base):
+    # Empty API-Football answers for a finished fixture's events, statistics or
+    # lineups, so ingestion retries them a bounded number of times (app/fixture_store.py).
+    __tablename__ = "fixture_detail_attempts"
+    fixture_id = Column(Integer, primary_key=True)
+    detail = Column(String, primary_key=True)               # events, statistics or lineups
+    attempts = Column(Integer, nullable=False)
+    last_attempt_at = Column(DateTime, nullable=False)      # UTC
+
+class MatchRecord(Base):
+    # Local corpus of API-Football fixtures (any league, any season), keyed by
+    # the API fixture id. `payload` is the raw fixtures "response" entry, so
+    # replays see exactly what the live API returned.
+    __tablename__ = "match_records"
+    id = Column(Integer, primary_key=True)
+    league_id = Column(Integer, nullable=False)
+    season = Column(Integer, nullable=False)
+    kickoff = Column(DateTime, index=True, nullable=False)   # UTC
+    home_team_id = Column(Integer, index=True, nullable=False)
+    away_team_id = Column(Integer, index=True, nullable=False)
+    home_goals = Column(Integer, nullable=True)              # NULL until played
+    away_goals = Column(Integer, nullable=True)
+    status = Column(String, nullable=False)                  # API short status: NS, FT, PST, ...
+    payload = Column(JSON, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+    __table_args__ = (
+        Index("ix_match_records_league_season_kickoff", "league_id", "season", "kickoff"),
+    )
+
+class IngestState(Base):
+    # Per league season high-water mark of the ingestion pipeline (app/ingest.py):
+    # every match kicking off before it is final, so each run only fetches later dates.
+    __tablename__ = "ingest_state"
+    league_id = Column(Integer, primary_key=True)
+    season = Column(Integer, primary_key=True)
+    high_water = Column(DateTime, nullable=False)           # UTC
+    last_run_at = Column(DateTime, nullable=False)
+    fixtures_seen = Column(Integer, nullable=False)         # rows in the last run's response
+
+class StandingsSnapshot(Base):
+    # A league table as fetched at fetched_at, reused until a league match
+    # finishes (app/standings.py). `table` is the active group only.
+    __tablename__ = "standings_snapshots"
+    id = Column(Integer, primary_key=True)
+    league_id = Column(Integer, nullable=False)
+    season = Column(Integer, nullable=False)
+    fetched_at = Column(DateTime, nullable=False)            # UTC
+    table = Column(JSON, nullable=False)                     # standings group rows, API-shaped
+    ranks = Column(JSON, nullable=False)                     # {team_id: [rank, played]}
+    __table_args__ = (
+        Index("ix_standings_snapshots_league_season_fetched", "league_id", "season", "fetched_at"),
+    )
+
+    def positions(self) -> dict:
+        """{team_id: (rank, played)}"""
+        return {int(team_id): tuple(pos) for team_id, pos in self.ranks.items()}
+
+class FixtureSummary(Base):
+    # Digest of a finished fixture's events (app/event_summary.py), written
+    # once next to fixture_details so signals never re-scan the raw events.
+    __tablename__ = "fixture_summaries"
+    fixture_id = Column(Integer, primary_key=True)
+    home_team_id = Column(Integer, nullable=False)
+    away_team_id = Column(Integer, nullable=False)
+    home_goal_minutes = Column(ARRAY(SmallInteger), nullable=False)
+    away_goal_minutes = Column(ARRAY(SmallInteger), nullable=False)
+    first_goal_minute = Column(SmallInteger, nullable=True)  # NULL for 0-0
+    home_1h_goals = Column(SmallInteger, nullable=False)
+    away_1h_goals = Column(SmallInteger, nullable=False)
+    home_red_cards = Column(SmallInteger, nullable=False)
+    away_red_cards = Column(SmallInteger, nullable=False)
+    computed_at = Column(DateTime, nullable=False)
+
+class LineupWatch(Base):
+    # Lineup polling state of an upcoming fixture (app/lineups.py)
+    __tablename__ = "lineup_watch"
+    fixture_id = Column(Integer, ForeignKey("fixtures.id", ondelete="CASCADE"), primary_key=True)
+    polls = Column(Integer, nullable=False)
+    last_polled_at = Column(DateTime, nullable=True)
+    found_at = Column(DateTime, nullable=True)               # NULL until lineups are published
+
@@ -0,0 +1,165 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from .api_football import infer_season
+from .context import SignalContext
+# app/planner.py
+#
+# Signals declare the data they read instead of fetching it ad hoc. For a set
+# of fixtures and signals the planner merges those declarations into the
+# minimal set of fetches, runs them in a few parallel bursts and hands every
+# handler the same frozen SignalContext.
+
+HOME, AWAY, BOTH = "home", "away", "both"
+
+# Lineups are published about an hour before kick-off
+LINEUPS_LEAD = timedelta(hours=1)
+# Plan lineups slightly early so a handler running just after planning finds them
+LINEUPS_PLAN_GRACE = timedelta(minutes=5)
+
+
+@dataclass(frozen=True)
+class Need:
+    """
+    One input a signal handler reads.
+
+    kind   "history", "summaries", "statistics", "standings" or "lineups"
+    side   whose history: the home team, the away team or both
+    n      the last n played fixtures of that history before kick-off
+    venue  the rows the handler keeps ("home"/"away"); the fetch is the same
+    """
+    kind: str
+    side: str = BOTH
+    n: int = 0
+    venue: Optional[str] = None
+
+
+def history(n: int, side: str = BOTH, venue: Optional[str] = None) -> Need:
+    """The side's last n played fixtures."""
+    return Need("history", side, n, venue)
+
+
+def summaries(n: int, side: str = BOTH) -> Need:
+    """Event summaries (goal minutes, red cards) of the side's last n played fixtures."""
+    return Need("summaries", side, n)
+
+
+def statistics(n: int, side: str = BOTH) -> Need:
+    """Statistics (shots, xG, ...) of the side's last n played fixtures."""
+    return Need("statistics", side, n)
+
+
+STANDINGS = Need("standings")
+LINEUPS = Need("lineups")
+
+
+@dataclass(frozen=True)
+class SignalSpec:
+    """A registered signal: its handler and the inputs it declares."""
+    handler: Callable
+    needs: Tuple[Need, ...] = ()
+
+
+def lineups_due(kickoff: datetime, now: Optional[datetime] = None) -> bool:
+    """
+    Whether a fixture's lineups may be out (within LINEUPS_LEAD of kick-off;
+    naive UTC, like Fixture.kickoff).
+    """
+    now = now or datetime.utcnow()
+    return now >= kickoff - LINEUPS_LEAD
+
+
+def history_rows(ctx: SignalContext, key: Tuple[int, int, int], n: int, before: datetime) -> List[Dict[str, Any]]:
+    """
+    The rows of a team history a per-fixture need refers to.
+    """
+    return ctx.last_n(*key, n, before=before)
+
+
+@dataclass
+class FetchPlan:
+    """
+    Everything a computation reads, deduplicated across fixtures and signals.
+    Dicts double as ordered sets so fetches go out in fixture order.
+    """
+    # Team histories are served from whole league seasons
+    league_seasons: Dict[Tuple[int, int], None] = field(default_factory=dict)
+    histories: Dict[Tuple[int, int, int], None] = field(default_factory=dict)
+    standings: Dict[Tuple[int, int], None] = field(default_factory=dict)
+    # (history key, kick-off) -> largest n whose summaries / statistics are read
+    summaries: Dict[Tuple[Tuple[int, int, int], datetime], int] = field(default_factory=dict)
+    statistics: Dict[Tuple[Tuple[int, int, int], datetime], int] = field(default_factory=dict)
+    lineups: Dict[int, None] = field(default_factory=dict)
+
+    def describe(self) -> str:
+        return (f"{len(self.histories)} histories from {len(self.league_seasons)} league seasons, "
+                f"{len(self.standings)} tables, "
+                f"summaries of {len(self.summaries)} and "
+                f"statistics of {len(self.statistics)} histories, "
+                f"{len(self.lineups)} lineups")
+
+
+def plan_fetches(fixtures: Iterable, registry: Dict[Any, SignalSpec], signal_ids: Iterable = None,
+                 now: Optional[datetime] = None) -> FetchPlan:
+    """
+    Merge the needs of the given signals (default: all registered) over the
+    given fixtures into one FetchPlan.
+    """
+    signal_ids = list(signal_ids) if signal_ids is not None else list(registry)
+    needs = [need for sig_id in signal_ids for need in registry[sig_id].needs]
+    now = (now or datetime.utcnow()) + LINEUPS_PLAN_GRACE
+    plan = FetchPlan()
+
+    for fx in fixtures:
+        season = infer_season(fx.league_api_id, fx.kickoff)
+        teams = {HOME: fx.home_team_api_id, AWAY: fx.away_team_api_id}
+        for need in needs:
+            if need.kind == "standings":
+                plan.standings[(fx.league_api_id, season)] = None
+            elif need.kind == "lineups":
+                if lineups_due(fx.kickoff, now):
+                    plan.lineups[fx.id] = None
+            else:
+                sides = (HOME, AWAY) if need.side == BOTH else (need.side,)
+                for side in sides:
+                    key = (teams[side], fx.league_api_id, season)
+                    plan.league_seasons[(fx.league_api_id, season)] = None
+                    plan.histories[key] = None
+                    if need.kind in ("summaries", "statistics"):
+                        per_history = getattr(plan, need.kind)
+                        slot = (key, fx.kickoff)
+                        per_history[slot] = max(per_history.get(slot, 0), need.n)
+    return plan
+
+
+def execute_plan(ctx: SignalContext, plan: FetchPlan) -> None:
+    """
+    Load everything in the plan into ctx: league seasons, tables and lineups
+    in one burst each, then the summaries and statistics of the history rows.
+    """
+    if plan.league_seasons:
+        ctx.load_history(plan.league_seasons)
+    if plan.standings:
+        ctx.prefetch_standings(plan.standings)
+    if plan.lineups:
+        ctx.prefetch_lineups(plan.lineups)
+    if plan.summaries:
+        ctx.prefetch_summaries([f for (key, before), n in plan.summaries.items()
+                                for f in history_rows(ctx, key, n, before)])
+    if plan.statistics:
+        ctx.prefetch_statistics([f for (key, before), n in plan.statistics.items()
+                                 for f in history_rows(ctx, key, n, before)])
+
+
+def prepare_context(fixtures: Iterable, registry: Dict[Any, SignalSpec], signal_ids: Iterable = None,
+                    db_session=None) -> SignalContext:
+    """
+    Plan and load the inputs of the given signals over the given fixtures,
+    and return the frozen context their handlers read from.
+    """
+    fixtures = list(fixtures)
+    plan = plan_fetches(fixtures, registry, signal_ids)
+    ctx = SignalContext(db_session=db_session)
+    execute_plan(ctx, plan)
+    print(f"🗺️ Fetch plan for {len(fixtures)} fixtures: {plan.describe()}")
+    return ctx.freeze()
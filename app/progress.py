@@ -0,0 +1,145 @@
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from .config import settings
+from .rate_limit import APIFootballLimitError
+# app/progress.py
+#
+# Progress of a compute task, per signal: how many fixtures are queued,
+# running, done or failed, and how long the handlers took (total, and the
+# slowest fixture, to spot stragglers). Tasks publish it as Celery PROGRESS
+# state meta at most every TASK_PROGRESS_INTERVAL seconds and return the
+# final version as their result; GET /tasks/{id} and /groups/{id} read it.
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+# Result of a handler that raised; its stored row is left as it was
+HANDLER_FAILED = object()
+
+
+def _new_entry() -> Dict[str, Any]:
+    return {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0, "total_ms": 0.0, "max_ms": 0.0, "slowest_fixture": None}
+
+
+class TaskProgress:
+    """
+    Thread-safe: handlers of one fixture report from the handler pool.
+    """
+
+    def __init__(self, todo: Dict[int, Iterable[Any]], report: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 interval: float = settings.TASK_PROGRESS_INTERVAL):
+        self.report = report
+        self.interval = interval
+        self.started_at = datetime.utcnow()
+        self._t0 = time.perf_counter()
+        self._last_report = 0.0
+        self._lock = threading.Lock()
+        self.fixtures_total = len(todo)
+        self.fixtures_done = 0
+        self.signals: Dict[int, Dict[str, Any]] = {}
+        for sig_ids in todo.values():
+            for sig_id in sig_ids:
+                self.signals.setdefault(int(sig_id), _new_entry())[QUEUED] += 1
+
+    def start(self, fixture_id: int, sig_id) -> None:
+        with self._lock:
+            entry = self.signals[int(sig_id)]
+            entry[QUEUED] -= 1
+            entry[RUNNING] += 1
+
+    def finish(self, fixture_id: int, sig_id, seconds: float, failed: bool = False, running: bool = True) -> None:
+        """Record one handler run; running=False for results computed without start() (vectorized)."""
+        ms = seconds * 1000
+        with self._lock:
+            entry = self.signals[int(sig_id)]
+            entry[RUNNING if running else QUEUED] -= 1
+            entry[FAILED if failed else DONE] += 1
+            entry["total_ms"] += ms
+            if ms >= entry["max_ms"]:
+                entry["max_ms"], entry["slowest_fixture"] = ms, fixture_id
+        self._maybe_report()
+
+    def fixture_done(self) -> None:
+        with self._lock:
+            self.fixtures_done += 1
+        self._maybe_report()
+
+    def meta(self) -> Dict[str, Any]:
+        with self._lock:
+            signals = {}
+            for sig_id, entry in sorted(self.signals.items()):
+                finished = entry[DONE] + entry[FAILED]
+                signals[sig_id] = {
+                    **entry,
+                    "total_ms": round(entry["total_ms"], 1),
+                    "max_ms": round(entry["max_ms"], 1),
+                    "avg_ms": round(entry["total_ms"] / finished, 1) if finished else None,
+                }
+            return {
+                "started_at": self.started_at.isoformat(),
+                "elapsed_s": round(time.perf_counter() - self._t0, 3),
+                "fixtures": {"total": self.fixtures_total, "done": self.fixtures_done},
+                "signals": signals,
+            }
+
+    def _maybe_report(self, force: bool = False) -> None:
+        if self.report is None:
+            return
+        now = time.perf_counter()
+        if not force and now - self._last_report < self.interval:
+            return
+        self._last_report = now
+        self.report(self.meta())
+
+    def flush(self) -> Dict[str, Any]:
+        """Report now (e.g. before a long phase) and return the meta."""
+        self._maybe_report(force=True)
+        return self.meta()
+
+
+def timed_handler(handler: Callable, fixture_id: int, sig_id, progress: TaskProgress) -> Callable:
+    """
+    Wrap a signal handler so its run is recorded in `progress`. A handler
+    that raises is counted as failed and returns HANDLER_FAILED, so one
+    broken signal does not abort the rest of a batch; running out of API
+    budget still propagates (the task retries).
+    """
+    def run(*args):
+        progress.start(fixture_id, sig_id)
+        t0 = time.perf_counter()
+        try:
+            result = handler(*args)
+        except APIFootballLimitError:
+            progress.finish(fixture_id, sig_id, time.perf_counter() - t0, failed=True)
+            raise
+        except Exception as exc:
+            progress.finish(fixture_id, sig_id, time.perf_counter() - t0, failed=True)
+            print(f"❌ Signal {int(sig_id)} failed for fixture {fixture_id}: {exc!r}")
+            return HANDLER_FAILED
+        progress.finish(fixture_id, sig_id, time.perf_counter() - t0)
+        return result
+    return run
+
+
+def aggregate(metas: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combined progress of several tasks (a group): summed counts and times,
+    the slowest fixture across all of them.
+    """
+    fixtures = {"total": 0, "done": 0}
+    signals: Dict[int, Dict[str, Any]] = {}
+    for meta in metas:
+        fixtures["total"] += meta["fixtures"]["total"]
+        fixtures["done"] += meta["fixtures"]["done"]
+        for sig_id, entry in meta["signals"].items():
+            total = signals.setdefault(int(sig_id), _new_entry())
+            for key in (QUEUED, RUNNING, DONE, FAILED, "total_ms"):
+                total[key] += entry[key]
+            if entry["max_ms"] >= total["max_ms"]:
+                total["max_ms"], total["slowest_fixture"] = entry["max_ms"], entry["slowest_fixture"]
+    for entry in signals.values():
+        finished = entry[DONE] + entry[FAILED]
+        entry["total_ms"] = round(entry["total_ms"], 1)
+        entry["avg_ms"] = round(entry["total_ms"] / finished, 1) if finished else None
+    return {"fixtures": fixtures, "signals": dict(sorted(signals.items()))}
@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from .config import settings
+from .database import SessionLocal
+from .models import Fixture
+# app/queues.py
+#
+# Celery queues by urgency, each consumed by its own workers with their own
+# concurrency (celery_worker.py, docker-compose.yml), so a backfill of
+# thousands of fixtures cannot hold up a recompute before kick-off:
+#   kickoff  - fixtures about to kick off or in play (lineup recomputes)
+#   matchday - scheduled batches of upcoming and just-played fixtures
+#   backfill - historical fixtures and league ingestion
+# route_task picks a compute task's queue from its fixture's kick-off.
+
+KICKOFF_QUEUE = "kickoff"
+MATCHDAY_QUEUE = "matchday"
+BACKFILL_QUEUE = "backfill"
+QUEUES = (KICKOFF_QUEUE, MATCHDAY_QUEUE, BACKFILL_QUEUE)
+
+# Worker processes per queue (celery_worker.py)
+CONCURRENCY = {
+    KICKOFF_QUEUE: settings.KICKOFF_WORKER_CONCURRENCY,
+    MATCHDAY_QUEUE: settings.MATCHDAY_WORKER_CONCURRENCY,
+    BACKFILL_QUEUE: settings.BACKFILL_WORKER_CONCURRENCY,
+}
+
+# Tasks whose queue does not depend on their arguments
+STATIC_ROUTES = {
+    "app.tasks.watch_lineups_task": KICKOFF_QUEUE,
+    "app.tasks.ingest_league_task": BACKFILL_QUEUE,
+}
+
+
+def queue_for_kickoff(kickoff: datetime, now: datetime = None) -> str:
+    """
+    Queue of work on a fixture kicking off at `kickoff`.
+    """
+    now = now or datetime.utcnow()
+    until_kickoff = (kickoff - now).total_seconds()
+    if -settings.QUEUE_KICKOFF_AFTER <= until_kickoff <= settings.QUEUE_KICKOFF_BEFORE:
+        return KICKOFF_QUEUE
+    if -until_kickoff > settings.QUEUE_BACKFILL_AFTER:
+        return BACKFILL_QUEUE
+    return MATCHDAY_QUEUE
+
+
+def queue_for_date(date: str, now: datetime = None) -> str:
+    """
+    Queue of a whole day's batch (YYYY-MM-DD): bulk work, so never the kickoff queue.
+    """
+    now = now or datetime.utcnow()
+    day_end = datetime.strptime(date, "%Y-%m-%d") + timedelta(days=1)
+    if day_end < now - timedelta(seconds=settings.QUEUE_BACKFILL_AFTER):
+        return BACKFILL_QUEUE
+    return MATCHDAY_QUEUE
+
+
+def _fixture_kickoff(fixture_id: int) -> Optional[datetime]:
+    db = SessionLocal()
+    try:
+        return db.query(Fixture.kickoff).filter(Fixture.id == fixture_id).scalar()
+    finally:
+        db.close()
+
+
+def route_task(name: str, args, kwargs, options: Dict[str, Any], task=None, **kw) -> Optional[Dict[str, str]]:
+    """
+    Celery router (task_routes). A queue passed to apply_async wins, so
+    callers already holding the fixture spare the kick-off lookup.
+    Unrouted tasks go to task_default_queue.
+    """
+    if "queue" in options:
+        return None
+    if name in STATIC_ROUTES:
+        return {"queue": STATIC_ROUTES[name]}
+    args = list(args or ())
+    kwargs = kwargs or {}
+    if name == "app.tasks.compute_signals_for_fixture":
+        kickoff = _fixture_kickoff(args[0] if args else kwargs["fixture_id"])
+        # Unknown fixture: the task fails fast on whichever queue
+        return {"queue": queue_for_kickoff(kickoff) if kickoff else MATCHDAY_QUEUE}
+    if name == "app.tasks.compute_signals_for_date":
+        try:
+            return {"queue": queue_for_date(args[0] if args else kwargs["date"])}
+        except ValueError:
+            return None
+    return None
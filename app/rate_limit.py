@@ -0,0 +1,324 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Mapping, Optional
+from .config import settings
+# app/rate_limit.py
+#
+# Cluster-wide pacing of API-Football requests. Every call first reserves a
+# token from a bucket shared by all API and worker processes (in Redis), and
+# every response's rate-limit headers update a shared daily-quota record.
+
+KEY_PREFIX = "apifootball:"
+BUCKET_KEY = KEY_PREFIX + "ratelimit:bucket"
+QUOTA_KEY = KEY_PREFIX + "ratelimit:quota"
+
+# Reserve one token and return how long the caller must wait for it (seconds).
+# Reservations may drive the bucket negative, which queues callers in arrival
+# order instead of letting them retry in a burst. Uses the Redis clock so that
+# workers with skewed clocks agree. Returns -1 (nothing reserved) if the wait
+# would exceed max_wait.
+_RESERVE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local max_wait = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1]) or capacity
+local ts = tonumber(data[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens < 1 then
+    wait = (1 - tokens) / rate
+end
+if wait > max_wait then
+    return '-1'
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens - 1), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], 3600)
+return tostring(wait)
+"""
+
+# Empty the bucket without cancelling reservations: a negative balance (callers
+# already queued) is kept, a positive one drops to zero. Refill restarts now.
+_DRAIN_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens')) or 0
+redis.call('HSET', KEYS[1], 'tokens', tostring(math.min(tokens, 0)), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], 3600)
+return tostring(math.min(tokens, 0))
+"""
+
+
+class APIFootballLimitError(Exception):
+    """
+    A request could not be made within the provider's limits. retry_after is
+    a hint (seconds) for when trying again makes sense.
+    """
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QuotaExhausted(APIFootballLimitError):
+    """The daily request quota is spent (or down to the configured reserve)."""
+
+
+class RateLimited(APIFootballLimitError):
+    """The per-minute budget is saturated beyond API_FOOTBALL_MAX_WAIT."""
+
+
+def seconds_until_reset(now: Optional[datetime] = None) -> float:
+    """
+    Seconds until the daily quota resets (API-Football resets at 00:00 UTC).
+    """
+    now = now or datetime.now(timezone.utc)
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (midnight - now).total_seconds()
+
+
+def _utc_day() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def parse_rate_headers(headers: Mapping[str, str]) -> Dict[str, int]:
+    """
+    Extract the provider's daily (x-ratelimit-requests-*) and per-minute
+    (X-RateLimit-*) counters from a response's headers.
+    """
+    fields = {
+        "daily_limit": "x-ratelimit-requests-limit",
+        "daily_remaining": "x-ratelimit-requests-remaining",
+        "minute_limit": "x-ratelimit-limit",
+        "minute_remaining": "x-ratelimit-remaining",
+    }
+    lower = {k.lower(): v for k, v in headers.items()}
+    out = {}
+    for name, header in fields.items():
+        value = lower.get(header)
+        if value is not None and str(value).lstrip("-").isdigit():
+            out[name] = int(value)
+    return out
+
+
+def check_response_errors(body: Dict[str, Any]) -> None:
+    """
+    API-Football reports some limit breaches as HTTP 200 with an "errors"
+    object; turn those into the matching exception.
+    """
+    errors = body.get("errors") or {}
+    if not isinstance(errors, dict):
+        return
+    if "requests" in errors:
+        raise QuotaExhausted(f"API-Football: {errors['requests']}", seconds_until_reset())
+    if "rateLimit" in errors:
+        raise RateLimited(f"API-Football: {errors['rateLimit']}", 60.0)
+
+
+class RateLimiter:
+    """
+    Token bucket (API_FOOTBALL_RATE_PER_MINUTE, bursts up to
+    API_FOOTBALL_BURST) plus a daily-quota accountant.
+
+    Once the remaining daily budget drops below API_FOOTBALL_QUOTA_LOW_WATER,
+    the refill rate is lowered so the rest of the budget is spread evenly
+    until the midnight-UTC reset instead of being spent in one burst. The
+    last API_FOOTBALL_QUOTA_RESERVE requests are never handed out.
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = float(settings.API_FOOTBALL_BURST)
+        self._ts = time.monotonic()
+        self._quota: Dict[str, Any] = {}
+
+    # --- storage primitives (overridden by RedisRateLimiter) ---------------
+
+    def _reserve(self, rate: float, capacity: int, max_wait: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(capacity, self._tokens + (now - self._ts) * rate)
+            self._ts = now
+            wait = (1 - self._tokens) / rate if self._tokens < 1 else 0.0
+            if wait > max_wait:
+                return -1.0
+            self._tokens -= 1
+            return wait
+
+    def drain(self) -> None:
+        """
+        Empty the bucket so every caller waits for the next refill.
+        """
+        with self._lock:
+            self._tokens = min(self._tokens, 0.0)
+
+    def _read_quota(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._quota)
+
+    def _write_quota(self, fields: Dict[str, Any]) -> None:
+        with self._lock:
+            self._quota.update(fields)
+
+    def _count_request(self) -> None:
+        with self._lock:
+            if self._quota.get("used_day") != _utc_day():
+                self._quota.update(used_day=_utc_day(), used_today=0)
+            self._quota["used_today"] += 1
+
+    # --- public API ---------------------------------------------------------
+
+    @staticmethod
+    def daily_remaining(quota: Dict[str, Any]) -> Optional[int]:
+        """
+        Remaining daily requests: from the provider's headers when seen since
+        today's reset, otherwise API_FOOTBALL_DAILY_QUOTA minus our own count.
+        """
+        if quota.get("day") == _utc_day() and "daily_remaining" in quota:
+            return quota["daily_remaining"]
+        if quota.get("used_day") == _utc_day():
+            return max(settings.API_FOOTBALL_DAILY_QUOTA - quota.get("used_today", 0), 0)
+        return None
+
+    def remaining_today(self) -> Optional[int]:
+        """Remaining daily requests right now; None until anything is known today."""
+        return self.daily_remaining(self._read_quota())
+
+    def current_rate(self, quota: Dict[str, Any]) -> float:
+        """
+        Tokens per second to hand out, given the last known quota record.
+        """
+        rate = settings.API_FOOTBALL_RATE_PER_MINUTE / 60.0
+        remaining = self.daily_remaining(quota)
+        if remaining is not None and remaining < settings.API_FOOTBALL_QUOTA_LOW_WATER:
+            spendable = max(remaining - settings.API_FOOTBALL_QUOTA_RESERVE, 1)
+            rate = min(rate, spendable / seconds_until_reset())
+        return rate
+
+    def acquire(self) -> None:
+        """
+        Block until this process may send one request. Raises QuotaExhausted
+        when the daily budget is down to the reserve, RateLimited when the
+        queue ahead is longer than API_FOOTBALL_MAX_WAIT.
+        """
+        quota = self._read_quota()
+        remaining = self.daily_remaining(quota)
+        if remaining is not None and remaining <= settings.API_FOOTBALL_QUOTA_RESERVE:
+            raise QuotaExhausted(
+                f"API-Football daily quota down to {remaining} (reserve {settings.API_FOOTBALL_QUOTA_RESERVE})",
+                seconds_until_reset(),
+            )
+        wait = self._reserve(self.current_rate(quota), settings.API_FOOTBALL_BURST,
+                             settings.API_FOOTBALL_MAX_WAIT)
+        if wait < 0:
+            raise RateLimited("API-Football request queue is full", settings.API_FOOTBALL_MAX_WAIT)
+        if wait > 0:
+            time.sleep(wait)
+        self._count_request()
+
+    def record(self, headers: Mapping[str, str]) -> None:
+        """
+        Update the shared quota record from a response's rate-limit headers.
+        """
+        fields = parse_rate_headers(headers)
+        if not fields:
+            return
+        fields["day"] = _utc_day()
+        fields["updated_at"] = datetime.utcnow().isoformat()
+        self._write_quota(fields)
+        if fields.get("minute_remaining") == 0:
+            # The provider says this minute is spent: stop handing out tokens
+            self.drain()
+
+    def mark_exhausted(self) -> None:
+        """
+        The provider refused a request for quota reasons: stop every process
+        from trying again until the daily reset.
+        """
+        self._write_quota({"daily_remaining": 0, "day": _utc_day(),
+                           "updated_at": datetime.utcnow().isoformat()})
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Remaining budget and usage, for the metrics endpoint.
+        """
+        quota = self._read_quota()
+        quota.setdefault("daily_limit", settings.API_FOOTBALL_DAILY_QUOTA)
+        quota["backend"] = self.name
+        quota["rate_per_minute"] = round(self.current_rate(quota) * 60, 3)
+        quota["resets_in"] = int(seconds_until_reset())
+        return quota
+
+
+class RedisRateLimiter(RateLimiter):
+    """
+    RateLimiter whose bucket and quota record live in Redis, shared by every
+    API and worker process.
+    """
+
+    name = "redis"
+
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
+        self._script = client.register_script(_RESERVE_SCRIPT)
+        self._drain_script = client.register_script(_DRAIN_SCRIPT)
+
+    def _reserve(self, rate: float, capacity: int, max_wait: float) -> float:
+        return float(self._script(keys=[BUCKET_KEY], args=[rate, capacity, max_wait]))
+
+    def drain(self) -> None:
+        self._drain_script(keys=[BUCKET_KEY])
+
+    def _read_quota(self) -> Dict[str, Any]:
+        raw = self.client.hgetall(QUOTA_KEY)
+        quota: Dict[str, Any] = {}
+        for k, v in raw.items():
+            k = k.decode() if isinstance(k, bytes) else k
+            v = v.decode() if isinstance(v, bytes) else v
+            quota[k] = int(v) if v.lstrip("-").isdigit() else v
+        used = self.client.get(f"{QUOTA_KEY}:used:{_utc_day()}")
+        quota["used_day"] = _utc_day()
+        quota["used_today"] = int(used or 0)
+        return quota
+
+    def _write_quota(self, fields: Dict[str, Any]) -> None:
+        self.client.hset(QUOTA_KEY, mapping=fields)
+
+    def _count_request(self) -> None:
+        key = f"{QUOTA_KEY}:used:{_utc_day()}"
+        pipe = self.client.pipeline()
+        pipe.incr(key)
+        pipe.expire(key, 2 * 86400)
+        pipe.execute()
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Process-wide limiter, built on first use: Redis-backed when reachable,
+    otherwise a per-process bucket.
+    """
+    global _limiter
+    if _limiter is not None:
+        return _limiter
+    with _limiter_lock:
+        if _limiter is not None:
+            return _limiter
+        try:
+            import redis
+            client = redis.Redis.from_url(settings.REDIS_URL)
+            client.ping()
+            _limiter = RedisRateLimiter(client)
+        except Exception as exc:
+            print(f"⚠️ Redis rate limiter unavailable ({exc}); limiting per process only")
+            _limiter = RateLimiter()
+        return _limiter
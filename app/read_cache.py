@@ -0,0 +1,174 @@
+import hashlib
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlencode
+from fastapi import Request, Response
+from pydantic import BaseModel
+from .config import settings
+# app/read_cache.py
+#
+# Read-through cache of serialised API responses (fixture pages, fixture
+# signals) in Redis. Entries are keyed by a generation per date and per
+# fixture; writers bump the generations they touch instead of hunting down
+# every cached variant (page, league filter, ...). A payload built while a
+# write commits lands under the old generation and is never served.
+#
+# Redis only: an in-process fallback could not be invalidated by the Celery
+# workers, so without Redis every read goes to Postgres.
+
+KEY_PREFIX = "predictpro:"
+
+
+def _gen_key(scope: str, ident: Any) -> str:
+    return f"{KEY_PREFIX}gen:{scope}:{ident}"
+
+
+def _new_generation() -> str:
+    # Random rather than a counter: a generation evicted by Redis restarts
+    # somewhere no old entry lives
+    return uuid.uuid4().hex[:12]
+
+
+def etag_for(body: str) -> str:
+    return '"' + hashlib.sha1(body.encode()).hexdigest()[:20] + '"'
+
+
+class ReadCache:
+    """
+    Async read side, used by the API endpoints.
+    """
+
+    def __init__(self, client, ttl: int):
+        self.client = client
+        self.ttl = ttl
+
+    async def generation(self, scope: str, ident: Any) -> str:
+        key = _gen_key(scope, ident)
+        gen = await self.client.get(key)
+        if gen is None:
+            await self.client.set(key, _new_generation(), nx=True)
+            gen = await self.client.get(key)
+        return gen.decode() if isinstance(gen, bytes) else gen
+
+    async def key(self, scope: str, ident: Any, params: Dict[str, Any]) -> str:
+        gen = await self.generation(scope, ident)
+        variant = urlencode(sorted((k, v) for k, v in params.items() if v is not None), doseq=True)
+        return f"{KEY_PREFIX}read:{scope}:{ident}:{gen}?{variant}"
+
+    async def get(self, key: str) -> Optional[Tuple[str, str]]:
+        """(etag, body) of a cached response, or None."""
+        raw = await self.client.get(key)
+        if raw is None:
+            return None
+        raw = raw.decode() if isinstance(raw, bytes) else raw
+        etag, _, body = raw.partition("\n")
+        return etag, body
+
+    async def set(self, key: str, etag: str, body: str) -> None:
+        # The TTL only bounds memory; freshness comes from the generations
+        await self.client.set(key, f"{etag}\n{body}", ex=self.ttl)
+
+
+_read_cache: Optional[ReadCache] = None
+_sync_client = None
+_clients_lock = threading.Lock()
+_UNAVAILABLE = object()
+
+
+def get_read_cache() -> Optional[ReadCache]:
+    """
+    Process-wide read cache, built on first use; None when disabled or
+    Redis is unreachable (checked once per process).
+    """
+    global _read_cache
+    if _read_cache is None:
+        with _clients_lock:
+            if _read_cache is None:
+                _read_cache = _UNAVAILABLE
+                if settings.READ_CACHE_ENABLED:
+                    try:
+                        import redis
+                        import redis.asyncio
+                        redis.Redis.from_url(settings.REDIS_URL).ping()
+                        _read_cache = ReadCache(redis.asyncio.Redis.from_url(settings.REDIS_URL),
+                                                settings.READ_CACHE_TTL)
+                    except Exception as exc:
+                        print(f"⚠️ Read cache unavailable ({exc}); serving reads from Postgres")
+    return None if _read_cache is _UNAVAILABLE else _read_cache
+
+
+def _get_sync_client():
+    global _sync_client
+    if _sync_client is None:
+        with _clients_lock:
+            if _sync_client is None:
+                _sync_client = _UNAVAILABLE
+                if settings.READ_CACHE_ENABLED:
+                    try:
+                        import redis
+                        client = redis.Redis.from_url(settings.REDIS_URL)
+                        client.ping()
+                        _sync_client = client
+                    except Exception as exc:
+                        print(f"⚠️ Read cache unavailable ({exc}); nothing to invalidate")
+    return None if _sync_client is _UNAVAILABLE else _sync_client
+
+
+def invalidate_fixtures(fixtures: Iterable[Tuple[int, datetime]]) -> None:
+    """
+    Write side, called by the tasks after they commit: retire the cached
+    responses of the given (fixture_id, kickoff) pairs and of their dates.
+    """
+    client = _get_sync_client()
+    if client is None:
+        return
+    keys = set()
+    for fixture_id, kickoff in fixtures:
+        keys.add(_gen_key("fixture", fixture_id))
+        keys.add(_gen_key("date", kickoff.date().isoformat()))
+    if not keys:
+        return
+    try:
+        with client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.set(key, _new_generation())
+            pipe.execute()
+    except Exception as exc:
+        # Stored results are already committed; at worst readers see the old payload until READ_CACHE_TTL
+        print(f"⚠️ Read cache invalidation failed ({exc})")
+
+
+async def cached_json(request: Request, scope: str, ident: Any, params: Dict[str, Any],
+                      build: Callable[[], Awaitable[BaseModel]]) -> Response:
+    """
+    Serve a JSON response through the read cache, with an ETag so clients
+    repeating If-None-Match get a bodiless 304 while it is unchanged.
+    `build` returns the response model on a miss.
+    """
+    cache = get_read_cache()
+    entry, key = None, None
+    if cache is not None:
+        try:
+            key = await cache.key(scope, ident, params)
+            entry = await cache.get(key)
+        except Exception as exc:
+            # Redis went away after startup: serve from Postgres
+            print(f"⚠️ Read cache lookup failed ({exc})")
+            cache = None
+    if entry is not None:
+        etag, body = entry
+    else:
+        body = (await build()).model_dump_json(exclude_unset=True)
+        etag = etag_for(body)
+        if cache is not None:
+            try:
+                await cache.set(key, etag, body)
+            except Exception as exc:
+                print(f"⚠️ Read cache store failed ({exc})")
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
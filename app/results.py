@@ -0,0 +1,141 @@
+import io
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.dialects.postgresql import insert
+from .config import settings
+from .models import SignalResult
+# app/results.py
+#
+# Writing SignalResult rows: one multi-row INSERT ... ON CONFLICT per fixture,
+# and a buffered writer that flushes thousands of rows per statement (or COPY
+# through a staging table) for batch runs.
+
+COLUMNS = ("fixture_id", "signal_id", "status", "value", "note", "created_at", "input_version")
+
+
+def signal_row(fixture_id: int, sig_id: int, result, input_version: str = None) -> Dict[str, Any]:
+    """
+    Build a SignalResult row from a handler's (status, value, note) tuple.
+    Handlers that bail out early return None; that is stored as Neutral.
+    """
+    status, value, note = result if result is not None else ("-", None, "Insufficient data")
+    return {
+        "fixture_id": fixture_id,
+        "signal_id": int(sig_id),
+        "status": status,
+        "value": value,
+        "note": note,
+        "created_at": datetime.utcnow(),
+        "input_version": input_version,
+    }
+
+
+def upsert_signal_results(db_session, rows: List[Dict[str, Any]]) -> None:
+    """
+    Insert or update many SignalResult rows in a single statement.
+    """
+    if not rows:
+        return
+    stmt = insert(SignalResult).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["fixture_id", "signal_id"],
+        set_={col: stmt.excluded[col] for col in COLUMNS[2:]}
+    )
+    db_session.execute(stmt)
+
+
+def _copy_field(value) -> str:
+    # COPY text format: \N is NULL; backslash, tab and newlines must be escaped
+    if value is None:
+        return "\\N"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def copy_signal_results(db_session, rows: List[Dict[str, Any]]) -> None:
+    """
+    Bulk path for very large flushes: COPY the rows into a session-local
+    staging table, then merge them into `signals` with one INSERT ... SELECT
+    ... ON CONFLICT. Needs a psycopg2 connection.
+    """
+    if not rows:
+        return
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join(_copy_field(row[col]) for col in COLUMNS) + "\n")
+    buf.seek(0)
+
+    cursor = db_session.connection().connection.cursor()
+    try:
+        cursor.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS signals_staging ("
+            " fixture_id integer, signal_id integer, status varchar(1),"
+            " value double precision, note varchar, created_at timestamp,"
+            " input_version varchar(16)"
+            ") ON COMMIT DELETE ROWS"
+        )
+        cursor.copy_expert(f"COPY signals_staging ({', '.join(COLUMNS)}) FROM STDIN", buf)
+        cursor.execute(
+            f"INSERT INTO signals ({', '.join(COLUMNS)}) "
+            f"SELECT DISTINCT ON (fixture_id, signal_id) {', '.join(COLUMNS)} "
+            "FROM signals_staging ORDER BY fixture_id, signal_id, created_at DESC "
+            "ON CONFLICT (fixture_id, signal_id) DO UPDATE SET "
+            "status = EXCLUDED.status, value = EXCLUDED.value, "
+            "note = EXCLUDED.note, created_at = EXCLUDED.created_at, "
+            "input_version = EXCLUDED.input_version"
+        )
+        cursor.execute("TRUNCATE signals_staging")
+    finally:
+        cursor.close()
+
+
+class SignalResultWriter:
+    """
+    Buffers SignalResult rows across fixtures and writes them in large
+    statements: multi-row upserts of up to SIGNAL_WRITE_BATCH rows, or COPY
+    via a staging table once a flush reaches SIGNAL_COPY_THRESHOLD rows.
+    Each flush is committed so long batch runs persist progress, then handed
+    to `on_commit` (cache invalidation, live updates).
+
+    Use as a context manager so the tail of the buffer is flushed.
+    """
+
+    def __init__(self, db_session, batch_size: int = settings.SIGNAL_WRITE_BATCH,
+                 copy_threshold: int = settings.SIGNAL_COPY_THRESHOLD,
+                 on_commit: Optional[Callable[[List[Dict[str, Any]]], None]] = None):
+        self.db = db_session
+        self.batch_size = batch_size
+        self.copy_threshold = copy_threshold
+        self.on_commit = on_commit
+        # Keyed by (fixture_id, signal_id): a statement may not touch a row twice
+        self._buffer: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        self.written = 0
+
+    def add(self, rows: Iterable[Dict[str, Any]]) -> None:
+        for row in rows:
+            self._buffer[(row["fixture_id"], row["signal_id"])] = row
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        rows = list(self._buffer.values())
+        self._buffer.clear()
+        if len(rows) >= self.copy_threshold and self.db.bind.dialect.driver == "psycopg2":
+            copy_signal_results(self.db, rows)
+        else:
+            upsert_signal_results(self.db, rows)
+        self.db.commit()
+        self.written += len(rows)
+        if self.on_commit is not None:
+            self.on_commit(rows)
+
+    def __enter__(self) -> "SignalResultWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.flush()
@@ -0,0 +1,66 @@
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple
+from pydantic import BaseModel, ConfigDict
+# app/schemas.py
+#
+# Response models of the read endpoints. They list the columns a response
+# carries, so queries can load just those (load_only) and FastAPI serialises
+# plain fields instead of walking ORM relationships.
+
+
+class SignalOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    signal_id: int
+    status: str
+    value: Optional[float] = None
+    note: Optional[str] = None
+
+
+class FixtureOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    competition: str
+    season: str
+    kickoff: datetime
+    home_team: str
+    away_team: str
+    home_team_api_id: int
+    away_team_api_id: int
+    league_api_id: int
+    signals: Optional[List[SignalOut]] = None   # only with include_signals
+
+
+class FixtureSignals(BaseModel):
+    fixture_id: int
+    signals: List[SignalOut]
+
+
+# Fixture columns a FixtureOut carries
+FIXTURE_COLUMNS = tuple(name for name in FixtureOut.model_fields if name != "signals")
+
+
+class FixturePage(BaseModel):
+    items: List[FixtureOut]
+    # Pass as `after` for the next page; None on the last one
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(kickoff: datetime, fixture_id: int) -> str:
+    """
+    Opaque keyset cursor for the position just after (kickoff, fixture_id).
+    """
+    return base64.urlsafe_b64encode(f"{kickoff.isoformat()}|{fixture_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    (kickoff, fixture_id) of a cursor from encode_cursor. Raises ValueError if malformed.
+    """
+    try:
+        kickoff, fixture_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(kickoff), int(fixture_id)
+    except (UnicodeDecodeError, ValueError, TypeError) as exc:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from exc
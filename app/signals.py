@@ -1,10 +1,14 @@
 from enum import IntEnum
-from .api_football import infer_season, get_last5_team_fixtures, get_last_n_team_fixtures, get_last5_team_fixtures, get_last5_home_fixtures, get_last5_away_fixtures, get_standings, get_fixture_events, parse_minute, check_team_first_half_performance, get_lineups_for_fixture, RELEGATION_CUTOFFS, TOP4_THRESHOLD
+from .api_football import infer_season, parse_expected_goals, check_team_first_half_performance, RELEGATION_CUTOFFS, TOP4_THRESHOLD
+from .context import SignalContext
+from .planner import SignalSpec, history, summaries, statistics, STANDINGS, LINEUPS, HOME, AWAY, lineups_due
 from .config import settings
+from .progress import timed_handler
 from datetime import datetime
-from typing import Dict, List, Any
-from enum import IntEnum
-from datetime import timedelta
+from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from types import SimpleNamespace
 import sys
 
 class SignalID(IntEnum):
@@ -20,12 +24,13 @@ class SignalID(IntEnum):
     FAST_STARTERS = 10
     HOME_PRESSURE_START = 11
     LINEUP = 12
+    XG_TOTAL = 13
 
     # define additional signals here
 
 # Each handler returns (status: str, value: float|None, note: str)
 #FORM_SIGNAL = 1
-def compute_form_signal(fixture, db_session):
+def compute_form_signal(fixture, db_session, ctx=None):
     # determine season param
     ko = fixture.kickoff
     season = infer_season(fixture.league_api_id, ko)
@@ -33,9 +38,10 @@ def compute_form_signal(fixture, db_session):
         print("❌  Could not infer season from kickoff date")
         sys.exit(1)
 
+    ctx = ctx or SignalContext(db_session=db_session)
     # Fetch last 5 fixtures (regardless of venue) for each team
-    home5 = get_last5_team_fixtures(fixture.home_team_api_id, fixture.league_api_id, season)
-    away5 = get_last5_team_fixtures(fixture.away_team_api_id, fixture.league_api_id, season)
+    home5 = ctx.last5(fixture.home_team_api_id, fixture.league_api_id, season, before=fixture.kickoff)
+    away5 = ctx.last5(fixture.away_team_api_id, fixture.league_api_id, season, before=fixture.kickoff)
 
     print(f"\n🚩 Season: {season}")
     print(f"▶️  Home team last 5 fixtures ({len(home5)}):")
@@ -84,7 +90,7 @@ def compute_form_signal(fixture, db_session):
 
 
 #OVER15_SIGNAL = 2
-def compute_over15_signal(fixture, db_session):
+def compute_over15_signal(fixture, db_session, ctx=None):
     # 1) infer season
     ko = fixture.kickoff
     season = infer_season(fixture.league_api_id, ko)
@@ -92,9 +98,10 @@ def compute_over15_signal(fixture, db_session):
         print("❌  Could not infer season from kickoff date")
         sys.exit(1)
 
+    ctx = ctx or SignalContext(db_session=db_session)
     # 2) fetch last 5 valid fixtures for each team
-    home5 = get_last5_team_fixtures(fixture.home_team_api_id, fixture.league_api_id, season)
-    away5 = get_last5_team_fixtures(fixture.away_team_api_id, fixture.league_api_id, season)
+    home5 = ctx.last5(fixture.home_team_api_id, fixture.league_api_id, season, before=fixture.kickoff)
+    away5 = ctx.last5(fixture.away_team_api_id, fixture.league_api_id, season, before=fixture.kickoff)
 
     print(f"\n🚩 Season: {season}")
     print(f"▶️  Last 5 HOME fixtures ({len(home5)}):")
@@ -135,7 +142,7 @@ def compute_over15_signal(fixture, db_session):
     return status, rate, note
 
 #BTTS_SIGNAL = 3
-def compute_btts_signal(fixture, db_session):
+def compute_btts_signal(fixture, db_session, ctx=None):
     # 1) infer season
     ko = fixture.kickoff
     season = infer_season(fixture.league_api_id, ko)
@@ -143,9 +150,10 @@ def compute_btts_signal(fixture, db_session):
         print("❌  Could not infer season from kickoff date")
         sys.exit(1)
 
+    ctx = ctx or SignalContext(db_session=db_session)
     # 2) fetch last 5 valid fixtures for each team
-    home5 = get_last5_team_fixtures(fixture.home_team_api_id, fixture.league_api_id, season)
-    away5 = get_last5_team_fixtures(fixture.away_team_api_id, fixture.league_api_id, season)
+    home5 = ctx.last5(fixture.home_team_api_id, fixture.league_api_id, season, before=fixture.kickoff)
+    away5 = ctx.last5(fixture.away_team_api_id, fixture.league_api_id, season, before=fixture.kickoff)
 
     print(f"\n🚩 Season: {season}")
     print(f"▶️  Last 5 HOME fixtures ({len(home5)}):")
@@ -186,7 +194,7 @@ def compute_btts_signal(fixture, db_session):
     return status, rate, note
 
 # HOME_AWAY_STRENGTH_SIGNAL = 4
-def compute_home_away_strength_signal(fixture, db_session):
+def compute_home_away_strength_signal(fixture, db_session, ctx=None):
     # 1) infer season
     ko = fixture.kickoff
     season = infer_season(fixture.league_api_id, ko)
@@ -194,9 +202,10 @@ def compute_home_away_strength_signal(fixture, db_session):
         print("❌  Could not infer season from kickoff date")
         sys.exit(1)
 
+    ctx = ctx or SignalContext(db_session=db_session)
     # 2) fetch last 5 HOME fixtures for home team, and last 5 AWAY fixtures for away team
-    home5 = get_last5_home_fixtures(fixture.home_team_api_id, fixture.league_api_id, season)
-    away5 = get_last5_away_fixtures(fixture.away_team_api_id, fixture.league_api_id, season)
+    home5 = ctx.last5_home(fixture.home_team_api_id, fixture.league_api_id, season, before=fixture.kickoff)
+    away5 = ctx.last5_away(fixture.away_team_api_id, fixture.league_api_id, season, before=fixture.kickoff)
 
     print(f"\n🚩 Season: {season}")
     print(f"▶️  Last 5 HOME fixtures for Home ({len(home5)}):")
@@ -247,7 +256,7 @@ def compute_home_away_strength_signal(fixture, db_session):
     return status, value, note
 
 # MOTIVATIONS: LEAGUE STAKES = 5
-def compute_league_stakes_signal(fixture, db_session):
+def compute_league_stakes_signal(fixture, db_session, ctx=None):
     # 1) infer season
     ko = fixture.kickoff
     season = infer_season(fixture.league_api_id, ko)
@@ -256,7 +265,8 @@ def compute_league_stakes_signal(fixture, db_session):
         sys.exit(1)
 
     # 2) fetch standings and find home/away entries
-    standings = get_standings(fixture.league_api_id, season)
+    ctx = ctx or SignalContext(db_session=db_session)
+    standings = ctx.standings(fixture.league_api_id, season)
     # If standings are empty, we cannot determine stakes
     if not standings:
         print("⚠️ Could not fetch standings; defaulting to Neutral (–)")
@@ -264,16 +274,10 @@ def compute_league_stakes_signal(fixture, db_session):
         return
     
 
-    # Build a map: team_id -> {rank, played}
-    pos_map: Dict[int, Dict[str, int]] = {}
-    for entry in standings:
-        team_id = entry.get("team", {}).get("id")
-        rank    = entry.get("rank")
-        played  = entry.get("all", {}).get("played", 0)
-        pos_map[team_id] = {"rank": rank, "played": played}
-
-    home_data = pos_map.get(fixture.home_team_api_id)
-    away_data = pos_map.get(fixture.away_team_api_id)
+    # team_id -> (rank, played), built once per table
+    positions = ctx.positions(fixture.league_api_id, season)
+    home_data = positions.get(fixture.home_team_api_id)
+    away_data = positions.get(fixture.away_team_api_id)
 
     if not home_data or not away_data:
         print("⚠️ One of the teams is not found in standings; defaulting to Neutral (–)")
@@ -281,7 +285,9 @@ def compute_league_stakes_signal(fixture, db_session):
         return
 
     # 3) Check if too early: each team must have played ≥5
-    if home_data["played"] < 5 or away_data["played"] < 5:
+    home_rank, home_played = home_data
+    away_rank, away_played = away_data
+    if home_played < 5 or away_played < 5:
         print("⚠️ Too early in season (teams have < 5 matches played)")
         print("\n🏁 League Stakes signal → Status=-, Note='Too early to gauge stakes'\n")
         return
@@ -293,9 +299,6 @@ def compute_league_stakes_signal(fixture, db_session):
     relegation_zone = set(range(num_teams - releg_n + 1, num_teams + 1)) if releg_n > 0 else set()
 
     # 5) Check Green conditions (top‐4 or relegation battle)
-    home_rank = home_data["rank"]
-    away_rank = away_data["rank"]
-
     home_in_top4 = home_rank <= TOP4_THRESHOLD
     away_in_top4 = away_rank <= TOP4_THRESHOLD
     home_in_releg = home_rank in relegation_zone
@@ -319,7 +322,7 @@ def compute_league_stakes_signal(fixture, db_session):
     return status, value, note
 
 # MOTIVATIONS: BOUNCE BACK = 6
-def compute_bounce_back_signal(fixture, db_session):
+def compute_bounce_back_signal(fixture, db_session, ctx=None):
     # 1) infer season
     ko = fixture.kickoff
     season = infer_season(fixture.league_api_id, ko)
@@ -327,8 +330,9 @@ def compute_bounce_back_signal(fixture, db_session):
         print("❌ Could not infer season from kickoff date")
         sys.exit(1)
 
+    ctx = ctx or SignalContext(db_session=db_session)
     # 2) fetch last 1 fixture for the home team
-    last1 = get_last_n_team_fixtures(fixture.home_team_api_id, fixture.league_api_id, season, n=1)
+    last1 = ctx.last_n(fixture.home_team_api_id, fixture.league_api_id, season, n=1, before=fixture.kickoff)
     if not last1:
         print("⚠️ No previous fixture found; defaulting to Neutral (–)")
         print("\n🏁 Bounce-Back signal → Status=-, Note='No prior fixture'\n")
@@ -365,7 +369,7 @@ def compute_bounce_back_signal(fixture, db_session):
         value = margin
         note = f"Home team lost last time by {abs(margin)} and now at home → Bounce-Back!"
         print(f"\n🏁 Bounce-Back signal → Status={status}, Note='{note}'\n")
-        
+        return status, value, note
 
     # 6) Check Red: home team won last match by ≥2
     if margin >= 2:
@@ -373,7 +377,7 @@ def compute_bounce_back_signal(fixture, db_session):
         value = margin
         note = f"Home team won last time by {margin} (easy win) → No bounce-back needed"
         print(f"\n🏁 Bounce-Back signal → Status={status}, Note='{note}'\n")
-        
+        return status, value, note
 
     # 7) Otherwise, Neutral
     status = "-"
@@ -384,7 +388,7 @@ def compute_bounce_back_signal(fixture, db_session):
     return status, value, note
 
 # MOTIVATIONS: HOME PRESSURE START = 7
-def compute_momentum_pressure_signal(fixture, db_session):
+def compute_momentum_pressure_signal(fixture, db_session, ctx=None):
     """
     Signal 8: Motivation – Momentum/Pressure
 
@@ -400,8 +404,10 @@ def compute_momentum_pressure_signal(fixture, db_session):
     if not season:
         return "-", 0, "Could not infer season from kickoff date"
 
+    ctx = ctx or SignalContext(db_session=db_session)
     # 2) Check for Home-Opener: No previous home matches played
-    last_fixtures = get_last_n_team_fixtures(fixture.home_team_api_id, fixture.league_api_id, season, n=20)
+    last_fixtures = ctx.last_n(fixture.home_team_api_id, fixture.league_api_id, season, n=20,
+                               before=fixture.kickoff)
     prior_home = []
     for f in last_fixtures:
         goals = f.get("goals", {})
@@ -421,7 +427,7 @@ def compute_momentum_pressure_signal(fixture, db_session):
         return status, value, note
 
     # 3) Check for Unbeaten Run ≥ 3 for Home Team
-    last5 = get_last_n_team_fixtures(fixture.home_team_api_id, fixture.league_api_id, season, n=5)
+    last5 = ctx.last_n(fixture.home_team_api_id, fixture.league_api_id, season, n=5, before=fixture.kickoff)
     played_fixtures = [
         f for f in last5
         if f.get("goals", {}).get("home") is not None
@@ -464,7 +470,7 @@ def compute_momentum_pressure_signal(fixture, db_session):
 
 
 # FIRST HALF GOAL TIMING SIGNAL = 8
-def compute_1h_goal_timing_signal(fixture, db_session):
+def compute_1h_goal_timing_signal(fixture, db_session, ctx=None):
     # 1) Infer season
     ko = fixture.kickoff
     season = infer_season(fixture.league_api_id, ko)
@@ -472,9 +478,10 @@ def compute_1h_goal_timing_signal(fixture, db_session):
         print("❌ Could not infer season from kickoff date")
         sys.exit(1)
 
+    ctx = ctx or SignalContext(db_session=db_session)
     # 2) Fetch last 5 fixtures for home + last 5 for away
-    home5 = get_last_n_team_fixtures(fixture.home_team_api_id, fixture.league_api_id, season, n=5)
-    away5 = get_last_n_team_fixtures(fixture.away_team_api_id, fixture.league_api_id, season, n=5)
+    home5 = ctx.last_n(fixture.home_team_api_id, fixture.league_api_id, season, n=5, before=fixture.kickoff)
+    away5 = ctx.last_n(fixture.away_team_api_id, fixture.league_api_id, season, n=5, before=fixture.kickoff)
 
     print(f"\n🚩 Season: {season}")
     print(f"▶️ Home team last {len(home5)} fixtures:")
@@ -493,27 +500,17 @@ def compute_1h_goal_timing_signal(fixture, db_session):
     print(f"\n🔗 Combined fixtures count: {len(combined)}")
 
     # 3) Count how many of these 10 had at least one goal in minute 1–30
+    ctx.prefetch_summaries(combined)
     positive_count = 0
     missing = []
     for f in combined:
-        fid = f["fixture"]["id"]
-        events = get_fixture_events(fid)
-        if not events:
-            missing.append(fid)
+        summary = ctx.summary(f)
+        if summary is None:
+            missing.append(f["fixture"]["id"])
             continue
-
-        found_1h_goal = False
-        for event in events:
-            if event.get("type") == "Goal":
-                elapsed = event.get("time", {}).get("elapsed")
-                # Only count if elapsed is an integer between 1 and 30
-                if isinstance(elapsed, int) and 1 <= elapsed <= 30:
-                    found_1h_goal = True
-                    break
-        if found_1h_goal:
+        if summary.goals_between(1, 30) > 0:
             positive_count += 1
 
-
     if missing:
         print(f"⚠️ Missing events for fixture IDs: {missing}")
         print("   → Counting them as ‘no goal in first 30 mins’ for now.")
@@ -539,7 +536,7 @@ def compute_1h_goal_timing_signal(fixture, db_session):
     return status, value, note 
 
 # FIRST HALF OVER 0.5 SIGNAL = 9
-def compute_1h_over05_signal(fixture, db_session):
+def compute_1h_over05_signal(fixture, db_session, ctx=None):
     # 1) Infer season
     ko = fixture.kickoff
     season = infer_season(fixture.league_api_id, ko)
@@ -547,9 +544,10 @@ def compute_1h_over05_signal(fixture, db_session):
         print("❌ Could not infer season from kickoff date")
         sys.exit(1)
 
+    ctx = ctx or SignalContext(db_session=db_session)
     # 2) Fetch last 5 fixtures for home + last 5 for away
-    home5 = get_last_n_team_fixtures(fixture.home_team_api_id, fixture.league_api_id, season, n=5)
-    away5 = get_last_n_team_fixtures(fixture.away_team_api_id, fixture.league_api_id, season, n=5)
+    home5 = ctx.last_n(fixture.home_team_api_id, fixture.league_api_id, season, n=5, before=fixture.kickoff)
+    away5 = ctx.last_n(fixture.away_team_api_id, fixture.league_api_id, season, n=5, before=fixture.kickoff)
 
     print(f"\n🚩 Season: {season}")
     print(f"▶️ Home team last {len(home5)} fixtures:")
@@ -568,24 +566,16 @@ def compute_1h_over05_signal(fixture, db_session):
     print(f"\n🔗 Combined fixtures count: {len(combined)}")
 
     # 3) Count how many of these 10 had at least one goal in minutes 1–45
+    ctx.prefetch_summaries(combined)
     positive_count = 0
     missing = []
     for f in combined:
-        fid = f["fixture"]["id"]
-        events = get_fixture_events(fid)
-        if not events:
-            missing.append(fid)
+        summary = ctx.summary(f)
+        if summary is None:
+            missing.append(f["fixture"]["id"])
             continue
-
-        found_1h_goal = False
-        for event in events:
-            if event.get("type") == "Goal":
-                elapsed = event.get("time", {}).get("elapsed")
-                # elapsed is an integer like 10, 45, 45+1 (but API always returns an int)
-                if isinstance(elapsed, int) and 1 <= elapsed <= 45:
-                    found_1h_goal = True
-                    break
-        if found_1h_goal:
+        # Stoppage time (45+1) counts as minute 45
+        if summary.goals_between(1, 45) > 0:
             positive_count += 1
 
     if missing:
@@ -613,7 +603,7 @@ def compute_1h_over05_signal(fixture, db_session):
     return status, value, note
 
 # FAST STARTERS SIGNAL = 10
-def compute_fast_starters_signal(fixture, db_session):
+def compute_fast_starters_signal(fixture, db_session, ctx=None):
     # 1) Infer season
     ko = fixture.kickoff
     season = infer_season(fixture.league_api_id, ko)
@@ -625,8 +615,9 @@ def compute_fast_starters_signal(fixture, db_session):
     print(f"🏠 Home Team ID: {fixture.home_team_api_id}")
     print(f"✈️  Away Team ID: {fixture.away_team_api_id}")
 
+    ctx = ctx or SignalContext(db_session=db_session)
     # 2) Fetch last 5 fixtures for the HOME team
-    home5 = get_last_n_team_fixtures(fixture.home_team_api_id, fixture.league_api_id, season, n=5)
+    home5 = ctx.last_n(fixture.home_team_api_id, fixture.league_api_id, season, n=5, before=fixture.kickoff)
     print(f"\n▶️  Home team last {len(home5)} fixtures:")
     for i, f in enumerate(home5, 1):
         dt = f["fixture"]["date"]
@@ -641,7 +632,7 @@ def compute_fast_starters_signal(fixture, db_session):
         return
 
     # 3) Fetch last 5 fixtures for the AWAY team
-    away5 = get_last_n_team_fixtures(fixture.away_team_api_id, fixture.league_api_id, season, n=5)
+    away5 = ctx.last_n(fixture.away_team_api_id, fixture.league_api_id, season, n=5, before=fixture.kickoff)
     print(f"\n▶️  Away team last {len(away5)} fixtures:")
     for i, f in enumerate(away5, 1):
         dt = f["fixture"]["date"]
@@ -656,8 +647,9 @@ def compute_fast_starters_signal(fixture, db_session):
         return
 
     # 4) Check HOME team's first half performance
+    ctx.prefetch_summaries(home5 + away5)
     home_scored_count, home_conceded_count, home_missing = check_team_first_half_performance(
-        home5, fixture.home_team_api_id, "Home"
+        home5, fixture.home_team_api_id, "Home", get_summary=ctx.summary
     )
     
     if home_missing:
@@ -670,7 +662,7 @@ def compute_fast_starters_signal(fixture, db_session):
 
     # 5) Check AWAY team's first half performance  
     away_scored_count, away_conceded_count, away_missing = check_team_first_half_performance(
-        away5, fixture.away_team_api_id, "Away"
+        away5, fixture.away_team_api_id, "Away", get_summary=ctx.summary
     )
     
     if away_missing:
@@ -737,7 +729,7 @@ def compute_fast_starters_signal(fixture, db_session):
     return status, value, note  
 
 # HOME PRESSURE START SIGNAL = 11
-def compute_home_pressure_signal(fixture, db_session):
+def compute_home_pressure_signal(fixture, db_session, ctx=None):
     # 1) Infer season
     ko = fixture.kickoff
     season = infer_season(fixture.league_api_id, ko)
@@ -745,8 +737,9 @@ def compute_home_pressure_signal(fixture, db_session):
         print("❌ Could not infer season from kickoff date")
         sys.exit(1)
 
+    ctx = ctx or SignalContext(db_session=db_session)
     # 2) Fetch last 3 fixtures (home OR away) for the home team
-    last3 = get_last_n_team_fixtures(fixture.home_team_api_id, fixture.league_api_id, season, n=3)
+    last3 = ctx.last_n(fixture.home_team_api_id, fixture.league_api_id, season, n=3, before=fixture.kickoff)
     print(f"\n🚩 Season: {season}")
     print(f"▶️ Home team last {len(last3)} fixtures:")
     for f in last3:
@@ -799,37 +792,23 @@ def compute_home_pressure_signal(fixture, db_session):
     return status, value, note  # Returning losses as value for consistency
 
 # LINEUPS SIGNAL = 12
-def compute_lineups_signal(fixture, db_session):
+def compute_lineups_signal(fixture, db_session, ctx=None):
     # 1) Infer season (just for context printing)
     ko = fixture.kickoff
     season = infer_season(fixture.league_api_id, ko)
     print(f"\n🚩 Season: {season}")
 
     # 2) Check current time vs kickoff - 1h
-    now = datetime.now()  # naive local time
-    kickoff_dt = fixture.kickoff
-    cutoff = kickoff_dt - timedelta(hours=1)
-
-    if now < cutoff:
+    if not lineups_due(fixture.kickoff):
         # More than 1h until kick-off → Neutral
         print("⚠️ More than 1 hour until kickoff → lineups not yet published")
         print("\n🏁 Lineups signal → Status=-, Note='Too early for lineups'\n")
         return "-", None, "Too early for lineups"
 
     # 3) Fetch lineups
-    lineups = get_lineups_for_fixture(fixture.home_team_api_id)  # pass in fixture id below
-    # NOTE: We assume HOME_ID==fx.home_team_api_id is not a fixture ID; so we need
-    # the actual fixture ID. In this standalone harness, we use HOME_ID as a placeholder
-    # for fixture_id. Replace HOME_ID with the real fixture ID if needed.
-    # But typically, the fixture ID is the one you pass; here we assume KICKOFF corresponds
-    # exactly to a single fixture. Adjust as necessary.
-    #
-    # For clarity, in a real scenario, you'd supply FIXTURE_ID.
-    #
-    # For this test script, we’ll loop over lineups returned and find the one
-    # where team.id == HOME_ID, then count startXI.
-    #
-    # Very often, the API returns: [{ "team": {"id": 8008, …}, "startXI": […] }, …]
+    ctx = ctx or SignalContext(db_session=db_session)
+    lineups = ctx.lineups(fixture.id)
+    # The API returns: [{ "team": {"id": 8008, …}, "startXI": […] }, …]
 
     # Find the HOME team’s lineup
     home_lineup = None
@@ -873,22 +852,118 @@ def compute_lineups_signal(fixture, db_session):
 
 
 
-# Map of signal IDs to their computation functions
-# Registry mapping
-SIGNAL_HANDLERS = {   
-    SignalID.FORM: compute_form_signal,
-    SignalID.OVER15: compute_over15_signal,
-    SignalID.BTTS: compute_btts_signal,
-    SignalID.HOME_AWAY_STRENGTH: compute_home_away_strength_signal,
-    SignalID.LEAGUE_STAKES: compute_league_stakes_signal,
-    SignalID.BOUNCE_BACK: compute_bounce_back_signal,
-    SignalID.MOMENTUM_PRESSURE: compute_momentum_pressure_signal,
-    SignalID.FIRST_HALF_GOAL_TIMING: compute_1h_goal_timing_signal,
-    SignalID.FIRST_HALF_OVER05: compute_1h_over05_signal,
-    SignalID.FAST_STARTERS: compute_fast_starters_signal,
-    SignalID.HOME_PRESSURE_START: compute_home_pressure_signal,
-    SignalID.LINEUP: compute_lineups_signal,
-    # Add more signal handlers as needed
+#XG_TOTAL_SIGNAL = 13
+def compute_xg_total_signal(fixture, db_session, ctx=None):
+    # determine season param
+    ko = fixture.kickoff
+    season = infer_season(fixture.league_api_id, ko)
+    if not season:
+        print("❌  Could not infer season from kickoff date")
+        sys.exit(1)
 
+    ctx = ctx or SignalContext(db_session=db_session)
+    # Last 5 played fixtures of each team, with the xG of both sides attached
+    combined = []
+    print(f"\n🚩 Season: {season}")
+    for label, team_id in (("HOME", fixture.home_team_api_id), ("AWAY", fixture.away_team_api_id)):
+        last5 = ctx.last5(team_id, fixture.league_api_id, season, before=fixture.kickoff)
+        print(f"▶️  Last 5 {label} team fixtures ({len(last5)}):")
+        for f in last5:
+            xg = parse_expected_goals(ctx.statistics(f))
+            d = f["fixture"]["date"]
+            g = f["goals"]
+            if xg is None:
+                print(f"   • {d} → {g['home']}-{g['away']} (Fixture ID: {f['fixture']['id']}, no xG data)")
+                continue
+            print(f"   • {d} → {g['home']}-{g['away']} (Fixture ID: {f['fixture']['id']}, xG: {xg[0]:.2f}+{xg[1]:.2f})")
+            combined.append(xg)
+
+    print(f"\n🔗 Combined fixtures with xG: {len(combined)}")
+    if len(combined) < 10:
+        print("⚠️  Insufficient fixtures with xG to compute xG Total signal.")
+        print("\n🏁 xG Total signal → Status=-, Note='Insufficient xG data'\n")
+        return "-", None, f"Insufficient xG data ({len(combined)}/10 matches)"
+
+    # Average combined xG per match:
+    #    ✔️ Green if avg_xg ≥ 2.8
+    #    ✘ White X if avg_xg ≤ 2.0
+    #    ➖ Neutral in between
+    total_xg = sum(hx + ax for hx, ax in combined)
+    avg_xg = total_xg / len(combined)
+    if avg_xg >= 2.8:
+        status = "Y"
+    elif avg_xg <= 2.0:
+        status = "N"
+    else:
+        status = "-"
 
+    note = f"Avg combined xG: {avg_xg:.2f} over {len(combined)} matches (Total xG: {total_xg:.2f})"
+    print(f"\n🏁 xG Total signal → Status={status}, Note='{note}'\n")
+    return status, round(avg_xg, 2), note
+
+
+# Map of signal IDs to their computation functions and the inputs they read;
+# the planner fetches those inputs once for a whole batch of fixtures
+SIGNAL_REGISTRY = {
+    SignalID.FORM: SignalSpec(compute_form_signal, (history(5),)),
+    SignalID.OVER15: SignalSpec(compute_over15_signal, (history(5),)),
+    SignalID.BTTS: SignalSpec(compute_btts_signal, (history(5),)),
+    SignalID.HOME_AWAY_STRENGTH: SignalSpec(compute_home_away_strength_signal, (
+        history(5, HOME, venue="home"),
+        history(5, AWAY, venue="away"),
+    )),
+    SignalID.LEAGUE_STAKES: SignalSpec(compute_league_stakes_signal, (STANDINGS,)),
+    SignalID.BOUNCE_BACK: SignalSpec(compute_bounce_back_signal, (history(1, HOME),)),
+    SignalID.MOMENTUM_PRESSURE: SignalSpec(compute_momentum_pressure_signal, (history(20, HOME),)),
+    SignalID.FIRST_HALF_GOAL_TIMING: SignalSpec(compute_1h_goal_timing_signal, (history(5), summaries(5))),
+    SignalID.FIRST_HALF_OVER05: SignalSpec(compute_1h_over05_signal, (history(5), summaries(5))),
+    SignalID.FAST_STARTERS: SignalSpec(compute_fast_starters_signal, (history(5), summaries(5))),
+    SignalID.HOME_PRESSURE_START: SignalSpec(compute_home_pressure_signal, (history(3, HOME),)),
+    SignalID.LINEUP: SignalSpec(compute_lineups_signal, (LINEUPS,)),
+    SignalID.XG_TOTAL: SignalSpec(compute_xg_total_signal, (
+        history(5),
+        statistics(5),
+    )),
+    # Add more signals as needed, declaring every input the handler reads
 }
+
+SIGNAL_HANDLERS = {sig_id: spec.handler for sig_id, spec in SIGNAL_REGISTRY.items()}
+
+
+def handler_pool(workers: int = settings.SIGNAL_EXECUTOR_WORKERS):
+    """
+    Thread pool for run_signal_handlers, or a no-op context (serial
+    execution) when workers <= 1. Use as a context manager.
+    """
+    if workers <= 1:
+        return nullcontext(None)
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="signal")
+
+
+def run_signal_handlers(fixture, db_session, ctx: SignalContext, handlers=None, pool=None,
+                        progress=None) -> Dict[SignalID, Any]:
+    """
+    Run handlers for one fixture and return {signal_id: result} in SignalID
+    order. With a pool, handlers run concurrently so a fixture costs about
+    as long as its slowest handler; ctx must then be shared by all of them.
+    With a TaskProgress, each handler's run and timing are recorded in it.
+
+    Handlers get a detached copy of the fixture's columns: a commit from
+    another thread would otherwise expire the ORM object and make attribute
+    reads query the (non-thread-safe) session.
+    """
+    handlers = handlers if handlers is not None else SIGNAL_HANDLERS
+    order = sorted(handlers)
+    if progress is not None:
+        handlers = {sig_id: timed_handler(handlers[sig_id], fixture.id, sig_id, progress) for sig_id in order}
+    if pool is None:
+        return {sig_id: handlers[sig_id](fixture, db_session, ctx) for sig_id in order}
+
+    snapshot = SimpleNamespace(**{col.key: getattr(fixture, col.key) for col in fixture.__table__.columns})
+    futures = {sig_id: pool.submit(handlers[sig_id], snapshot, db_session, ctx) for sig_id in order}
+    try:
+        return {sig_id: futures[sig_id].result() for sig_id in order}
+    except BaseException:
+        for future in futures.values():
+            future.cancel()
+        raise
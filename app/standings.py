@@ -0,0 +1,112 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Tuple
+from sqlalchemy import or_
+from .config import settings
+from .models import MatchRecord, StandingsSnapshot
+from .cache import get_response_cache
+from .rate_limit import APIFootballLimitError
+from .api_football import FINISHED_STATUSES, select_active_group
+from .api_football_async import fetch_many
+from .history import RESULT_DELAY
+# app/standings.py
+#
+# League tables only change when a league match finishes, so each fetched
+# table is kept as a snapshot (active group already selected, plus its
+# team -> (rank, played) map) and reused until one does.
+
+Positions = Dict[int, Tuple[int, int]]   # team_id -> (rank, played)
+
+
+def position_map(table: List[Dict[str, Any]]) -> Positions:
+    """
+    {team_id: (rank, played)} of a standings group.
+    """
+    return {
+        entry["team"]["id"]: (entry.get("rank"), entry.get("all", {}).get("played", 0))
+        for entry in table
+        if entry.get("team", {}).get("id") is not None
+    }
+
+
+def latest_snapshot(db_session, league_id: int, season: int):
+    return db_session.query(StandingsSnapshot).filter(
+        StandingsSnapshot.league_id == league_id,
+        StandingsSnapshot.season == season,
+    ).order_by(StandingsSnapshot.fetched_at.desc()).first()
+
+
+def snapshot_stale(db_session, snapshot: StandingsSnapshot, now: datetime = None) -> bool:
+    """
+    Whether a league match may have finished since the snapshot was taken:
+    one kicked off less than RESULT_DELAY before it and is now final or
+    RESULT_DELAY old. Leagues missing from match_records fall back to
+    CACHE_TTL_STANDINGS.
+    """
+    now = now or datetime.utcnow()
+    records = db_session.query(MatchRecord.id).filter(
+        MatchRecord.league_id == snapshot.league_id,
+        MatchRecord.season == snapshot.season,
+    )
+    if records.first() is None:
+        return snapshot.fetched_at < now - timedelta(seconds=settings.CACHE_TTL_STANDINGS)
+    finished_since = records.filter(
+        MatchRecord.kickoff > snapshot.fetched_at - RESULT_DELAY,
+        MatchRecord.kickoff <= now,
+        or_(MatchRecord.status.in_(FINISHED_STATUSES), MatchRecord.kickoff <= now - RESULT_DELAY),
+    )
+    return finished_since.first() is not None
+
+
+def save_snapshot(db_session, league_id: int, season: int, table: List[Dict[str, Any]],
+                  now: datetime = None) -> StandingsSnapshot:
+    """
+    Store an active standings group as the league's newest snapshot.
+    """
+    snapshot = StandingsSnapshot(
+        league_id=league_id,
+        season=season,
+        fetched_at=now or datetime.utcnow(),
+        table=table,
+        # JSON object keys are strings; StandingsSnapshot.positions() converts back
+        ranks={str(team_id): [rank, played] for team_id, (rank, played) in position_map(table).items()},
+    )
+    db_session.add(snapshot)
+    db_session.commit()
+    return snapshot
+
+
+def current_snapshots(db_session, keys: Iterable[Tuple[int, int]],
+                      now: datetime = None) -> Dict[Tuple[int, int], StandingsSnapshot]:
+    """
+    Up-to-date snapshots of many (league, season) keys: stored ones are reused,
+    missing or stale ones are fetched in one parallel burst and stored. Out of
+    API budget, a stale snapshot is served rather than none.
+    """
+    now = now or datetime.utcnow()
+    snapshots, stale = {}, {}
+    for key in dict.fromkeys(keys):
+        snapshot = latest_snapshot(db_session, *key)
+        if snapshot is not None and not snapshot_stale(db_session, snapshot, now):
+            snapshots[key] = snapshot
+        else:
+            stale[key] = snapshot
+    if not stale:
+        return snapshots
+
+    # The response cache may still hold the table from before the result
+    cache = get_response_cache()
+    params = [{"league": league_id, "season": season} for league_id, season in stale]
+    for p in params:
+        cache.invalidate("standings", p)
+    try:
+        payloads = asyncio.run(fetch_many("standings", params, lambda payload: settings.CACHE_TTL_STANDINGS))
+    except APIFootballLimitError:
+        if any(snapshot is None for snapshot in stale.values()):
+            raise
+        print(f"⚠️ Serving {len(stale)} stale standings snapshots (API budget exhausted)")
+        snapshots.update(stale)
+        return snapshots
+    for key, data in zip(stale, payloads):
+        snapshots[key] = save_snapshot(db_session, *key, select_active_group(data), now)
+    return snapshots
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set
+from .config import settings
+# app/streams.py
+#
+# Live SignalResult updates. Workers publish each fixture's freshly written
+# rows on one Redis pub/sub channel. Every API process holds a single
+# subscription (SignalHub) and fans messages out to its connected SSE /
+# WebSocket clients through small in-process queues, by fixture id and
+# kick-off date, so Redis sees one subscriber per process, not per client.
+
+CHANNEL = "predictpro:signals"
+SIGNAL_FIELDS = ("signal_id", "status", "value", "note")
+
+
+def fixture_topic(fixture_id: int) -> str:
+    return f"fixture:{fixture_id}"
+
+
+def date_topic(day: str) -> str:
+    return f"date:{day}"
+
+
+_publisher = None
+_publisher_lock = threading.Lock()
+_UNAVAILABLE = object()
+
+
+def _get_publisher():
+    global _publisher
+    if _publisher is None:
+        with _publisher_lock:
+            if _publisher is None:
+                _publisher = _UNAVAILABLE
+                try:
+                    import redis
+                    client = redis.Redis.from_url(settings.REDIS_URL)
+                    client.ping()
+                    _publisher = client
+                except Exception as exc:
+                    print(f"⚠️ Signal stream unavailable ({exc}); updates are not published")
+    return None if _publisher is _UNAVAILABLE else _publisher
+
+
+def publish_signal_rows(rows: Iterable[Dict[str, Any]], kickoffs: Dict[int, datetime]) -> int:
+    """
+    Worker side, called once rows are committed: publish them grouped by
+    fixture. `kickoffs` maps fixture ids to kick-off, for the date topics.
+    Returns the number of fixtures published.
+    """
+    client = _get_publisher()
+    if client is None:
+        return 0
+    by_fixture: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+    for row in rows:
+        by_fixture[row["fixture_id"]].append({field: row[field] for field in SIGNAL_FIELDS})
+    try:
+        with client.pipeline(transaction=False) as pipe:
+            for fixture_id, signals in by_fixture.items():
+                pipe.publish(CHANNEL, json.dumps({
+                    "fixture_id": fixture_id,
+                    "date": kickoffs[fixture_id].date().isoformat(),
+                    "signals": sorted(signals, key=lambda s: s["signal_id"]),
+                }))
+            pipe.execute()
+    except Exception as exc:
+        # Results are stored either way; clients catch up on their next read
+        print(f"⚠️ Signal stream publish failed ({exc})")
+        return 0
+    return len(by_fixture)
+
+
+class SignalHub:
+    """
+    Per-process fan-out of the signal channel, run on the API's event loop.
+    Clients subscribe to topics (fixture ids, dates) and get each matching
+    message once. The Redis subscription starts with the first client and
+    reconnects on errors. A client that stops reading loses its oldest
+    messages, never the subscription.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._queues: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._task: Optional[asyncio.Task] = None
+
+    def _dispatch(self, data: str) -> None:
+        update = json.loads(data)
+        topics = (fixture_topic(update["fixture_id"]), date_topic(update["date"]))
+        for queue in set().union(*(self._queues.get(topic, ()) for topic in topics)):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(data)
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = self.client.pubsub()
+                await pubsub.subscribe(CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    data = message["data"]
+                    self._dispatch(data.decode() if isinstance(data, bytes) else data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print(f"⚠️ Signal stream subscription lost ({exc}); reconnecting")
+                await asyncio.sleep(1)
+
+    @asynccontextmanager
+    async def subscribe(self, topics: Iterable[str]) -> AsyncIterator[asyncio.Queue]:
+        """
+        Queue receiving the JSON messages of the given topics while the block runs.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen())
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.STREAM_QUEUE_SIZE)
+        topics = list(dict.fromkeys(topics))
+        for topic in topics:
+            self._queues[topic].add(queue)
+        try:
+            yield queue
+        finally:
+            for topic in topics:
+                self._queues[topic].discard(queue)
+                if not self._queues[topic]:
+                    del self._queues[topic]
+
+
+_hub: Optional[SignalHub] = None
+
+
+def get_signal_hub() -> Optional[SignalHub]:
+    """
+    The API process's hub, built on first use; None when Redis is unreachable.
+    """
+    global _hub
+    if _hub is None:
+        _hub = _UNAVAILABLE
+        try:
+            import redis
+            import redis.asyncio
+            redis.Redis.from_url(settings.REDIS_URL).ping()
+            _hub = SignalHub(redis.asyncio.Redis.from_url(settings.REDIS_URL))
+        except Exception as exc:
+            print(f"⚠️ Signal stream unavailable ({exc})")
+    return None if _hub is _UNAVAILABLE else _hub
+
+
+async def next_message(queue: asyncio.Queue) -> Optional[str]:
+    """
+    Next message of a subscription, or None after STREAM_HEARTBEAT seconds
+    without one (time for a keep-alive).
+    """
+    try:
+        return await asyncio.wait_for(queue.get(), timeout=settings.STREAM_HEARTBEAT)
+    except asyncio.TimeoutError:
+        return None
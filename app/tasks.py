@@ -1,42 +1,300 @@
 from celery import Celery
+from celery.exceptions import Retry
 from .config import settings
 from .database import SessionLocal
-from .models import Fixture, SignalResult
-from datetime import datetime
-from .signals import SIGNAL_HANDLERS
-from sqlalchemy.exc import IntegrityError
-from sqlalchemy.dialects.postgresql import insert
+from .models import Fixture
+from datetime import datetime, timedelta, timezone
+import time
+from .signals import SignalID, SIGNAL_HANDLERS, SIGNAL_REGISTRY, handler_pool, run_signal_handlers
+from .planner import prepare_context
+from .vectorized import compute_vectorized
+from .rate_limit import APIFootballLimitError, QuotaExhausted, seconds_until_reset
+from .results import signal_row, upsert_signal_results, SignalResultWriter
+from .versions import input_versions, stale_signals
+from .read_cache import invalidate_fixtures
+from .streams import publish_signal_rows
+from .ingest import ingest_league, tracked_leagues
+from .lineups import watch_lineups
+from .progress import HANDLER_FAILED, TaskProgress
+from .queues import KICKOFF_QUEUE, MATCHDAY_QUEUE, route_task
 
 celery = Celery(__name__, broker=settings.CELERY_BROKER_URL)
 celery.conf.result_backend = settings.CELERY_RESULT_BACKEND
+# STARTED between PENDING and the first PROGRESS update (GET /tasks/{id})
+celery.conf.task_track_started = True
+# Queues by kick-off proximity, each with its own workers (app/queues.py)
+celery.conf.task_routes = (route_task,)
+celery.conf.task_default_queue = MATCHDAY_QUEUE
+# Run by the `beat` service (docker-compose.yml)
+celery.conf.beat_schedule = {
+    "ingest-leagues": {
+        "task": "app.tasks.ingest_all_leagues",
+        "schedule": settings.INGEST_INTERVAL,
+    },
+    "watch-lineups": {
+        "task": "app.tasks.watch_lineups_task",
+        "schedule": settings.LINEUP_WATCH_INTERVAL,
+    },
+}
+
+def _signal_ids(signal_ids) -> list:
+    """
+    SignalIDs from a task argument (ints over JSON); None means every registered signal.
+    """
+    return list(SIGNAL_HANDLERS) if signal_ids is None else [SignalID(int(sig_id)) for sig_id in signal_ids]
+
+
+def _limit_countdown(exc: APIFootballLimitError) -> float:
+    return min(exc.retry_after, settings.API_FOOTBALL_RETRY_MAX_COUNTDOWN)
+
+
+def _quota_deadline(kickoff: datetime = None) -> datetime:
+    """
+    Until when a task out of daily quota is re-sent: one re-send past the
+    quota reset, or the fixture's kick-off (naive UTC) if that comes first.
+    """
+    now = datetime.now(timezone.utc)
+    deadline = now + timedelta(seconds=seconds_until_reset(now) + settings.API_FOOTBALL_RETRY_MAX_COUNTDOWN)
+    if kickoff is not None:
+        kickoff = kickoff.replace(tzinfo=timezone.utc)
+        if now < kickoff < deadline:
+            return kickoff
+    return deadline
+
+
+def _as_utc(value) -> datetime:
+    # A request's `expires`: ISO string from the message, or a datetime when run eagerly
+    value = datetime.fromisoformat(value) if isinstance(value, str) else value
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _retry_on_limit(task, exc: APIFootballLimitError, countdown: float, kickoff: datetime = None) -> Exception:
+    """
+    Retry a task that ran out of API budget. Waiting for the daily quota is
+    not a failed attempt: the task is re-sent with the same retry count, so
+    max_retries only counts per-minute limits. The re-sent task expires at
+    the first one's _quota_deadline; past it the error is returned instead.
+    """
+    if not isinstance(exc, QuotaExhausted) or task.request.called_directly:
+        return task.retry(exc=exc, countdown=countdown)
+    deadline = _as_utc(task.request.expires) if task.request.expires else _quota_deadline(kickoff)
+    if datetime.now(timezone.utc) + timedelta(seconds=countdown) > deadline:
+        print(f"⌛ {task.name}: past its deadline ({deadline:%Y-%m-%d %H:%M} UTC), not retried")
+        return exc
+    task.signature_from_request(countdown=countdown, retries=task.request.retries, expires=deadline).apply_async()
+    return Retry(exc=exc, when=countdown)
+
+
+def _task_progress(task, todo: dict) -> TaskProgress:
+    """
+    Progress of a compute task, reported as its PROGRESS state when it runs
+    on a worker (not when called directly).
+    """
+    report = None
+    task_id = task.request.id
+    if task_id:
+        # task.request is thread-local: handlers report from the pool's threads
+        report = lambda meta: task.update_state(task_id=task_id, state="PROGRESS", meta=meta)
+    return TaskProgress(todo, report)
+
+
+def _precompute(fixtures, ctx, signal_ids=None, progress=None, todo=None) -> dict:
+    """
+    Results of the vectorized signals for the whole batch, {fixture_id: {signal_id: result}}.
+    With a progress, each result is recorded with an even share of the batch time.
+    """
+    if not settings.SIGNAL_VECTORIZED:
+        return {}
+    t0 = time.perf_counter()
+    results = compute_vectorized(fixtures, ctx, SIGNAL_HANDLERS if signal_ids is None else signal_ids)
+    if progress is not None:
+        done = [(fid, sig_id) for fid, sigs in results.items() for sig_id in sigs if sig_id in todo[fid]]
+        share = (time.perf_counter() - t0) / max(len(done), 1)
+        for fid, sig_id in done:
+            progress.finish(fid, sig_id, share, running=False)
+    return results
+
+
+def _compute_fixture(db, fixture, ctx, pool=None, precomputed=None, signal_ids=None, versions=None,
+                     progress=None) -> list:
+    """
+    Run the given registered handlers (default: all) not already covered by
+    `precomputed` for one fixture (concurrently when given a pool) and return
+    its SignalResult rows in SignalID order, stamped with their input versions.
+    Signals whose handler failed get no row.
+    """
+    wanted = list(SIGNAL_HANDLERS) if signal_ids is None else signal_ids
+    results = {sig_id: result for sig_id, result in (precomputed or {}).items() if sig_id in wanted}
+    handlers = {sig_id: SIGNAL_HANDLERS[sig_id] for sig_id in wanted if sig_id not in results}
+    results.update(run_signal_handlers(fixture, db, ctx, handlers, pool, progress))
+    if progress is not None:
+        progress.fixture_done()
+    versions = versions or {}
+    return [signal_row(fixture.id, sig_id, results[sig_id], versions.get(sig_id))
+            for sig_id in sorted(results) if results[sig_id] is not HANDLER_FAILED]
+
+
+def _after_commit(rows: list, kickoffs: dict) -> None:
+    """
+    Once result rows are committed: retire cached responses first, so a
+    client reacting to the live update reads the new rows, then publish.
+    """
+    fixture_ids = {row["fixture_id"] for row in rows}
+    invalidate_fixtures((fid, kickoffs[fid]) for fid in fixture_ids)
+    publish_signal_rows(rows, kickoffs)
+
+
+def _signals_to_compute(db, fixtures, signal_ids, stale_only: bool):
+    """
+    ({fixture_id: [signal_id, ...]}, input versions) of a run: the requested
+    signals, narrowed to the stale ones when stale_only. Versions are read
+    before any input is loaded, so data stored meanwhile shows up as stale
+    on the next run instead of being missed.
+    """
+    if stale_only:
+        return stale_signals(db, fixtures, SIGNAL_REGISTRY, signal_ids)
+    versions = input_versions(db, fixtures, SIGNAL_REGISTRY, signal_ids)
+    return {fx.id: list(signal_ids) for fx in fixtures}, versions
+
+
+@celery.task(bind=True, max_retries=5)
+def compute_signals_for_fixture(self, fixture_id: int, signal_ids: list = None, stale_only: bool = False):
+    """
+    Compute the given signals (SignalID values; default: all) for one fixture,
+    or with stale_only just those whose inputs changed since they were stored.
+    Only those signals' inputs are fetched and only their rows are rewritten.
+    Returns the final progress (see app/progress.py).
+    """
+    db = SessionLocal()
+    try:
+        fixture = db.get(Fixture, fixture_id)
+        if fixture is None:
+            # Deleted since it was queued, or a direct call with a wrong id
+            print(f"⚠️ Fixture {fixture_id} not found")
+            return None
+        todo, versions = _signals_to_compute(db, [fixture], _signal_ids(signal_ids), stale_only)
+        progress = _task_progress(self, {fid: sigs for fid, sigs in todo.items() if sigs})
+        signal_ids = todo[fixture.id]
+        if not signal_ids:
+            print(f"✅ Fixture {fixture_id}: signals up to date")
+            return progress.flush()
+        # One shared data context: each input is fetched once for all handlers
+        ctx = prepare_context([fixture], SIGNAL_REGISTRY, signal_ids, db_session=db)
+        precomputed = _precompute([fixture], ctx, signal_ids, progress, todo)
+        with handler_pool() as pool:
+            rows = _compute_fixture(db, fixture, ctx, pool, precomputed.get(fixture.id),
+                                    signal_ids, versions[fixture.id], progress)
+        upsert_signal_results(db, rows)
+        db.commit()
+        _after_commit(rows, {fixture.id: fixture.kickoff})
+        print(f"📡 Fixture {fixture_id}: {len(rows)} signals, {ctx.api_calls} API-Football history requests")
+        return progress.flush()
+    except APIFootballLimitError as exc:
+        # Out of API budget: retry once it refills rather than store signals built on missing data
+        db.rollback()
+        countdown = _limit_countdown(exc)
+        print(f"⏳ Fixture {fixture_id}: {exc} → retrying in {countdown:.0f}s")
+        raise _retry_on_limit(self, exc, countdown, fixture.kickoff)
+    finally:
+        db.close()
+
+
+@celery.task(bind=True, max_retries=5)
+def compute_signals_for_date(self, date: str, league_ids: list = None, signal_ids: list = None,
+                             stale_only: bool = False):
+    """
+    Compute the given signals (default: all) for every fixture kicking off on
+    `date` (YYYY-MM-DD), optionally limited to some leagues; with stale_only
+    just the signals whose inputs changed. Teams, league tables and history
+    events shared between fixtures are fetched once for the whole batch.
+    Returns the final progress (see app/progress.py).
+    """
+    start_dt = datetime.strptime(date, "%Y-%m-%d")
+    end_dt = start_dt + timedelta(days=1)
+    db = SessionLocal()
+    try:
+        query = db.query(Fixture).filter(Fixture.kickoff >= start_dt, Fixture.kickoff < end_dt)
+        if league_ids:
+            query = query.filter(Fixture.league_api_id.in_(league_ids))
+        fixtures = query.order_by(Fixture.kickoff, Fixture.id).all()
+
+        todo, versions = _signals_to_compute(db, fixtures, _signal_ids(signal_ids), stale_only)
+        fixtures = [fx for fx in fixtures if todo[fx.id]]
+        progress = _task_progress(self, {fx.id: todo[fx.id] for fx in fixtures})
+        progress.flush()
+        # The batch loads the inputs of every signal some fixture needs
+        signal_ids = sorted({sig_id for fx in fixtures for sig_id in todo[fx.id]})
+        ctx = prepare_context(fixtures, SIGNAL_REGISTRY, signal_ids, db_session=db)
+        precomputed = _precompute(fixtures, ctx, signal_ids, progress, todo)
+        kickoffs = {fixture.id: fixture.kickoff for fixture in fixtures}
+        with handler_pool() as pool, SignalResultWriter(db, on_commit=lambda rows: _after_commit(rows, kickoffs)) as writer:
+            for fixture in fixtures:
+                writer.add(_compute_fixture(db, fixture, ctx, pool, precomputed.get(fixture.id),
+                                            todo[fixture.id], versions[fixture.id], progress))
+        print(f"📡 {date}: {len(fixtures)} fixtures, {ctx.api_calls} API-Football history requests, "
+              f"{writer.written} signal rows written")
+        return progress.flush()
+    except APIFootballLimitError as exc:
+        # Rows already flushed are cheap to redo: everything fetched is cached
+        db.rollback()
+        countdown = _limit_countdown(exc)
+        print(f"⏳ {date}: {exc} → retrying in {countdown:.0f}s")
+        raise _retry_on_limit(self, exc, countdown)
+    finally:
+        db.close()
+
+
+@celery.task
+def ingest_all_leagues():
+    """
+    Beat entry point: queue one incremental ingestion task per tracked league.
+    """
+    leagues = tracked_leagues()
+    if not leagues:
+        print("📥 No leagues to ingest (INGEST_LEAGUES is empty)")
+        return
+    for league_id in leagues:
+        ingest_league_task.delay(league_id)
+    print(f"📥 Queued ingestion of {len(leagues)} leagues")
+
+
+@celery.task(bind=True, max_retries=5)
+def ingest_league_task(self, league_id: int):
+    """
+    Fetch one league's new and changed fixtures, and the details of finished ones.
+    """
+    db = SessionLocal()
+    try:
+        return ingest_league(db, league_id)
+    except APIFootballLimitError as exc:
+        # Whatever was stored stays; the retry resumes from the same high-water mark
+        db.rollback()
+        countdown = _limit_countdown(exc)
+        print(f"⏳ League {league_id}: {exc} → retrying in {countdown:.0f}s")
+        raise _retry_on_limit(self, exc, countdown)
+    finally:
+        db.close()
+
 
 @celery.task
-def compute_signals_for_fixture(fixture_id: int):
+def watch_lineups_task():
+    """
+    Beat entry point: poll lineups of fixtures near kick-off and recompute
+    the LINEUP signal of those whose lineups were just published.
+    """
     db = SessionLocal()
-    fixture = db.query(Fixture).get(fixture_id)
-
-    for sig_id, handler in SIGNAL_HANDLERS.items():
-        status, value, note = handler(fixture, db)
-        stmt = insert(SignalResult).values(
-            fixture_id=fixture_id,
-            signal_id=int(sig_id),
-            status=status,
-            value=value,
-            note=note,
-            created_at=datetime.utcnow()
-        ).on_conflict_do_update(
-            index_elements=["fixture_id", "signal_id"],
-            set_={
-                "status": status,
-                "value": value,
-                "note": note,
-                "created_at": datetime.utcnow()
-            }
-        )
-        db.execute(stmt)
-
-    db.commit()
-    db.close()
+    try:
+        found = watch_lineups(db)
+    except APIFootballLimitError as exc:
+        # Nothing recorded for this round; the next beat tries again
+        db.rollback()
+        print(f"⏳ Lineup watch: {exc}")
+        return
+    finally:
+        db.close()
+    for fixture_id in found:
+        # Watched fixtures are within the hour before kick-off
+        compute_signals_for_fixture.apply_async((fixture_id, [int(SignalID.LINEUP)]), queue=KICKOFF_QUEUE)
     
 # This file contains the Celery task for computing signals for a fixture.
 # It retrieves the fixture from the database, computes each signal using the registered handlers,
@@ -0,0 +1,275 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from .api_football import infer_season
+from .context import SignalContext
+from .signals import SignalID
+# app/vectorized.py
+#
+# Columnar signal engine. Team histories are normalised once into NumPy
+# record arrays (one row per history fixture, from the team's point of view)
+# and stacked into (n_fixtures, width) blocks, most recent first. The
+# history-only signals are then computed for a whole batch of fixtures with
+# masked reductions instead of per-dict Python loops. Results are identical
+# to the handlers in app/signals.py.
+
+HISTORY_DTYPE = np.dtype([
+    ("fixture_id", "i8"),
+    ("team_id", "i8"),
+    ("opponent_id", "i8"),
+    ("is_home", "?"),
+    ("played", "?"),
+    ("goals_for", "f8"),       # NaN while unplayed
+    ("goals_against", "f8"),
+    ("ht_for", "f8"),          # half-time score, NaN when not reported
+    ("ht_against", "f8"),
+    ("kickoff", "M8[s]"),
+])
+
+
+def _num(value) -> float:
+    return np.nan if value is None else float(value)
+
+
+def team_columns(rows: List[Dict[str, Any]], team_id: int) -> np.ndarray:
+    """
+    Normalise a team's API fixture list into a HISTORY_DTYPE record array,
+    keeping the input order (most recent first).
+    """
+    out = np.zeros(len(rows), dtype=HISTORY_DTYPE)
+    for i, f in enumerate(rows):
+        home_id = f["teams"]["home"]["id"]
+        away_id = f["teams"]["away"]["id"]
+        is_home = home_id == team_id
+        goals = f.get("goals", {})
+        halftime = (f.get("score") or {}).get("halftime") or {}
+        gh, ga = _num(goals.get("home")), _num(goals.get("away"))
+        hh, ha = _num(halftime.get("home")), _num(halftime.get("away"))
+        out[i] = (
+            f["fixture"]["id"],
+            team_id,
+            away_id if is_home else home_id,
+            is_home,
+            goals.get("home") is not None and goals.get("away") is not None,
+            gh if is_home else ga,
+            ga if is_home else gh,
+            hh if is_home else ha,
+            ha if is_home else hh,
+            np.datetime64(f["fixture"]["date"][:19]) if f["fixture"].get("date") else np.datetime64("NaT"),
+        )
+    return out
+
+
+class HistoryBlock:
+    """
+    One history per fixture (e.g. every home team's), stacked into
+    (n_fixtures, longest history) arrays. Missing rows are padded with present=False.
+    """
+
+    def __init__(self, histories: List[np.ndarray]):
+        width = max([len(cols) for cols in histories] + [1])
+        self.data = np.zeros((len(histories), width), dtype=HISTORY_DTYPE)
+        self.present = np.zeros((len(histories), width), dtype=bool)
+        for i, cols in enumerate(histories):
+            self.data[i, :len(cols)] = cols
+            self.present[i, :len(cols)] = True
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.data[column]
+
+    def first(self, k: int, played: bool = False, venue: Optional[str] = None) -> np.ndarray:
+        """
+        Mask of the first k rows of each history, optionally counting only
+        played rows and rows at one venue: the columnar select_last5/last_n.
+        """
+        mask = self.present.copy()
+        if played:
+            mask &= self.data["played"]
+        if venue == "home":
+            mask &= self.data["is_home"]
+        elif venue == "away":
+            mask &= ~self.data["is_home"]
+        return mask & (np.cumsum(mask, axis=1) <= k)
+
+    def count(self, mask: np.ndarray, condition: np.ndarray) -> np.ndarray:
+        return np.sum(mask & condition, axis=1)
+
+
+class BatchInputs:
+    """
+    Home- and away-team history blocks for a batch of fixtures, built from a
+    (frozen) SignalContext: each team's played fixtures before the kick-off.
+    Each (team history, kick-off) is normalised once.
+    """
+
+    def __init__(self, fixtures: List, ctx: SignalContext):
+        self.fixtures = fixtures
+        self.ctx = ctx
+        self._columns: Dict[Tuple[Tuple[int, int, int], Any], np.ndarray] = {}
+        self._blocks: Dict[str, HistoryBlock] = {}
+
+    def _team(self, team_id: int, league_id: int, season: int, before) -> np.ndarray:
+        key = ((team_id, league_id, season), before)
+        if key not in self._columns:
+            rows = self.ctx.last_n(team_id, league_id, season, before=before)
+            self._columns[key] = team_columns(rows, team_id)
+        return self._columns[key]
+
+    def block(self, side: str) -> HistoryBlock:
+        if side not in self._blocks:
+            attr = "home_team_api_id" if side == "home" else "away_team_api_id"
+            self._blocks[side] = HistoryBlock([
+                self._team(getattr(fx, attr), fx.league_api_id, infer_season(fx.league_api_id, fx.kickoff),
+                           fx.kickoff)
+                for fx in self.fixtures
+            ])
+        return self._blocks[side]
+
+
+# --- signals -----------------------------------------------------------------
+# Each takes BatchInputs and returns one handler-style result per fixture.
+
+def _rate_status(rate: float, green: float, red: float) -> str:
+    if rate >= green:
+        return "Y"
+    if rate < red:
+        return "N"
+    return "-"
+
+
+def form(batch: BatchInputs) -> List[Optional[tuple]]:
+    home, away = batch.block("home"), batch.block("away")
+    home5, away5 = home.first(5, played=True), away.first(5, played=True)
+    home_wins = home.count(home5, home["goals_for"] > home["goals_against"])
+    away_losses = away.count(away5, away["goals_for"] < away["goals_against"])
+    n_home, n_away = home5.sum(axis=1), away5.sum(axis=1)
+    status = np.where((home_wins >= 3) | (away_losses >= 3), "Y", "N")
+    return [
+        (str(status[i]), int(home_wins[i] - away_losses[i]),
+         f"Home wins: {home_wins[i]}/{n_home[i]}, Away losses: {away_losses[i]}/{n_away[i]}")
+        for i in range(len(batch.fixtures))
+    ]
+
+
+def _combined_rate(batch: BatchInputs, condition: Callable[[HistoryBlock], np.ndarray]):
+    # Over the last 5 played of both teams; handlers need all 10
+    home, away = batch.block("home"), batch.block("away")
+    home5, away5 = home.first(5, played=True), away.first(5, played=True)
+    hits = home.count(home5, condition(home)) + away.count(away5, condition(away))
+    total = home5.sum(axis=1) + away5.sum(axis=1)
+    return hits, total
+
+
+def over15(batch: BatchInputs) -> List[Optional[tuple]]:
+    hits, total = _combined_rate(batch, lambda b: b["goals_for"] + b["goals_against"] >= 2)
+    out = []
+    for over_count, n in zip(hits.tolist(), total.tolist()):
+        if n < 10:
+            out.append(None)
+            continue
+        rate = over_count / n
+        out.append((_rate_status(rate, 0.80, 0.60), rate, f"{over_count}/{n} games ≥2 goals ({rate:.0%})"))
+    return out
+
+
+def btts(batch: BatchInputs) -> List[Optional[tuple]]:
+    hits, total = _combined_rate(batch, lambda b: (b["goals_for"] > 0) & (b["goals_against"] > 0))
+    out = []
+    for btts_count, n in zip(hits.tolist(), total.tolist()):
+        if n < 10:
+            out.append(None)
+            continue
+        rate = btts_count / n
+        out.append((_rate_status(rate, 0.70, 0.50), rate,
+                    f"{btts_count}/{n} games with both teams scoring ({rate:.0%})"))
+    return out
+
+
+def home_away_strength(batch: BatchInputs) -> List[Optional[tuple]]:
+    home, away = batch.block("home"), batch.block("away")
+    home5 = home.first(5, played=True, venue="home")
+    away5 = away.first(5, played=True, venue="away")
+    home_wins = home.count(home5, home["goals_for"] > home["goals_against"])
+    away_wins = away.count(away5, away["goals_for"] > away["goals_against"])
+    n_home, n_away = home5.sum(axis=1), away5.sum(axis=1)
+    out = []
+    for hw, aw, nh, na in zip(home_wins.tolist(), away_wins.tolist(), n_home.tolist(), n_away.tolist()):
+        if hw >= 3 and aw <= 1:
+            status, verdict = "Y", "Home strong, Away weak"
+        elif hw < 3 and aw >= 3:
+            status, verdict = "N", "Home weak, Away strong"
+        else:
+            status, verdict = "-", "Neutral strength"
+        out.append((status, hw - aw, f"{hw}/{nh}, {aw}/{na} → {verdict}"))
+    return out
+
+
+def bounce_back(batch: BatchInputs) -> List[Optional[tuple]]:
+    home = batch.block("home")
+    # The home team's last played fixture
+    has_last = home.present[:, 0]
+    played = home["played"][:, 0]
+    margin = home["goals_for"][:, 0] - home["goals_against"][:, 0]
+    out = []
+    for ok, was_played, m in zip(has_last.tolist(), played.tolist(), margin.tolist()):
+        if not ok or not was_played:
+            out.append(None)
+            continue
+        m = int(m)
+        if m <= -2:
+            out.append(("Y", m, f"Home team lost last time by {abs(m)} and now at home → Bounce-Back!"))
+        elif m >= 2:
+            out.append(("N", m, f"Home team won last time by {m} (easy win) → No bounce-back needed"))
+        else:
+            out.append(("-", m, f"Last result margin={m}, not qualifying for Bounce-Back or Red"))
+    return out
+
+
+def home_pressure_start(batch: BatchInputs) -> List[Optional[tuple]]:
+    home = batch.block("home")
+    last3 = home.first(3)
+    margin = home["goals_for"] - home["goals_against"]
+    losses = home.count(last3, margin < 0)
+    wins = home.count(last3, margin > 0)
+    n = last3.sum(axis=1)
+    out = []
+    for lost, won, rows in zip(losses.tolist(), wins.tolist(), n.tolist()):
+        if rows < 3:
+            out.append(None)
+        elif lost >= 2:
+            out.append(("Y", lost, f"Lost {lost}/3 → High pressure (Green)"))
+        elif won == 3:
+            out.append(("N", won, "Won all 3 → No pressure (Red)"))
+        else:
+            out.append(("-", 0, f"Wins={won}, Losses={lost} → Neutral"))
+    return out
+
+
+VECTORIZED_SIGNALS: Dict[SignalID, Callable[[BatchInputs], List[Optional[tuple]]]] = {
+    SignalID.FORM: form,
+    SignalID.OVER15: over15,
+    SignalID.BTTS: btts,
+    SignalID.HOME_AWAY_STRENGTH: home_away_strength,
+    SignalID.BOUNCE_BACK: bounce_back,
+    SignalID.HOME_PRESSURE_START: home_pressure_start,
+}
+
+
+def compute_vectorized(fixtures: Iterable, ctx: SignalContext,
+                       signal_ids: Iterable = None) -> Dict[int, Dict[SignalID, Optional[tuple]]]:
+    """
+    Compute the vectorized signals among signal_ids (default: all of them)
+    for every fixture at once. Returns {fixture_id: {signal_id: result}},
+    where result is what the matching handler would have returned.
+    """
+    fixtures = list(fixtures)
+    signal_ids = [sig_id for sig_id in (signal_ids if signal_ids is not None else VECTORIZED_SIGNALS)
+                  if sig_id in VECTORIZED_SIGNALS]
+    results: Dict[int, Dict[SignalID, Optional[tuple]]] = {fx.id: {} for fx in fixtures}
+    if not fixtures or not signal_ids:
+        return results
+
+    batch = BatchInputs(fixtures, ctx)
+    for sig_id in signal_ids:
+        for fx, result in zip(fixtures, VECTORIZED_SIGNALS[sig_id](batch)):
+            results[fx.id][sig_id] = result
+    return results
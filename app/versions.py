@@ -0,0 +1,162 @@
+import hashlib
+import json
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Set, Tuple
+from .models import FixtureDetail, FixtureSummary, MatchRecord, SignalResult
+from .api_football import infer_season
+from .planner import HOME, AWAY, BOTH, SignalSpec
+from .standings import latest_snapshot
+# app/versions.py
+#
+# Input versions of stored signals. Each SignalResult records a short digest
+# of the local data its handler's declared inputs were read from: per team
+# history, the played matches before kick-off, and for summaries and
+# statistics which of those matches have theirs stored (a stored one never
+# changes, but one stored later must trigger a recompute);
+# the ranks of the latest league table snapshot (a re-fetched but unchanged
+# table is the same version); whether lineups are stored. A signal is stale
+# when the digest of its inputs now differs from the stored one, so matchday
+# refreshes only recompute signals whose inputs actually changed.
+#
+# Versions come from Postgres only (match_records, standings_snapshots,
+# fixture_details), i.e. from what the ingestion pipeline and the lineup
+# watcher maintain; nothing is fetched.
+
+HISTORY_KINDS = ("history", "summaries", "statistics")
+# Details of played matches stored apart from match_records, by need kind
+DETAIL_KINDS = {
+    "summaries": (FixtureSummary.fixture_id, None),
+    "statistics": (FixtureDetail.fixture_id, FixtureDetail.statistics),
+}
+
+
+def _digest(tokens: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(tokens, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+class _PlayedIndex:
+    """
+    Played match_records of some league seasons, per team in kick-off order,
+    and which of them have the given detail kinds (DETAIL_KINDS) stored.
+    """
+
+    def __init__(self, db_session, league_seasons: Iterable[Tuple[int, int]], detail_kinds: Iterable[str] = ()):
+        self._teams: Dict[Tuple[int, int, int], List[Tuple[datetime, int, int]]] = defaultdict(list)
+        self._stored: Dict[str, Set[int]] = {kind: set() for kind in detail_kinds}
+        for league_id, season in league_seasons:
+            rows = db_session.query(
+                MatchRecord.home_team_id, MatchRecord.away_team_id, MatchRecord.kickoff,
+                MatchRecord.home_goals, MatchRecord.away_goals, MatchRecord.id,
+            ).filter(
+                MatchRecord.league_id == league_id,
+                MatchRecord.season == season,
+                MatchRecord.home_goals.isnot(None),
+                MatchRecord.away_goals.isnot(None),
+            ).order_by(MatchRecord.kickoff, MatchRecord.id).all()
+            for home_id, away_id, kickoff, home_goals, away_goals, match_id in rows:
+                self._teams[(home_id, league_id, season)].append((kickoff, home_goals * 100 + away_goals, match_id))
+                self._teams[(away_id, league_id, season)].append((kickoff, home_goals * 100 + away_goals, match_id))
+            match_ids = [row[-1] for row in rows]
+            for kind, stored in self._stored.items():
+                stored.update(_stored_ids(db_session, kind, match_ids))
+
+    def _played(self, key: Tuple[int, int, int], before: datetime) -> List[Tuple[datetime, int, int]]:
+        timeline = self._teams.get(key, [])
+        return timeline[:bisect_left(timeline, (before,))]
+
+    def token(self, key: Tuple[int, int, int], before: datetime) -> str:
+        """Count, last kick-off and scores of the team's played matches before `before`."""
+        played = self._played(key, before)
+        if not played:
+            return "0"
+        scores = hashlib.sha1(",".join(str(score) for _, score, _ in played).encode()).hexdigest()[:8]
+        return f"{len(played)}:{played[-1][0]:%Y%m%d%H%M}:{scores}"
+
+    def stored_token(self, key: Tuple[int, int, int], before: datetime, kind: str) -> str:
+        """Which of the team's played matches before `before` have their `kind` stored."""
+        stored = self._stored[kind]
+        flags = "".join("1" if match_id in stored else "0" for _, _, match_id in self._played(key, before))
+        return hashlib.sha1(flags.encode()).hexdigest()[:8]
+
+
+def _stored_ids(db_session, kind: str, match_ids: List[int]) -> Set[int]:
+    if not match_ids:
+        return set()
+    id_column, stored = DETAIL_KINDS[kind]
+    query = db_session.query(id_column).filter(id_column.in_(match_ids))
+    if stored is not None:
+        query = query.filter(stored.isnot(None))
+    return {fid for (fid,) in query}
+
+
+def input_versions(db_session, fixtures: Iterable, registry: Dict[Any, SignalSpec],
+                   signal_ids: Iterable = None) -> Dict[int, Dict[Any, str]]:
+    """
+    Current input version of the given signals (default: all registered) of
+    every fixture, {fixture_id: {signal_id: version}}.
+    """
+    fixtures = list(fixtures)
+    signal_ids = list(signal_ids) if signal_ids is not None else list(registry)
+    kinds = {need.kind for sig_id in signal_ids for need in registry[sig_id].needs}
+    seasons = {fx.id: infer_season(fx.league_api_id, fx.kickoff) for fx in fixtures}
+    league_seasons = dict.fromkeys((fx.league_api_id, seasons[fx.id]) for fx in fixtures)
+
+    played = None
+    if kinds & set(HISTORY_KINDS):
+        played = _PlayedIndex(db_session, league_seasons, kinds & set(DETAIL_KINDS))
+    snapshots = {}
+    if "standings" in kinds:
+        for key in league_seasons:
+            snapshot = latest_snapshot(db_session, *key)
+            snapshots[key] = _digest(snapshot.ranks) if snapshot is not None else None
+    lineups = set()
+    if "lineups" in kinds and fixtures:
+        lineups = {fid for (fid,) in db_session.query(FixtureDetail.fixture_id).filter(
+            FixtureDetail.fixture_id.in_([fx.id for fx in fixtures]),
+            FixtureDetail.lineups.isnot(None),
+        )}
+
+    versions = {}
+    for fx in fixtures:
+        season = seasons[fx.id]
+        teams = {HOME: fx.home_team_api_id, AWAY: fx.away_team_api_id}
+        versions[fx.id] = {}
+        for sig_id in signal_ids:
+            tokens = {}
+            for need in registry[sig_id].needs:
+                if need.kind == "standings":
+                    tokens["standings"] = snapshots[(fx.league_api_id, season)]
+                elif need.kind == "lineups":
+                    tokens["lineups"] = fx.id in lineups
+                else:
+                    for side in ((HOME, AWAY) if need.side == BOTH else (need.side,)):
+                        key = (teams[side], fx.league_api_id, season)
+                        tokens[f"history:{side}"] = played.token(key, fx.kickoff)
+                        if need.kind in DETAIL_KINDS:
+                            tokens[f"{need.kind}:{side}"] = played.stored_token(key, fx.kickoff, need.kind)
+            versions[fx.id][sig_id] = _digest(tokens)
+    return versions
+
+
+def stale_signals(db_session, fixtures: Iterable, registry: Dict[Any, SignalSpec],
+                  signal_ids: Iterable = None) -> Tuple[Dict[int, List[Any]], Dict[int, Dict[Any, str]]]:
+    """
+    Signals (among signal_ids, default: all) of each fixture that are missing,
+    were stored without a version, or were computed from inputs that have
+    changed since. Returns ({fixture_id: [signal_id, ...]}, current versions).
+    """
+    fixtures = list(fixtures)
+    current = input_versions(db_session, fixtures, registry, signal_ids)
+    stored = defaultdict(dict)
+    if fixtures:
+        for fid, sig_id, version in db_session.query(
+            SignalResult.fixture_id, SignalResult.signal_id, SignalResult.input_version,
+        ).filter(SignalResult.fixture_id.in_([fx.id for fx in fixtures])):
+            stored[fid][sig_id] = version
+    stale = {
+        fid: [sig_id for sig_id, version in sigs.items() if stored[fid].get(int(sig_id)) != version]
+        for fid, sigs in current.items()
+    }
+    return stale, current
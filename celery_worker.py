@@ -1,4 +1,25 @@
+import sys
+from app.queues import CONCURRENCY, QUEUES
 from app.tasks import celery
+# celery_worker.py
+#
+# Worker for one or more queues (app/queues.py), with the concurrency set
+# for them in the config (KICKOFF_/MATCHDAY_/BACKFILL_WORKER_CONCURRENCY):
+#   python celery_worker.py kickoff
+#   python celery_worker.py matchday backfill
+# Without arguments it consumes every queue (local development).
 
 if __name__ == "__main__":
-    celery.worker_main(["worker", "--loglevel=info"])
\ No newline at end of file
+    queues = sys.argv[1:] or list(QUEUES)
+    unknown = [queue for queue in queues if queue not in CONCURRENCY]
+    if unknown:
+        sys.exit(f"Unknown queues: {unknown} (expected some of {', '.join(QUEUES)})")
+    celery.worker_main([
+        "worker", "--loglevel=info",
+        "--queues", ",".join(queues),
+        "--concurrency", str(sum(CONCURRENCY[queue] for queue in queues)),
+        "--hostname", f"{'-'.join(queues)}@%h",
+        # Tasks run for seconds to minutes: a process should not hold
+        # queued work back from idle ones
+        "--prefetch-multiplier", "1",
+    ])
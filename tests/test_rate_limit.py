@@ -0,0 +1,136 @@
+import pytest
+from app import rate_limit
+from app.config import settings
+from app.rate_limit import BUCKET_KEY, QuotaExhausted, RateLimited, RateLimiter, RedisRateLimiter
+# tests/test_rate_limit.py
+#
+# Token bucket and daily-quota accounting of both limiters; the Redis one
+# runs its Lua scripts on fakeredis.
+
+fakeredis = pytest.importorskip("fakeredis")
+
+RATE = 1.0      # tokens per second in the bucket tests
+BURST = 5
+
+
+@pytest.fixture(params=["memory", "redis"])
+def limiter(request):
+    if request.param == "memory":
+        return RateLimiter()
+    return RedisRateLimiter(fakeredis.FakeRedis())
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    # acquire() sleeps out its wait; record the waits instead
+    waits = []
+    monkeypatch.setattr(rate_limit.time, "sleep", waits.append)
+    return waits
+
+
+def _tokens(limiter) -> float:
+    if isinstance(limiter, RedisRateLimiter):
+        return float(limiter.client.hget(BUCKET_KEY, "tokens"))
+    return limiter._tokens
+
+
+def test_burst_then_queue(limiter):
+    waits = [limiter._reserve(RATE, BURST, 100) for _ in range(BURST + 3)]
+
+    assert waits[:BURST] == [0] * BURST
+    # Reservations past the burst queue up one refill apart
+    assert waits[BURST:] == pytest.approx([1, 2, 3], abs=0.05)
+
+
+def test_reservation_beyond_max_wait_is_refused(limiter):
+    for _ in range(BURST):
+        limiter._reserve(RATE, BURST, 100)
+    before = _tokens(limiter)
+
+    assert limiter._reserve(RATE, BURST, 0.5) == -1
+    # Nothing was reserved
+    assert _tokens(limiter) == pytest.approx(before, abs=0.05)
+
+
+def test_drain_keeps_queued_reservations(limiter):
+    for _ in range(BURST + 3):
+        limiter._reserve(RATE, BURST, 100)
+    queued = _tokens(limiter)
+    assert queued < -2
+
+    limiter.drain()
+
+    assert _tokens(limiter) == pytest.approx(queued, abs=0.05)
+    # The next caller still waits behind the queue
+    assert limiter._reserve(RATE, BURST, 100) == pytest.approx(1 - queued, abs=0.05)
+
+
+def test_drain_empties_a_full_bucket(limiter):
+    limiter._reserve(RATE, BURST, 100)
+
+    limiter.drain()
+
+    assert _tokens(limiter) == pytest.approx(0, abs=0.05)
+    assert limiter._reserve(RATE, BURST, 100) == pytest.approx(1, abs=0.05)
+
+
+def test_minute_exhausted_header_drains(limiter):
+    limiter._reserve(RATE, BURST, 100)
+
+    limiter.record({"X-RateLimit-Remaining": "0"})
+
+    assert _tokens(limiter) <= 0
+
+
+def test_requests_are_counted_against_the_daily_quota(limiter, sleeps):
+    for _ in range(3):
+        limiter.acquire()
+
+    assert limiter.remaining_today() == settings.API_FOOTBALL_DAILY_QUOTA - 3
+
+
+def test_headers_override_own_count(limiter, sleeps):
+    limiter.acquire()
+
+    limiter.record({"x-ratelimit-requests-limit": "7500", "x-ratelimit-requests-remaining": "7000"})
+
+    assert limiter.remaining_today() == 7000
+    assert limiter.snapshot()["daily_limit"] == 7500
+
+
+def test_quota_reserve_is_never_spent(limiter, sleeps):
+    remaining = settings.API_FOOTBALL_QUOTA_RESERVE
+    limiter.record({"x-ratelimit-requests-remaining": str(remaining)})
+
+    with pytest.raises(QuotaExhausted) as exc:
+        limiter.acquire()
+    assert 0 < exc.value.retry_after <= 86400
+
+
+def test_mark_exhausted_stops_every_caller(limiter, sleeps):
+    limiter.mark_exhausted()
+
+    assert limiter.remaining_today() == 0
+    with pytest.raises(QuotaExhausted):
+        limiter.acquire()
+
+
+def test_rate_is_spread_below_low_water(limiter):
+    full = settings.API_FOOTBALL_RATE_PER_MINUTE / 60.0
+    assert limiter.current_rate({}) == full
+
+    low = {"day": rate_limit._utc_day(), "daily_remaining": settings.API_FOOTBALL_QUOTA_LOW_WATER - 1}
+    spendable = settings.API_FOOTBALL_QUOTA_LOW_WATER - 1 - settings.API_FOOTBALL_QUOTA_RESERVE
+    assert limiter.current_rate(low) == pytest.approx(
+        min(full, spendable / rate_limit.seconds_until_reset()), rel=0.01)
+
+
+def test_full_queue_raises_rate_limited(limiter, sleeps, monkeypatch):
+    monkeypatch.setattr(settings, "API_FOOTBALL_MAX_WAIT", 0.0)
+    for _ in range(settings.API_FOOTBALL_BURST):
+        limiter.acquire()
+
+    with pytest.raises(RateLimited):
+        limiter.acquire()
+    # The burst went out without waiting
+    assert sleeps == []
@@ -0,0 +1,88 @@
+import random
+from datetime import datetime, timedelta
+import pytest
+from app.backtest import replay_fixture
+from app.context import SignalContext
+from app.signals import SIGNAL_HANDLERS
+from app.vectorized import VECTORIZED_SIGNALS, compute_vectorized
+# tests/test_vectorized.py
+#
+# The columnar engine must return exactly what the per-fixture handlers
+# return, for every fixture of a batch: same status, value and note.
+
+LEAGUE, SEASON = 39, 2025
+TEAMS = list(range(101, 111))
+
+
+def _season(seed: int) -> list:
+    """
+    A double round-robin of API fixture dicts, one round a week. Most are
+    played; some lack a half-time score and a few are postponed.
+    """
+    rng = random.Random(seed)
+    teams = TEAMS[:]
+    rounds = []
+    for _ in range(len(teams) - 1):
+        rounds.append([(teams[i], teams[-1 - i]) for i in range(len(teams) // 2)])
+        teams.insert(1, teams.pop())
+    rounds += [[(away, home) for home, away in pairs] for pairs in rounds]
+
+    fixtures, fixture_id = [], 1000
+    start = datetime(2025, 8, 16, 14, 0)
+    for week, pairs in enumerate(rounds):
+        for slot, (home, away) in enumerate(pairs):
+            fixture_id += 1
+            kickoff = start + timedelta(weeks=week, hours=2 * slot)
+            postponed = rng.random() < 0.04
+            gh, ga = (None, None) if postponed else (rng.randint(0, 4), rng.randint(0, 4))
+            halftime = {"home": None, "away": None}
+            if not postponed and rng.random() > 0.1:
+                halftime = {"home": rng.randint(0, gh), "away": rng.randint(0, ga)}
+            fixtures.append({
+                "fixture": {"id": fixture_id, "date": kickoff.isoformat() + "+00:00",
+                            "status": {"short": "PST" if postponed else "FT"}},
+                "league": {"id": LEAGUE, "season": SEASON},
+                "teams": {"home": {"id": home, "name": f"Team {home}"},
+                          "away": {"id": away, "name": f"Team {away}"}},
+                "goals": {"home": gh, "away": ga},
+                "score": {"halftime": halftime},
+            })
+    return fixtures
+
+
+class LocalContext(SignalContext):
+    """
+    SignalContext over the given fixtures only; nothing is fetched.
+    """
+
+    def __init__(self, fixtures):
+        super().__init__()
+        self.history.add(fixtures)
+
+    def load_history(self, league_seasons):
+        pass
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_vectorized_matches_handlers(seed):
+    season = _season(seed)
+    ctx = LocalContext(season).freeze()
+    # Every fixture of the season: from the first round (no history) to the last
+    fixtures = [replay_fixture(f) for f in season]
+
+    batch = compute_vectorized(fixtures, ctx)
+
+    for sig_id in VECTORIZED_SIGNALS:
+        for fx in fixtures:
+            expected = SIGNAL_HANDLERS[sig_id](fx, None, ctx)
+            assert batch[fx.id][sig_id] == expected, (sig_id, fx.id)
+
+
+def test_subset_of_signals():
+    ctx = LocalContext(_season(4)).freeze()
+    fixtures = [replay_fixture(f) for f in _season(4)[-5:]]
+    sig_id = next(iter(VECTORIZED_SIGNALS))
+
+    batch = compute_vectorized(fixtures, ctx, [sig_id])
+
+    assert all(list(results) == [sig_id] for results in batch.values())